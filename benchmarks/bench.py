@@ -0,0 +1,226 @@
+"""Benchmarks for the cache, hashing and model hot paths.
+
+    python -m benchmarks.bench --output bench_results.json
+    python -m benchmarks.bench --compare old.json
+
+Results are written as JSON (median and min microseconds per operation) so runs
+from different versions can be compared with --compare. The "allocations" group
+traces the memory decoding a response takes, per call: the peak bytes while it
+runs and the blocks and bytes still held by the result.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+from typing import Any, Callable
+
+from benchmarks.synthetic import make_person, make_record, make_small_responses
+from pdl_api import PDLPersonAPI, PDLSettings, Person, Response
+from pdl_api.keys import query_key
+from pdl_api.models.decode import decode_person_response
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, repeat: int = 5) -> dict[str, float]:
+    """Median and min microseconds per call of `fn` over `repeat` timed rounds"""
+    ## calibrate the number of calls per round
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1 << 20:
+            break
+        number *= 2
+    rounds = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            rounds.append((time.perf_counter() - start) / number * 1e6)
+    finally:
+        gc.enable()
+    return {"median_us": statistics.median(rounds), "min_us": min(rounds), "number": number}
+
+
+def measure_allocations(fn: Callable[[], Any], number: int = 200) -> dict[str, float]:
+    """Peak traced bytes of a call of `fn`, and the blocks and bytes its result keeps"""
+    fn()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(number):
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+        before = tracemalloc.take_snapshot()
+        kept = [fn() for _ in range(number)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del kept
+    return {
+        "peak_bytes": statistics.median(peaks),
+        "kept_blocks": blocks / number,
+        "kept_bytes": size / number,
+    }
+
+
+def bench_hashing() -> dict[str, Any]:
+    simple = {"email": ["Someone@Example.com"]}
+    nested = {
+        "query": {"bool": {"must": [{"term": {"job_company_website": "example.com"}}, {"term": {"location_country": "canada"}}]}},
+        "size": 100,
+    }
+    return {
+        "query_key.simple": measure(lambda: query_key(simple)),
+        "query_key.search": measure(lambda: query_key(nested)),
+    }
+
+
+def bench_cache(sizes: list[int]) -> dict[str, Any]:
+    results = {}
+    for size in sizes:
+        api = PDLPersonAPI(settings=PDLSettings(api_key="bench"))
+        emails = []
+        for email, r in make_small_responses(size):
+            api.save_queries({query_key(r.query): r})
+            if len(emails) < 1000:
+                emails.append(email)
+        exact = [{"email": [e]} for e in emails]
+        other = [{"email": [e.replace(".0@example0", ".1@example1")]} for e in emails]
+        missing = {"email": ["nobody@nowhere.com"]}
+        it = iter(range(1 << 62))
+        results[f"find_existing_queries.exact.{size}"] = measure(
+            lambda: api.find_existing_query(exact[next(it) % len(exact)])
+        )
+        results[f"find_existing_queries.other_email.{size}"] = measure(
+            lambda: api.find_existing_query(other[next(it) % len(other)])
+        )
+        results[f"find_existing_queries.miss.{size}"] = measure(lambda: api.find_existing_query(missing))
+        del api
+        gc.collect()
+    return results
+
+
+def bench_models() -> dict[str, Any]:
+    record = make_record(1)
+    body = json.dumps(record).encode()
+    query = {"email": ["p1.0@example0.com"]}
+    r = Response(query=query, **json.loads(body))
+    dumped = r.model_dump(mode="json")
+    dumped_json = r.model_dump_json()
+    person = Person(**make_person(2))
+    return {
+        "response.from_dict": measure(lambda: Response(query=query, **json.loads(body))),
+        "response.from_bytes": measure(lambda: decode_person_response(body, query)),
+        "response.from_bytes_lazy": measure(lambda: decode_person_response(body, query, lazy=True)),
+        "response.model_dump_json_mode": measure(lambda: r.model_dump(mode="json")),
+        "response.reload": measure(lambda: Response(**dumped)),
+        "response.reload_json": measure(lambda: Response.model_validate_json(dumped_json)),
+        "response.reload_lazy": measure(lambda: Response.model_validate_lazy(json.loads(dumped_json))),
+        "person.get_emails": measure(lambda: person.get_emails()),
+        "person.get_emails.filtered": measure(lambda: person.get_emails(filter={"type": "personal"})),
+        "person.get_experiences": measure(lambda: person.get_experiences()),
+    }
+
+
+def bench_allocations() -> dict[str, Any]:
+    record = make_record(1)
+    body = json.dumps(record).encode()
+    query = {"email": ["p1.0@example0.com"]}
+    dumped_json = Response(query=query, **record).model_dump_json()
+    return {
+        "response.model_validate_json": measure_allocations(lambda: Response.model_validate_json(dumped_json)),
+        "response.json_loads_init": measure_allocations(lambda: Response(**json.loads(dumped_json))),
+        "response.from_bytes": measure_allocations(lambda: decode_person_response(body, query)),
+        "response.from_dict": measure_allocations(lambda: Response(query=query, **json.loads(body))),
+    }
+
+
+def metadata_info() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        version = metadata.version("pdl-api")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "version": version,
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]):
+    print(f"{'benchmark':<48} {'old us':>12} {'new us':>12} {'ratio':>8}")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before = old["results"][name]["median_us"]
+        after = result["median_us"]
+        print(f"{name:<48} {before:>12.2f} {after:>12.2f} {after / before:>8.2f}")
+    for name, result in new.get("allocations", {}).items():
+        if name not in old.get("allocations", {}):
+            continue
+        before = old["allocations"][name]["peak_bytes"]
+        after = result["peak_bytes"]
+        print(f"{name + ' peak bytes':<48} {before:>12.0f} {after:>12.0f} {after / before:>8.2f}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma separated cache sizes")
+    parser.add_argument("--compare", help="Previous results to compare against")
+    parser.add_argument("--only", choices=["hashing", "cache", "models", "allocations"], action="append")
+    args = parser.parse_args(argv)
+
+    groups = args.only or ["hashing", "cache", "models", "allocations"]
+    results: dict[str, Any] = {}
+    if "hashing" in groups:
+        results.update(bench_hashing())
+    if "models" in groups:
+        results.update(bench_models())
+    if "cache" in groups:
+        results.update(bench_cache([int(s) for s in args.sizes.split(",") if s]))
+    ## traced separately, tracing slows the calls down
+    allocations = bench_allocations() if "allocations" in groups else {}
+
+    output = {"meta": metadata_info(), "results": results, "allocations": allocations}
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    for name, result in results.items():
+        print(f"{name:<48} {result['median_us']:>12.2f} us")
+    for name, result in allocations.items():
+        print(
+            f"{name:<48} {result['peak_bytes']:>12.0f} B peak "
+            f"{result['kept_blocks']:>8.0f} blocks {result['kept_bytes']:>10.0f} B kept"
+        )
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), output)
+
+
+if __name__ == "__main__":
+    main()
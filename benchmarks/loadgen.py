@@ -0,0 +1,138 @@
+"""Drive PDLPersonAPI at a target rate and report throughput, latency and cache use.
+
+    python -m benchmarks.loadgen --serve --qps 200 --duration 10
+    python -m benchmarks.loadgen --base-path http://127.0.0.1:8765/v5 --qps 50
+
+Requests are scheduled open loop at --qps, latency is measured from the scheduled
+start so queueing shows up in the percentiles. Emails are drawn from --unique
+identities with a skew so some are repeated and can be answered from the cache.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from benchmarks.standin import StandInServer, add_config_args, config_from_args
+from pdl_api import PDLException, PDLPersonAPI, PDLSettings
+
+
+class CountingAPI(PDLPersonAPI):
+    """Counts the calls that reach the network and their statuses"""
+
+    def __init__(self, *args, **kwargs):
+        self.network_calls = 0
+        self.statuses: Counter[int] = Counter()
+        self.counter_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any] | bytes:
+        with self.counter_lock:
+            self.network_calls += 1
+        record = super()._get_response(params)
+        status = 200 if isinstance(record, bytes) else record.get("status", 0)
+        with self.counter_lock:
+            self.statuses[status] += 1
+        return record
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run(
+    api: CountingAPI,
+    qps: float,
+    duration: float,
+    unique: int,
+    workers: int,
+    skew: float = 2.0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+    lock = threading.Lock()
+
+    def call(scheduled: float, email: str):
+        try:
+            api.get_person(params={"email": [email]})
+        except PDLException as e:
+            with lock:
+                errors[type(e).__name__] += 1
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - scheduled)
+
+    total = int(qps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdl-loadgen") as pool:
+        for n in range(total):
+            scheduled = start + n / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            email = f"user{int(unique * rng.random() ** skew)}@example.com"
+            pool.submit(call, scheduled, email)
+    elapsed = time.perf_counter() - start
+
+    lat_ms = [lat * 1000 for lat in latencies]
+    return {
+        "requests": total,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(lat_ms, 50),
+            "p95": percentile(lat_ms, 95),
+            "p99": percentile(lat_ms, 99),
+            "max": max(lat_ms, default=0.0),
+        },
+        "cache_hit_rate": 1 - api.network_calls / total if total else 0.0,
+        "network_calls": api.network_calls,
+        "statuses": {str(k): v for k, v in sorted(api.statuses.items())},
+        "errors": dict(errors),
+        ## PDL charges one credit per matched enrichment
+        "credits": api.statuses.get(200, 0),
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-path", help="API url, defaults to PDL_BASE_PATH or the PDL API")
+    parser.add_argument("--serve", action="store_true", help="Start a local stand-in and target it")
+    parser.add_argument("--qps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds")
+    parser.add_argument("--unique", type=int, default=1000, help="Number of distinct emails")
+    parser.add_argument("--skew", type=float, default=2.0, help="Higher repeats popular emails more")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--output", help="Also write the report as JSON here")
+    add_config_args(parser)
+    args = parser.parse_args(argv)
+
+    server = None
+    base_path = args.base_path
+    if args.serve:
+        server = StandInServer(config_from_args(args)).start()
+        base_path = server.base_path
+    settings = PDLSettings(thread_safe=True, **({"base_path": base_path} if base_path else {}))
+    api = CountingAPI(settings=settings)
+    try:
+        report = run(api, args.qps, args.duration, args.unique, args.workers, args.skew, args.seed)
+    finally:
+        if server:
+            server.shutdown()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
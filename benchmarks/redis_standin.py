@@ -0,0 +1,207 @@
+"""Local stand-in for a Redis server, covering the commands RedisCache uses.
+
+    python -m benchmarks.redis_standin --port 6390
+
+Point clients at it with PDL_CACHE_URL=redis://127.0.0.1:6390/0. Data is kept in
+memory per database, expiry is checked on access. Not for production use.
+"""
+
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Any, Optional
+
+
+class RedisStandIn:
+    """The keyspace shared by all connections"""
+
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self.dbs: dict[int, dict[bytes, Any]] = {}
+        self.expires: dict[int, dict[bytes, float]] = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    def _live(self, db: int, key: bytes) -> bool:
+        data = self.dbs.setdefault(db, {})
+        expires = self.expires.setdefault(db, {})
+        deadline = expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            data.pop(key, None)
+            del expires[key]
+        return key in data
+
+    def _set_expiry(self, db: int, key: bytes, ms: Optional[float]):
+        expires = self.expires.setdefault(db, {})
+        if ms is None:
+            expires.pop(key, None)
+        else:
+            expires[key] = time.monotonic() + ms / 1000
+
+    def execute(self, conn: "Handler", args: list[bytes]) -> Any:
+        name = args[0].upper().decode()
+        with self.lock:
+            self.commands += 1
+            if name == "AUTH":
+                conn.authed = self.password is None or args[-1].decode() == self.password
+                return "OK" if conn.authed else Exception("WRONGPASS invalid password")
+            if self.password is not None and not conn.authed:
+                return Exception("NOAUTH Authentication required.")
+            return self._execute(conn, name, args[1:])
+
+    def _execute(self, conn: "Handler", name: str, args: list[bytes]) -> Any:
+        db = conn.db
+        data = self.dbs.setdefault(db, {})
+        if name == "PING":
+            return "PONG"
+        if name == "SELECT":
+            conn.db = int(args[0])
+            return "OK"
+        if name == "GET":
+            return data.get(args[0]) if self._live(db, args[0]) else None
+        if name == "MGET":
+            return [data.get(k) if self._live(db, k) else None for k in args]
+        if name == "SET":
+            data[args[0]] = args[1]
+            ms = None
+            options = [a.upper() for a in args[2:]]
+            if b"PX" in options:
+                ms = float(args[2 + options.index(b"PX") + 1])
+            elif b"EX" in options:
+                ms = float(args[2 + options.index(b"EX") + 1]) * 1000
+            self._set_expiry(db, args[0], ms)
+            return "OK"
+        if name == "DEL":
+            removed = 0
+            for k in args:
+                if self._live(db, k):
+                    del data[k]
+                    self._set_expiry(db, k, None)
+                    removed += 1
+            return removed
+        if name == "EXISTS":
+            return sum(self._live(db, k) for k in args)
+        if name == "SADD":
+            self._live(db, args[0])
+            members = data.setdefault(args[0], set())
+            before = len(members)
+            members.update(args[1:])
+            return len(members) - before
+        if name == "SREM":
+            if not self._live(db, args[0]):
+                return 0
+            members = data[args[0]]
+            before = len(members)
+            members.difference_update(args[1:])
+            if not members:
+                del data[args[0]]
+                self._set_expiry(db, args[0], None)
+            return before - len(members)
+        if name == "SMEMBERS":
+            return sorted(data[args[0]]) if self._live(db, args[0]) else []
+        if name in ("EXPIRE", "PEXPIRE"):
+            if not self._live(db, args[0]):
+                return 0
+            ms = float(args[1]) * (1000 if name == "EXPIRE" else 1)
+            self._set_expiry(db, args[0], ms)
+            return 1
+        if name == "SCAN":
+            ## one pass over everything, the cursor is always 0 afterwards
+            pattern = "*"
+            options = [a.upper() for a in args[1:]]
+            if b"MATCH" in options:
+                pattern = args[1 + options.index(b"MATCH") + 1].decode()
+            keys = [k for k in list(data) if self._live(db, k) and fnmatch.fnmatchcase(k.decode(), pattern)]
+            return [b"0", keys]
+        if name == "DBSIZE":
+            return sum(self._live(db, k) for k in list(data))
+        if name == "FLUSHDB":
+            data.clear()
+            self.expires.pop(db, None)
+            return "OK"
+        return Exception(f"ERR unknown command '{name}'")
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    server: "RedisStandInServer"
+
+    def setup(self):
+        super().setup()
+        self.db = 0
+        self.authed = False
+
+    def _command(self) -> Optional[list[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if line[:1] != b"*":
+            ## inline command, as sent by telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self._command()
+            if args is None:
+                return
+            if not args:
+                continue
+            self.wfile.write(_encode(self.server.redis.execute(self, args)))
+
+
+class RedisStandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: Optional[str] = None):
+        super().__init__((host, port), Handler)
+        self.redis = RedisStandIn(password)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        auth = f":{self.redis.password}@" if self.redis.password else ""
+        return f"redis://{auth}{host}:{port}/0"
+
+    def start(self) -> "RedisStandInServer":
+        """Serve from a background thread"""
+        threading.Thread(target=self.serve_forever, name="redis-standin", daemon=True).start()
+        return self
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--password")
+    args = parser.parse_args(argv)
+    server = RedisStandInServer(args.host, args.port, args.password)
+    print(f"Redis stand-in serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Local stand-in for the PDL person enrichment, search and bulk endpoints.
+
+    python -m benchmarks.standin --port 8765 --latency-ms 150 --rate-404 0.3
+
+Point a client at it with PDL_BASE_PATH=http://127.0.0.1:8765/v5 (or
+init_kwargs={"base_path": ...}). It serves synthetic persons, simulates latency,
+error rates and a per-minute rate limit, and reports what it served on GET /stats.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import make_person
+
+
+@dataclass
+class StandInConfig:
+    ## Lognormal latency around a median
+    latency_ms: float = 100.0
+    latency_sigma: float = 0.3
+    ## Fraction of records answered with each error
+    rate_402: float = 0.0
+    rate_404: float = 0.2
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    ## Requests per minute before answering 429, None for no limit
+    rate_limit: Optional[int] = None
+    ## Number of people matching any search
+    search_total: int = 1000
+    seed: int = 0
+
+
+@dataclass
+class StandInStats:
+    requests: int = 0
+    records: int = 0
+    credits: int = 0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+def _first(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+class StandIn:
+    """The simulated API state shared by all handler threads"""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.stats = StandInStats()
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def latency(self) -> float:
+        with self.lock:
+            return self.config.latency_ms / 1000 * self.rng.lognormvariate(0, self.config.latency_sigma)
+
+    def rate_headers(self) -> dict[str, str]:
+        if self.config.rate_limit is None:
+            return {}
+        remaining = max(0, self.config.rate_limit - self.window_count)
+        return {
+            "x-ratelimit-limit": json.dumps({"minute": self.config.rate_limit}),
+            "x-ratelimit-remaining": json.dumps({"minute": remaining}),
+        }
+
+    def throttled(self) -> bool:
+        """Count the request against the per-minute limit"""
+        with self.lock:
+            self.stats.requests += 1
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            self.window_count += 1
+            return self.config.rate_limit is not None and self.window_count > self.config.rate_limit
+
+    def _count(self, status: int, credits: int = 0):
+        with self.lock:
+            self.stats.records += 1
+            self.stats.credits += credits
+            self.stats.statuses[str(status)] = self.stats.statuses.get(str(status), 0) + 1
+
+    def _error(self, status: int, type: str, message: str) -> dict[str, Any]:
+        self._count(status)
+        return {"status": status, "error": {"type": type, "message": message}}
+
+    def enrich(self, params: dict[str, Any]) -> dict[str, Any]:
+        """One enrichment record, errors drawn from the configured rates"""
+        c = self.config
+        with self.lock:
+            roll = self.rng.random()
+        if roll < c.rate_402:
+            return self._error(402, "payment_required", "You have hit your account maximum")
+        roll -= c.rate_402
+        if roll < c.rate_429:
+            return self._error(429, "rate_limit_error", "Too many requests")
+        roll -= c.rate_429
+        if roll < c.rate_5xx:
+            return self._error(503, "server_error", "Service unavailable")
+        email = _first(params.get("email"))
+        identity = email or _first(params.get("profile")) or _first(params.get("pdl_id")) or ""
+        i = zlib.crc32(identity.encode())
+        ## the same identity is always found or always not found
+        if (i % 10_000) / 10_000 < c.rate_404:
+            return self._error(404, "not_found", "No records were found matching your request")
+        person = make_person(i, c.seed)
+        if email:
+            person["emails"][0]["address"] = email
+        self._count(200, credits=1)
+        return {"status": 200, "likelihood": 8, "data": person}
+
+    def search(self, params: dict[str, Any]) -> dict[str, Any]:
+        start = int(params.get("scroll_token") or 0)
+        end = min(self.config.search_total, start + int(params.get("size") or 10))
+        data = [make_person(i, self.config.seed) for i in range(start, end)]
+        with self.lock:
+            self.stats.credits += len(data)
+        self._count(200)
+        token = str(end) if end < self.config.search_total else None
+        return {"status": 200, "data": data, "scroll_token": token, "total": self.config.search_total}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def _send(self, status: int, body: Any, headers: Optional[dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, path: str, params: dict[str, Any]):
+        api = self.server.standin
+        if path.endswith("/stats"):
+            return self._send(200, asdict(api.stats))
+        throttled = api.throttled()
+        time.sleep(api.latency())
+        headers = api.rate_headers()
+        if throttled:
+            return self._send(429, {"status": 429, "error": {"type": "rate_limit_error", "message": "Too many requests"}}, {**headers, "retry-after": "1"})
+        if path.endswith("/person/enrich"):
+            record = api.enrich(params)
+            return self._send(record["status"], record, headers)
+        if path.endswith("/person/bulk"):
+            records = [api.enrich(r.get("params", {})) for r in params.get("requests", [])]
+            return self._send(200, records, headers)
+        if path.endswith("/person/search"):
+            return self._send(200, api.search(params), headers)
+        self._send(404, {"status": 404, "error": {"type": "invalid_request_error", "message": "Unknown endpoint"}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(url.query).items()}
+        self._handle(url.path, params)
+
+    def do_POST(self):
+        self._handle(urlparse(self.path).path, self._body())
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: StandInConfig, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), Handler)
+        self.standin = StandIn(config)
+
+    @property
+    def base_path(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v5"
+
+    def start(self) -> "StandInServer":
+        """Serve from a background thread"""
+        threading.Thread(target=self.serve_forever, name="pdl-standin", daemon=True).start()
+        return self
+
+
+def add_config_args(parser: argparse.ArgumentParser):
+    defaults = StandInConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--rate-402", type=float, default=defaults.rate_402)
+    parser.add_argument("--rate-404", type=float, default=defaults.rate_404)
+    parser.add_argument("--rate-429", type=float, default=defaults.rate_429)
+    parser.add_argument("--rate-5xx", type=float, default=defaults.rate_5xx)
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests per minute")
+    parser.add_argument("--search-total", type=int, default=defaults.search_total)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        rate_402=args.rate_402,
+        rate_404=args.rate_404,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        rate_limit=args.rate_limit,
+        search_total=args.search_total,
+        seed=args.seed,
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_args(parser)
+    args = parser.parse_args(argv)
+    server = StandInServer(config_from_args(args), args.host, args.port)
+    print(f"PDL stand-in serving on {server.base_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
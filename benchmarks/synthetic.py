@@ -0,0 +1,71 @@
+"""Synthetic PDL person records modeled on tests/examples/person_example.json"""
+
+import copy
+import json
+import os
+import random
+from typing import Any, Iterator
+
+from pdl_api import Response
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+person_json = os.path.join(dir_path, "..", "tests", "examples", "person_example.json")
+
+with open(person_json, "r") as f:
+    TEMPLATE: dict[str, Any] = json.load(f)
+
+EMAIL_TYPES = ("personal", "current_professional", "professional", "disposable")
+
+
+def _date(rng: random.Random, year_from: int = 2000, year_to: int = 2024) -> str:
+    """A PDL partial date, YYYY, YYYY-MM or YYYY-MM-DD"""
+    year = rng.randint(year_from, year_to)
+    precision = rng.random()
+    if precision < 0.2:
+        return f"{year}"
+    if precision < 0.5:
+        return f"{year}-{rng.randint(1, 12):02d}"
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def make_person(i: int, seed: int = 0, companies: int = 1000) -> dict[str, Any]:
+    """The i-th synthetic person, deterministic for a seed"""
+    rng = random.Random(seed * 1_000_003 + i)
+    person = copy.deepcopy(TEMPLATE)
+    person["id"] = f"synthetic_{i:09d}"
+    person["full_name"] = f"person {i}"
+    person["linkedin_url"] = f"linkedin.com/in/p{i}"
+    person["emails"] = [
+        {
+            "address": f"p{i}.{n}@example{n}.com",
+            "type": rng.choice(EMAIL_TYPES),
+            "first_seen": _date(rng),
+            "last_seen": _date(rng),
+            "num_sources": rng.randint(1, 10),
+        }
+        for n in range(rng.randint(1, 5))
+    ]
+    for exp in person["experience"]:
+        exp["start_date"] = _date(rng)
+        exp["end_date"] = _date(rng)
+        company_id = rng.randrange(companies)
+        exp["company"]["id"] = f"company_{company_id}"
+        exp["company"]["name"] = f"company {company_id}"
+    return person
+
+
+def make_record(i: int, seed: int = 0) -> dict[str, Any]:
+    """An enrichment API record as PDL sends it"""
+    return {"status": 200, "likelihood": 8, "dataset_version": "28.0", "data": make_person(i, seed)}
+
+
+def make_small_responses(n: int, seed: int = 0) -> Iterator[tuple[str, Response]]:
+    """(email, Response) pairs with only identifying fields, cheap enough for 1M entry caches"""
+    for i in range(n):
+        email = f"p{i}.0@example0.com"
+        person = {
+            "id": f"synthetic_{i:09d}",
+            "full_name": f"person {i}",
+            "emails": [{"address": email}, {"address": f"p{i}.1@example1.com"}],
+        }
+        yield email, Response(status=200, person=person, query={"email": [email]})
@@ -1,35 +1,83 @@
+from pdl_api.async_person_api import AsyncPDLPersonAPI as AsyncPDLPersonAPI
+from pdl_api.cache import CacheBackend as CacheBackend
+from pdl_api.cache import CacheStats as CacheStats
+from pdl_api.cache import IndexedCache as IndexedCache
+from pdl_api.cache import LRUCache as LRUCache
+from pdl_api.cache import NegativeCache as NegativeCache
+from pdl_api.cache import RedisCache as RedisCache
+from pdl_api.cache import ShardedCache as ShardedCache
+from pdl_api.cache import SnapshotCache as SnapshotCache
+from pdl_api.cache import SQLiteCache as SQLiteCache
+from pdl_api.company_api import PDLCompanyAPI as PDLCompanyAPI
+from pdl_api.local_index import LocalIndex as LocalIndex
+from pdl_api.local_index import LocalResult as LocalResult
+from pdl_api.metrics import Metrics as Metrics
+from pdl_api.metrics import PrometheusMetrics as PrometheusMetrics
+from pdl_api.models.intern import Interner as Interner
 from pdl_api.models.exceptions import (
     PDLAccountLimitException as PDLAccountLimitException,
 )
+from pdl_api.models.exceptions import PDLDeadlineException as PDLDeadlineException
 from pdl_api.models.exceptions import PDLException as PDLException
+from pdl_api.models.exceptions import PDLTransientException as PDLTransientException
 from pdl_api.models.exceptions import PDLUnknownException as PDLUnknownException
 from pdl_api.models.person import Certification as Certification
+from pdl_api.models.person import Company as Company
 from pdl_api.models.person import Education as Education
 from pdl_api.models.person import Email as Email
 from pdl_api.models.person import Experience as Experience
 from pdl_api.models.person import ExperienceTitle as ExperienceTitle
 from pdl_api.models.person import Location as Location
 from pdl_api.models.person import Person as Person
+from pdl_api.models.response import CompanyResponse as CompanyResponse
 from pdl_api.models.response import ErrorResponse as ErrorResponse
 from pdl_api.models.response import Response as Response
 from pdl_api.person_api import APIType as APIType
 from pdl_api.person_api import PDLPersonAPI as PDLPersonAPI
 from pdl_api.person_api import PDLSettings as PDLSettings
+from pdl_api.refresh import Freshness as Freshness
+from pdl_api.refresh import Refresher as Refresher
+from pdl_api.scheduler import Scheduler as Scheduler
+from pdl_api.scheduler import SchedulerStatus as SchedulerStatus
 
 __all__ = [
     "APIType",
+    "AsyncPDLPersonAPI",
+    "CacheBackend",
+    "CacheStats",
     "Certification",
+    "Company",
+    "CompanyResponse",
     "Education",
     "Email",
     "ErrorResponse",
     "Experience",
     "ExperienceTitle",
+    "Freshness",
+    "IndexedCache",
+    "Interner",
+    "LocalIndex",
+    "LocalResult",
+    "LRUCache",
     "Location",
+    "Metrics",
+    "NegativeCache",
     "PDLAccountLimitException",
+    "PDLCompanyAPI",
+    "PDLDeadlineException",
     "PDLException",
     "PDLPersonAPI",
     "PDLSettings",
+    "PDLTransientException",
     "PDLUnknownException",
     "Person",
+    "PrometheusMetrics",
+    "RedisCache",
+    "Refresher",
     "Response",
+    "Scheduler",
+    "SchedulerStatus",
+    "ShardedCache",
+    "SnapshotCache",
+    "SQLiteCache",
 ]
@@ -0,0 +1,256 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, TypeVar
+
+from pdl_api.cache.memory import LRUCache, ShardedCache
+from pdl_api.keys import query_key
+from pdl_api.models.exceptions import PDLTransientException
+from pdl_api.models.response import Response
+from pdl_api.person_api import APIType, PDLPersonAPI, response_json
+from pdl_api.rate_limit import RETRY_STATUSES, backoff
+
+if TYPE_CHECKING:
+    import httpx
+
+T = TypeVar("T")
+
+
+@dataclass
+class AsyncPDLPersonAPI(PDLPersonAPI):
+    """asyncio counterpart of PDLPersonAPI sharing its cache and Response handling.
+
+    Requests go through one pooled `httpx.AsyncClient` and at most
+    `settings.max_concurrency` are in flight at once. Concurrent calls for the same
+    query key wait on the single in-flight request instead of each spending a credit.
+    Lookups and writes of a cache doing I/O (SQLiteCache, RedisCache, SnapshotCache)
+    run in a worker thread so they don't block the event loop.
+    Requires the `async` extra (httpx).
+    """
+
+    ## Shared async HTTP client, created on first use
+    http_client: Optional["httpx.AsyncClient"] = None
+
+    ## Created in the running loop on first use, and again if the loop changes
+    _semaphore: Optional[asyncio.Semaphore] = field(init=False, repr=False, default=None)
+    _semaphore_loop: Optional[asyncio.AbstractEventLoop] = field(init=False, repr=False, default=None)
+    _inflight: dict[str, asyncio.Future] = field(init=False, repr=False, default_factory=dict)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.settings.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    @property
+    def _blocking_cache(self) -> bool:
+        """Whether existing_queries does disk or network I/O, unlike the in-memory caches"""
+        return not isinstance(self.existing_queries, (dict, LRUCache, ShardedCache))
+
+    async def _acache(self, call: Callable[..., T], *args, **kwargs) -> T:
+        """Run a cache lookup or write, in a thread if the cache blocks"""
+        if self._blocking_cache:
+            return await asyncio.to_thread(call, *args, **kwargs)
+        return call(*args, **kwargs)
+
+    def _get_http_client(self) -> "httpx.AsyncClient":
+        if self.http_client is None:
+            import httpx
+
+            if not self.client:
+                raise ValueError("AsyncPDLPersonAPI: Client not initialized")
+            limits = httpx.Limits(
+                max_connections=self.settings.max_concurrency,
+                max_keepalive_connections=self.settings.max_concurrency,
+            )
+            self.http_client = httpx.AsyncClient(
+                base_url=f"{self.client.base_path}/",
+                headers={"X-Api-Key": self.client.api_key, "Accept-Encoding": "gzip"},
+                limits=limits,
+                timeout=self.settings.timeout,
+            )
+        return self.http_client
+
+    async def aclose(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        self.close()
+
+    async def __aenter__(self) -> "AsyncPDLPersonAPI":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _awith_retries(self, call: Callable[[], Awaitable["httpx.Response"]]) -> "httpx.Response":
+        """Async `_with_retries`, sharing the instance's rate limiter"""
+        import httpx
+
+        s = self.settings
+        for attempt in range(s.max_retries + 1):
+            await asyncio.sleep(self.rate_limiter.reserve())
+            try:
+                r = await call()
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if attempt == s.max_retries:
+                    raise PDLTransientException({}, str(e)) from e
+                await asyncio.sleep(backoff(attempt, s.backoff_base, s.backoff_max))
+                continue
+            self.rate_limiter.update(r.headers)
+            if r.status_code not in RETRY_STATUSES or attempt == s.max_retries:
+                return r
+            retry_after = r.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                self.rate_limiter.pause(float(retry_after))
+            else:
+                await asyncio.sleep(backoff(attempt, s.backoff_base, s.backoff_max))
+        raise AssertionError("unreachable")
+
+    async def _aget_response(self, params: dict[str, Any]) -> dict[str, Any] | bytes:
+        http = self._get_http_client()
+        self.metrics.api_call(self.settings.query_type)
+        with self.metrics.time("network"):
+            if self.settings.query_type == APIType.ENRICH:
+                r = await self._awith_retries(lambda: http.get("person/enrich", params=params))
+                if r.status_code == 200:
+                    return r.content
+            else:
+                r = await self._awith_retries(lambda: http.post("person/search", json=params))
+        return response_json(r)
+
+    async def _aget_bulk_response(self, list_params: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        http = self._get_http_client()
+        requests = [{"params": params} for params in list_params]
+        self.metrics.api_call("bulk")
+        with self.metrics.time("network"):
+            r = await self._awith_retries(lambda: http.post("person/bulk", json={"requests": requests}))
+        json_response = response_json(r)
+        if isinstance(json_response, dict):
+            ## The whole call failed, e.g. a 402 for the account
+            return [json_response] * len(list_params)
+        return json_response
+
+    def _start_flight(self, hsh: str) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[hsh] = fut
+        return fut
+
+    async def _finish_flight(
+        self,
+        hsh: str,
+        params: dict[str, Any],
+        record: Optional[dict[str, Any] | bytes],
+        use_cache: bool,
+        error: Optional[BaseException] = None,
+    ):
+        """Turn an API record into a Response, cache it and wake up the waiters"""
+        fut = self._inflight[hsh]
+        pr = None
+        try:
+            if error is None and record is not None:
+                pr = self._to_response(params, record)
+                if use_cache or pr.is_error:
+                    await self._acache(self.save_queries, {hsh: pr})
+        except BaseException as e:
+            error, pr = e, None
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            ## only drop the flight once the save is done, so a caller arriving
+            ## in between finds the cached response instead of starting a new request
+            self._inflight.pop(hsh, None)
+            if pr is not None:
+                fut.set_result(pr)
+            else:
+                fut.set_exception(error or RuntimeError("AsyncPDLPersonAPI: no record returned"))
+                ## mark as retrieved so unawaited failures don't warn
+                fut.exception()
+
+    async def aget_person(
+        self, params: dict[str, Any], use_cache: bool = True, **find_kwargs
+    ) -> Response:
+        """Async `get_person`, coalescing concurrent calls for the same query"""
+        hsh = query_key(params)
+
+        if use_cache:
+            known = self._known_not_found(hsh, params)
+            if known:
+                return known
+            existing = await self._acache(self.find_existing_query, params=params, key=hsh, **find_kwargs)
+            if existing and self._serve(hsh, params, existing):
+                return existing
+
+        if hsh in self._inflight:
+            return await asyncio.shield(self._inflight[hsh])
+
+        fut = self._start_flight(hsh)
+        try:
+            async with self._get_semaphore():
+                record = await self._aget_response(params)
+        except BaseException as e:
+            await self._finish_flight(hsh, params, None, use_cache, error=e)
+            raise
+        await self._finish_flight(hsh, params, record, use_cache)
+        return fut.result()
+
+    async def _afetch_batch(self, chunk: list[tuple[str, dict[str, Any]]], use_cache: bool):
+        try:
+            async with self._get_semaphore():
+                records = await self._aget_bulk_response([params for _, params in chunk])
+        except BaseException as e:
+            for hsh, params in chunk:
+                await self._finish_flight(hsh, params, None, use_cache, error=e)
+            raise
+        for (hsh, params), record in zip(chunk, records):
+            await self._finish_flight(hsh, params, record, use_cache)
+
+    async def aget_people(
+        self, list_params: list[dict[str, Any]], use_cache: bool = True, **find_kwargs
+    ) -> list[Response]:
+        """Async `get_people`, bulk batches run concurrently up to `settings.max_concurrency`"""
+        if self.settings.query_type != APIType.ENRICH:
+            return list(
+                await asyncio.gather(
+                    *(self.aget_person(params, use_cache=use_cache, **find_kwargs) for params in list_params)
+                )
+            )
+
+        keys = [query_key(params) for params in list_params]
+        results: dict[str, Response] = {}
+        cached: dict[str, Optional[Response]] = {}
+        if use_cache:
+            lookups: dict[str, dict[str, Any]] = {}
+            for hsh, params in zip(keys, list_params):
+                if hsh in results or hsh in lookups:
+                    continue
+                known = self._known_not_found(hsh, params)
+                if known:
+                    results[hsh] = known
+                else:
+                    lookups[hsh] = params
+            ## one trip to a worker thread for all the lookups
+            cached = await self._acache(self._find_many, lookups, **find_kwargs)
+        futures: dict[str, asyncio.Future] = {}
+        missing: list[tuple[str, dict[str, Any]]] = []
+        for hsh, params in zip(keys, list_params):
+            if hsh in results or hsh in futures:
+                continue
+            existing = cached.get(hsh)
+            if existing and self._serve(hsh, params, existing):
+                results[hsh] = existing
+            elif hsh in self._inflight:
+                futures[hsh] = self._inflight[hsh]
+            else:
+                futures[hsh] = self._start_flight(hsh)
+                missing.append((hsh, params))
+
+        size = self.settings.bulk_size
+        batches = [missing[i : i + size] for i in range(0, len(missing), size)]
+        await asyncio.gather(
+            *(self._afetch_batch(chunk, use_cache) for chunk in batches), return_exceptions=True
+        )
+        for hsh, fut in futures.items():
+            ## raises the first per-record 402/404 like get_people
+            results[hsh] = await asyncio.shield(fut)
+        return [results[hsh] for hsh in keys]
@@ -0,0 +1,23 @@
+from pdl_api.cache.base import CacheBackend as CacheBackend
+from pdl_api.cache.base import IndexedCache as IndexedCache
+from pdl_api.cache.memory import CacheStats as CacheStats
+from pdl_api.cache.memory import LRUCache as LRUCache
+from pdl_api.cache.memory import ShardedCache as ShardedCache
+from pdl_api.cache.negative import NegativeCache as NegativeCache
+from pdl_api.cache.redis import RedisCache as RedisCache
+from pdl_api.cache.snapshot import SnapshotCache as SnapshotCache
+from pdl_api.cache.snapshot import write_snapshot as write_snapshot
+from pdl_api.cache.sqlite import SQLiteCache as SQLiteCache
+
+__all__ = [
+    "CacheBackend",
+    "CacheStats",
+    "IndexedCache",
+    "LRUCache",
+    "NegativeCache",
+    "RedisCache",
+    "ShardedCache",
+    "SnapshotCache",
+    "SQLiteCache",
+    "write_snapshot",
+]
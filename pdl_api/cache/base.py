@@ -0,0 +1,73 @@
+import functools
+from typing import Any, Callable, Iterable, Mapping, Optional, Protocol, runtime_checkable
+
+from pdl_api.keys import response_identifiers
+from pdl_api.models.response import Response
+
+
+@runtime_checkable
+class IndexedCache(Protocol):
+    """A MutableMapping[str, Response] cache that maintains its own identifier index.
+    PDLPersonAPI uses `lookup` instead of building `identity_index` in memory
+    when `existing_queries` is one of these.
+    """
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        ...
+
+
+@runtime_checkable
+class CacheBackend(IndexedCache, Protocol):
+    """An IndexedCache that can also read and write in batches, e.g. a shared
+    RedisCache. PDLPersonAPI uses `get_many`, `lookup_many` and `put_many` to save
+    round trips.
+    """
+
+    def get(self, key: str, default: Optional[Response] = None) -> Optional[Response]:
+        ...
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Response]:
+        """The cached responses of the keys that are present"""
+        ...
+
+    def put_many(self, items: Mapping[str, Response]):
+        ...
+
+    def lookup_many(self, identifiers: Iterable[str]) -> dict[str, list[str]]:
+        """`lookup` for many identifiers at once"""
+        ...
+
+
+@functools.cache
+def _implements(cls: type, protocol: type) -> bool:
+    return issubclass(cls, protocol)
+
+
+def implements(obj: Any, protocol: type) -> bool:
+    """isinstance for a runtime_checkable Protocol, memoized by type as the
+    Protocol check itself is slow
+    """
+    return _implements(type(obj), protocol)
+
+
+## The identifiers a cached response can be found by, response_identifiers for persons
+Identifiers = Callable[[Any], list[str]]
+
+
+def index_add(index: dict[str, list[str]], key: str, r: Any, identifiers: Identifiers = response_identifiers):
+    """Add the identifiers of a response to an identifier -> keys index"""
+    for ident in identifiers(r):
+        keys = index.setdefault(ident, [])
+        if key not in keys:
+            keys.append(key)
+
+
+def index_remove(index: dict[str, list[str]], key: str, r: Any, identifiers: Identifiers = response_identifiers):
+    """Remove the identifiers of a response from an identifier -> keys index"""
+    for ident in identifiers(r):
+        keys = index.get(ident)
+        if keys and key in keys:
+            keys.remove(key)
+            if not keys:
+                del index[ident]
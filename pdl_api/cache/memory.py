@@ -0,0 +1,237 @@
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterator, MutableMapping, Optional
+
+from pydantic import BaseModel
+
+from pdl_api.cache.base import Identifiers, index_add, index_remove
+from pdl_api.keys import response_identifiers
+from pdl_api.models.response import Response, utcnow
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def approx_size(r: Response) -> int:
+    """Approximate memory footprint of a response, from the length of the JSON it was
+    decoded from if known, else estimated from its fields without serializing it or
+    loading lazy fields
+    """
+    hint = getattr(r, "_size", None)
+    return hint.value if hint is not None and hint.value is not None else _estimate(r)
+
+
+def _estimate(value: Any) -> int:
+    """Roughly the JSON length of a value, models and raw data alike"""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(len(k) + 4 + _estimate(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return 2 + sum(_estimate(v) + 1 for v in value)
+    if isinstance(value, BaseModel):
+        fields = value.__dict__
+        raw = getattr(value, "_raw", None)
+        return _estimate({**fields, **raw} if raw else fields)
+    if isinstance(value, datetime):
+        return 34
+    return 6
+
+
+class LRUCache(MutableMapping[str, Response]):
+    """Bounded in-memory response cache, a drop-in for the `existing_queries` dict.
+
+    Entries are evicted least recently used first once `max_entries` or the
+    approximate `max_bytes` budget is exceeded. Successful responses expire after
+    `ttl` seconds and `not_found` responses after `not_found_ttl` seconds, counted
+    from `Response.query_time`. The identifier index is maintained here so evicted
+    entries drop out of it too, `identifiers` gives those of a response, e.g.
+    company_response_identifiers to cache CompanyResponses.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        not_found_ttl: Optional[float] = None,
+        identifiers: Identifiers = response_identifiers,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = timedelta(seconds=ttl) if ttl is not None else None
+        self.not_found_ttl = timedelta(seconds=not_found_ttl) if not_found_ttl is not None else None
+        self.identifiers = identifiers
+        self.stats = CacheStats()
+        self.nbytes = 0
+        self._data: OrderedDict[str, tuple[Response, int]] = OrderedDict()
+        self._index: dict[str, list[str]] = {}
+        self._lock = threading.RLock()
+
+    def _expired(self, r: Response) -> bool:
+        is_not_found = r.error is not None and r.error.type == "not_found"
+        ttl = self.not_found_ttl if is_not_found else self.ttl
+        return ttl is not None and utcnow() - r.query_time > ttl
+
+    def _remove(self, key: str) -> Response:
+        r, size = self._data.pop(key)
+        self.nbytes -= size
+        index_remove(self._index, key, r, self.identifiers)
+        return r
+
+    def __getitem__(self, key: str) -> Response:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                raise KeyError(key)
+            r = entry[0]
+            if self._expired(r):
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                raise KeyError(key)
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return r
+
+    def __setitem__(self, key: str, value: Response):
+        size = approx_size(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size)
+            self.nbytes += size
+            index_add(self._index, key, value, self.identifiers)
+            self._evict()
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._data)))
+            self.stats.evictions += 1
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            entry = self._data.get(key)  # type: ignore[call-overload]
+            return entry is not None and not self._expired(entry[0])
+
+    def _live(self) -> list[tuple[str, Response]]:
+        """The unexpired entries, least recently used first, without counting hits
+        or touching their recency
+        """
+        with self._lock:
+            if self.ttl is None and self.not_found_ttl is None:
+                return [(k, r) for k, (r, _) in self._data.items()]
+            return [(k, r) for k, (r, _) in self._data.items() if not self._expired(r)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([k for k, _ in self._live()])
+
+    def __len__(self) -> int:
+        """Unexpired entries, O(n) with a ttl"""
+        if self.ttl is None and self.not_found_ttl is None:
+            return len(self._data)
+        return len(self._live())
+
+    def items(self) -> list[tuple[str, Response]]:  # type: ignore[override]
+        return self._live()
+
+    def values(self) -> list[Response]:  # type: ignore[override]
+        return [r for _, r in self._live()]
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        with self._lock:
+            return list(self._index.get(identifier, ()))
+
+
+class ShardedCache(MutableMapping[str, Response]):
+    """Thread-safe cache split into `shards` independently locked LRUCaches.
+    Threads touching different keys rarely contend for the same lock.
+    Bounds are per shard, `max_entries` and `max_bytes` are split evenly across them.
+    """
+
+    def __init__(
+        self,
+        shards: int = 16,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        not_found_ttl: Optional[float] = None,
+        identifiers: Identifiers = response_identifiers,
+    ):
+        self.shards = [
+            LRUCache(
+                max_entries=-(-max_entries // shards) if max_entries is not None else None,
+                max_bytes=-(-max_bytes // shards) if max_bytes is not None else None,
+                ttl=ttl,
+                not_found_ttl=not_found_ttl,
+                identifiers=identifiers,
+            )
+            for _ in range(shards)
+        ]
+
+    def _shard(self, key: str) -> LRUCache:
+        return self.shards[zlib.crc32(key.encode()) % len(self.shards)]
+
+    @property
+    def stats(self) -> CacheStats:
+        stats = CacheStats()
+        for shard in self.shards:
+            stats.hits += shard.stats.hits
+            stats.misses += shard.stats.misses
+            stats.evictions += shard.stats.evictions
+            stats.expirations += shard.stats.expirations
+        return stats
+
+    def __getitem__(self, key: str) -> Response:
+        return self._shard(key)[key]
+
+    def __setitem__(self, key: str, value: Response):
+        self._shard(key)[key] = value
+
+    def __delitem__(self, key: str):
+        del self._shard(key)[key]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self._shard(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for shard in self.shards:
+            yield from shard
+
+    def items(self) -> list[tuple[str, Response]]:  # type: ignore[override]
+        return [item for shard in self.shards for item in shard.items()]
+
+    def values(self) -> list[Response]:  # type: ignore[override]
+        return [r for shard in self.shards for r in shard.values()]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        keys = []
+        for shard in self.shards:
+            keys.extend(shard.lookup(identifier))
+        return keys
@@ -0,0 +1,196 @@
+import hashlib
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+## Slot markers, real hashes are shifted above them
+EMPTY = 0
+DELETED = 1
+## Bloom filter hashes per key
+BLOOM_HASHES = 4
+
+
+def key_hash(key: str) -> int:
+    h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return h if h > DELETED else h + 2
+
+
+@dataclass
+class NegativeStats:
+    hits: int = 0
+    misses: int = 0
+    ## Misses rejected by the Bloom filter without probing the table
+    filtered: int = 0
+    expirations: int = 0
+
+
+class NegativeCache:
+    """Compact set of query keys known to be `not_found`.
+
+    Each key is stored as a 64-bit hash with a 32-bit expiry (epoch seconds, 0 for
+    none), the time it was queried and the number of its error message (the few
+    distinct messages are kept once) in open-addressed arrays, plus a byte of Bloom
+    filter, 23 bytes per slot at a load of at most 3/4. The Bloom filter is checked first, without the lock,
+    so most keys that were never added are rejected before touching the table.
+    Entries expire `ttl` seconds after they're added, if set.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, capacity: int = 1024):
+        self.ttl = ttl
+        self.stats = NegativeStats()
+        self._lock = threading.Lock()
+        ## Error messages by number, 0 for none
+        self._messages: list[str] = [""]
+        self._message_ids: dict[str, int] = {"": 0}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        slots = 16
+        while slots < capacity:
+            slots *= 2
+        self._mask = slots - 1
+        self._hashes = array("Q", bytes(8 * slots))
+        self._expires = array("I", bytes(4 * slots))
+        self._times = array("d", bytes(8 * slots))
+        self._message_nums = array("H", bytes(2 * slots))
+        ## swapped as one tuple, so lock-free readers never mix two generations
+        self._filter = (bytearray(slots), slots * 8 - 1)
+        self._used = 0
+        self._size = 0
+
+    @staticmethod
+    def _bits(h: int, mask: int) -> list[int]:
+        h1, h2 = h >> 32, (h & 0xFFFFFFFF) | 1
+        return [(h1 + i * h2) & mask for i in range(BLOOM_HASHES)]
+
+    def _maybe(self, h: int) -> bool:
+        bloom, mask = self._filter
+        for bit in self._bits(h, mask):
+            if not bloom[bit >> 3] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _find(self, h: int) -> int:
+        hashes, mask = self._hashes, self._mask
+        i = h & mask
+        while True:
+            v = hashes[i]
+            if v == h:
+                return i
+            if v == EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def _message_id(self, message: str) -> int:
+        i = self._message_ids.get(message)
+        if i is None:
+            if len(self._messages) > 0xFFFF:
+                return 0
+            i = self._message_ids[message] = len(self._messages)
+            self._messages.append(message)
+        return i
+
+    def _insert(self, h: int, expires: int, queried: float, message: int):
+        hashes, mask = self._hashes, self._mask
+        i = h & mask
+        while hashes[i] > DELETED:
+            i = (i + 1) & mask
+        if hashes[i] == EMPTY:
+            self._used += 1
+        hashes[i] = h
+        self._expires[i] = expires
+        self._times[i] = queried
+        self._message_nums[i] = message
+        self._size += 1
+        bloom, bloom_mask = self._filter
+        for bit in self._bits(h, bloom_mask):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+
+    def _resize(self):
+        """Rebuild without deleted and expired entries, at twice the live size"""
+        now = time.time()
+        live = [
+            entry
+            for entry in zip(self._hashes, self._expires, self._times, self._message_nums)
+            if entry[0] > DELETED and (not entry[1] or entry[1] > now)
+        ]
+        self.stats.expirations += self._size - len(live)
+        self._allocate((len(live) + 1) * 2)
+        for entry in live:
+            self._insert(*entry)
+
+    def add(self, key: str, ttl: Optional[float] = None, queried: Optional[float] = None, message: str = ""):
+        """Remember `key` as not found, for `ttl` seconds or the cache's default.
+        `queried` (epoch seconds, default now) and `message` are returned by `get`.
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires = int(now + ttl) + 1 if ttl is not None else 0
+        queried = now if queried is None else queried
+        h = key_hash(key)
+        with self._lock:
+            message_id = self._message_id(message)
+            i = self._find(h)
+            if i >= 0:
+                self._expires[i] = expires
+                self._times[i] = queried
+                self._message_nums[i] = message_id
+                return
+            if (self._used + 1) * 4 > (self._mask + 1) * 3:
+                self._resize()
+            self._insert(h, expires, queried, message_id)
+
+    def get(self, key: str) -> Optional[tuple[float, str]]:
+        """When `key` was queried and its error message, or None if it isn't known"""
+        h = key_hash(key)
+        if not self._maybe(h):
+            self.stats.filtered += 1
+            return None
+        with self._lock:
+            i = self._find(h)
+            if i < 0:
+                self.stats.misses += 1
+                return None
+            expires = self._expires[i]
+            if expires and expires <= time.time():
+                self._hashes[i] = DELETED
+                self._size -= 1
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return self._times[i], self._messages[self._message_nums[i]]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def discard(self, key: str):
+        h = key_hash(key)
+        if not self._maybe(h):
+            return
+        with self._lock:
+            i = self._find(h)
+            if i >= 0:
+                self._hashes[i] = DELETED
+                self._size -= 1
+
+    def __len__(self) -> int:
+        """Entries added and not removed, including expired ones not yet swept"""
+        return self._size
+
+    def purge(self):
+        """Drop expired entries and reclaim their slots"""
+        with self._lock:
+            self._resize()
+
+    def clear(self):
+        with self._lock:
+            self._allocate(16)
+
+    @property
+    def nbytes(self) -> int:
+        slots = self._mask + 1
+        itemsize = self._hashes.itemsize + self._expires.itemsize + self._times.itemsize + self._message_nums.itemsize
+        return slots * (itemsize + 1)
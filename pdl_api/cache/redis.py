@@ -0,0 +1,311 @@
+import socket
+import threading
+import zlib
+from typing import Any, Iterable, Iterator, Mapping, MutableMapping, Optional, Sequence
+from urllib.parse import unquote, urlparse
+
+from pdl_api.cache.base import Identifiers
+from pdl_api.keys import response_identifiers
+from pdl_api.models.decode import loads
+from pdl_api.models.response import Response, utcnow
+
+
+class RedisError(Exception):
+    """An error reply from the server"""
+
+
+class RedisConnection:
+    """A minimal Redis protocol (RESP2) client with pipelining, no dependencies.
+
+    Commands are sent from one socket guarded by a lock, so an instance can be
+    shared between threads. The connection is reopened once if it was dropped.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        timeout: Optional[float] = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file: Any = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisConnection":
+        """From a redis://[:password@]host[:port][/db] url"""
+        u = urlparse(url)
+        if u.scheme != "redis":
+            raise ValueError(f"Unsupported cache url {url!r}, expected redis://")
+        db = int(u.path.lstrip("/") or 0)
+        password = unquote(u.password) if u.password else None
+        return cls(u.hostname or "127.0.0.1", u.port or 6379, db, password, **kwargs)
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        setup: list[Sequence[Any]] = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send(setup)
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._file.close()
+                self._sock.close()
+                self._sock = None
+
+    @staticmethod
+    def _encode(args: Sequence[Any]) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read(self) -> Any:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self._file.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            if n < 0:
+                return None
+            return [self._read() for _ in range(n)]
+        raise ConnectionError(f"Unexpected reply {line!r}")
+
+    def _send(self, commands: Sequence[Sequence[Any]]) -> list[Any]:
+        self._sock.sendall(b"".join(self._encode(c) for c in commands))  # type: ignore[union-attr]
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands: Sequence[Sequence[Any]]) -> list[Any]:
+        """Send all commands in one write and read their replies, one round trip"""
+        if not commands:
+            return []
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(commands)
+                except (ConnectionError, OSError):
+                    if self._sock is not None:
+                        self._file.close()
+                        self._sock.close()
+                        self._sock = None
+                    if attempt:
+                        raise
+        raise AssertionError("unreachable")
+
+    def execute(self, *args: Any) -> Any:
+        return self.pipeline([args])[0]
+
+
+## Separates the identifiers stored beside a response, they never contain it
+_SEP = "\x1f"
+
+
+class RedisCache(MutableMapping[str, Response]):
+    """Response cache shared by every process and node using the same Redis server.
+
+    Responses are stored under `<prefix>r:<key>` as zlib-compressed JSON without
+    None fields, their identifiers beside them under `<prefix>k:<key>` and the keys
+    of each identifier in a set under `<prefix>i:<identifier>`. not_found responses expire `not_found_ttl` and others
+    `ttl` seconds after their query_time, if set. `get_many` and `put_many` take one
+    round trip however many keys they're given. `model` and `identifiers` are the
+    response type and its identifiers, e.g. CompanyResponse and
+    company_response_identifiers under their own `prefix`.
+    """
+
+    def __init__(
+        self,
+        connection: Optional[RedisConnection] = None,
+        prefix: str = "pdl:",
+        ttl: Optional[float] = None,
+        not_found_ttl: Optional[float] = None,
+        compress: bool = True,
+        lazy: bool = True,
+        model: Any = Response,
+        identifiers: Identifiers = response_identifiers,
+    ):
+        self.connection = connection or RedisConnection()
+        self.prefix = prefix
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.compress = compress
+        ## only Response parses lazily
+        self.lazy = lazy and hasattr(model, "model_validate_lazy")
+        self.model = model
+        self.identifiers = identifiers
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        return cls(RedisConnection.from_url(url), **kwargs)
+
+    def _rkey(self, key: str) -> str:
+        return f"{self.prefix}r:{key}"
+
+    def _ikey(self, identifier: str) -> str:
+        return f"{self.prefix}i:{identifier}"
+
+    def _kkey(self, key: str) -> str:
+        return f"{self.prefix}k:{key}"
+
+    def _old_identifiers(self, keys: list[str]) -> list[list[str]]:
+        """The identifiers stored for the keys, in one round trip. Only entries written
+        before they were stored beside the response are read and decoded, in one more
+        """
+        replies = self.connection.pipeline(
+            [("MGET", *(self._kkey(k) for k in keys)), *(("EXISTS", self._rkey(k)) for k in keys)]
+        )
+        stored = replies[0]
+        legacy = [k for k, v, exists in zip(keys, stored, replies[1:]) if v is None and exists]
+        values = dict(zip(legacy, self.connection.execute("MGET", *(self._rkey(k) for k in legacy)))) if legacy else {}
+        old = []
+        for key, value in zip(keys, stored):
+            if value is not None:
+                old.append(value.decode().split(_SEP) if value else [])
+            elif values.get(key) is not None:
+                old.append(self.identifiers(self.decode(values[key])))
+            else:
+                old.append([])
+        return old
+
+    def encode(self, r: Response) -> bytes:
+        data = r.model_dump_json(exclude_none=True).encode()
+        if self.compress:
+            return b"z" + zlib.compress(data, 1)
+        return b"j" + data
+
+    def decode(self, value: bytes) -> Response:
+        data = zlib.decompress(value[1:]) if value[:1] == b"z" else value[1:]
+        if self.lazy:
+            return self.model.model_validate_lazy(loads(data))
+        return self.model.model_validate_json(data)
+
+    def _ttl_ms(self, r: Response) -> Optional[int]:
+        """Milliseconds left until the response expires, counted from its query_time like LRUCache"""
+        is_not_found = r.error is not None and r.error.type == "not_found"
+        ttl = self.not_found_ttl if is_not_found else self.ttl
+        if ttl is None:
+            return None
+        age = (utcnow() - r.query_time).total_seconds()
+        return max(1, int((ttl - age) * 1000))
+
+    def get(self, key: str, default: Optional[Response] = None) -> Optional[Response]:  # type: ignore[override]
+        value = self.connection.execute("GET", self._rkey(key))
+        return default if value is None else self.decode(value)
+
+    def __getitem__(self, key: str) -> Response:
+        r = self.get(key)
+        if r is None:
+            raise KeyError(key)
+        return r
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Response]:
+        """The cached responses of the keys that are present, with one MGET"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.connection.execute("MGET", *(self._rkey(k) for k in keys))
+        return {k: self.decode(v) for k, v in zip(keys, values) if v is not None}
+
+    def put_many(self, items: Mapping[str, Response]):
+        """Store responses and index their identifiers, in two round trips: one to
+        read the identifiers of the replaced entries, so the stale ones are dropped
+        """
+        if not items:
+            return
+        keys = list(items)
+        commands: list[tuple[Any, ...]] = []
+        ## only successful responses are indexed, and they expire after ttl
+        index_ttl = None if self.ttl is None else max(1, int(self.ttl * 1000))
+        for key, old_idents in zip(keys, self._old_identifiers(keys)):
+            r = items[key]
+            new_idents = self.identifiers(r)
+            for ident in old_idents:
+                if ident not in new_idents:
+                    commands.append(("SREM", self._ikey(ident), key))
+            ttl = self._ttl_ms(r)
+            expiry = () if ttl is None else ("PX", ttl)
+            commands.append(("SET", self._rkey(key), self.encode(r), *expiry))
+            commands.append(("SET", self._kkey(key), _SEP.join(new_idents), *expiry))
+            for ident in new_idents:
+                commands.append(("SADD", self._ikey(ident), key))
+                ## the index outlives its entries by at most one ttl
+                if index_ttl is not None:
+                    commands.append(("PEXPIRE", self._ikey(ident), index_ttl))
+        self.connection.pipeline(commands)
+
+    def __setitem__(self, key: str, value: Response):
+        self.put_many({key: value})
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        commands: list[tuple[Any, ...]] = [("DEL", self._rkey(key), self._kkey(key))]
+        for ident in self._old_identifiers([key])[0]:
+            commands.append(("SREM", self._ikey(ident), key))
+        self.connection.pipeline(commands)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and bool(self.connection.execute("EXISTS", self._rkey(key)))
+
+    def __iter__(self) -> Iterator[str]:
+        start = len(self._rkey(""))
+        cursor = b"0"
+        while True:
+            cursor, keys = self.connection.execute("SCAN", cursor, "MATCH", self._rkey("*"), "COUNT", 1000)
+            for k in keys:
+                yield k[start:].decode()
+            if cursor == b"0":
+                return
+
+    def __len__(self) -> int:
+        """Counts the entries with SCAN, O(n)"""
+        return sum(1 for _ in self)
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        return sorted(k.decode() for k in self.connection.execute("SMEMBERS", self._ikey(identifier)))
+
+    def lookup_many(self, identifiers: Iterable[str]) -> dict[str, list[str]]:
+        """`lookup` for many identifiers, with one pipeline of SMEMBERS"""
+        identifiers = list(identifiers)
+        replies = self.connection.pipeline([("SMEMBERS", self._ikey(i)) for i in identifiers])
+        return {i: sorted(k.decode() for k in keys) for i, keys in zip(identifiers, replies)}
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,426 @@
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Iterator, Mapping, MutableMapping, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    ## Windows, compactions aren't serialized between processes
+    fcntl = None  # type: ignore[assignment]
+
+from pdl_api.cache.base import IndexedCache, index_add, index_remove
+from pdl_api.keys import response_identifiers
+from pdl_api.models.decode import loads
+from pdl_api.models.response import Response
+
+## File layout, little endian, tables 8 byte aligned:
+##   header       magic, key count, identifier count and the offsets of the tables
+##   key hashes   u64 per key, sorted
+##   key table    (key offset, key length, data offset, data length) in key hash order
+##   blob         keys, each followed by its response JSON, then the identifiers
+##   ident hashes u64 per (identifier, key) pair, sorted
+##   ident table  (identifier offset, identifier length, key number) in identifier hash order
+## Lookups bisect the hash arrays in C through a memoryview of the mapping.
+MAGIC = b"PDLSNAP2"
+HEADER = struct.Struct("<8sIIQQQQ")
+KEY_ENTRY = struct.Struct("<QQQQ")
+IDENT_ENTRY = struct.Struct("<QQQ")
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class Snapshot:
+    """A read-only snapshot file, memory-mapped so forked workers share its pages"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            self.n_keys,
+            self.n_idents,
+            key_hashes_off,
+            self._keys_off,
+            ident_hashes_off,
+            self._idents_off,
+        ) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a PDL cache snapshot")
+        self._key_hashes = self._u64(key_hashes_off, self.n_keys)
+        self._ident_hashes = self._u64(ident_hashes_off, self.n_idents)
+
+    def _u64(self, off: int, n: int) -> Sequence[int]:
+        if sys.byteorder == "little":
+            return memoryview(self._mm)[off : off + 8 * n].cast("Q")
+        values = array("Q", self._mm[off : off + 8 * n])  # pragma: no cover
+        values.byteswap()  # pragma: no cover
+        return values  # pragma: no cover
+
+    def _entry(self, i: int) -> tuple[int, int, int, int]:
+        return KEY_ENTRY.unpack_from(self._mm, self._keys_off + i * KEY_ENTRY.size)
+
+    def key(self, i: int) -> str:
+        off, length, _, _ = self._entry(i)
+        return self._mm[off : off + length].decode()
+
+    def find(self, key: str) -> int:
+        """The number of `key`, -1 if it isn't in the snapshot"""
+        target = key.encode()
+        h = _hash(target)
+        i = bisect.bisect_left(self._key_hashes, h)
+        while i < self.n_keys and self._key_hashes[i] == h:
+            off, length, _, _ = self._entry(i)
+            if self._mm[off : off + length] == target:
+                return i
+            i += 1
+        return -1
+
+    def data(self, i: int) -> bytes:
+        _, _, off, length = self._entry(i)
+        return self._mm[off : off + length]
+
+    def keys(self) -> Iterator[str]:
+        for i in range(self.n_keys):
+            yield self.key(i)
+
+    def _ident(self, j: int) -> tuple[bytes, int]:
+        off, length, i = IDENT_ENTRY.unpack_from(self._mm, self._idents_off + j * IDENT_ENTRY.size)
+        return self._mm[off : off + length], i
+
+    def lookup(self, identifier: str) -> list[int]:
+        """Numbers of the keys whose response matches a normalized identifier"""
+        target = identifier.encode()
+        h = _hash(target)
+        j = bisect.bisect_left(self._ident_hashes, h)
+        found = []
+        while j < self.n_idents and self._ident_hashes[j] == h:
+            ident, i = self._ident(j)
+            if ident == target:
+                found.append(i)
+            j += 1
+        return found
+
+    def identifiers(self) -> Iterator[tuple[int, bytes, int]]:
+        """(hash, identifier, key number) for every identifier"""
+        for j in range(self.n_idents):
+            ident, i = self._ident(j)
+            yield self._ident_hashes[j], ident, i
+
+    def key_hash(self, i: int) -> int:
+        return self._key_hashes[i]
+
+    def close(self):
+        if isinstance(self._key_hashes, memoryview):
+            self._key_hashes.release()
+            self._ident_hashes.release()  # type: ignore[union-attr]
+        self._mm.close()
+
+
+def _le_bytes(values: array) -> bytes:
+    """Little endian bytes of an array("Q")"""
+    if sys.byteorder == "big":  # pragma: no cover
+        values = array("Q", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _pad(f, pos: int) -> int:
+    """Pad the file to 8 byte alignment"""
+    padding = -pos % 8
+    f.write(b"\0" * padding)
+    return pos + padding
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on `path`.lock, held by a process while it replaces the snapshot"""
+    with open(f"{path}.lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def write_snapshot(path: str, cache: Mapping[str, Response]) -> int:
+    """Write the entries of `cache` as a snapshot at `path`, returning their number.
+
+    The file is written next to `path` and renamed over it, so processes with the
+    old snapshot open keep reading it until they `refresh()`. Entries of a
+    SnapshotCache that weren't changed are copied without deserializing them.
+    """
+    ## (hash, key, number in the source snapshot or -1)
+    entries: list[tuple[int, bytes, int]] = []
+    ## key number in the source snapshot -> its (hash, identifier)s
+    copied: dict[int, list[tuple[int, bytes]]] = {}
+    source = cache if isinstance(cache, SnapshotCache) else None
+    if source is not None and source.snapshot is not None:
+        snapshot = source.snapshot
+        for h, ident, i in snapshot.identifiers():
+            copied.setdefault(i, []).append((h, ident))
+        for i in range(snapshot.n_keys):
+            key = snapshot.key(i)
+            if key not in source._deleted and key not in source.overlay:
+                entries.append((snapshot.key_hash(i), key.encode(), i))
+        for key in source.overlay:
+            kb = key.encode()
+            entries.append((_hash(kb), kb, -1))
+    else:
+        for key in cache:
+            kb = key.encode()
+            entries.append((_hash(kb), kb, -1))
+    entries.sort()
+
+    table = array("Q")
+    identifiers: list[tuple[int, bytes, int]] = []
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        key_hashes_off = HEADER.size
+        keys_off = key_hashes_off + 8 * len(entries)
+        pos = keys_off + KEY_ENTRY.size * len(entries)
+        f.seek(pos)
+        for n, (_, kb, i) in enumerate(entries):
+            if i >= 0:
+                data = source.snapshot.data(i)  # type: ignore[union-attr]
+                identifiers.extend((h, ib, n) for h, ib in copied.get(i, ()))
+            else:
+                r = cache[kb.decode()]
+                data = r.model_dump_json().encode()
+                for ident in response_identifiers(r):
+                    ib = ident.encode()
+                    identifiers.append((_hash(ib), ib, n))
+            f.write(kb)
+            f.write(data)
+            table.extend((pos, len(kb), pos + len(kb), len(data)))
+            pos += len(kb) + len(data)
+        identifiers.sort()
+        ident_table = array("Q")
+        for _, ib, n in identifiers:
+            f.write(ib)
+            ident_table.extend((pos, len(ib), n))
+            pos += len(ib)
+        ident_hashes_off = pos = _pad(f, pos)
+        f.write(_le_bytes(array("Q", [h for h, _, _ in identifiers])))
+        idents_off = ident_hashes_off + 8 * len(identifiers)
+        f.write(_le_bytes(ident_table))
+        f.seek(key_hashes_off)
+        f.write(_le_bytes(array("Q", [h for h, _, _ in entries])))
+        f.write(_le_bytes(table))
+        f.seek(0)
+        f.write(
+            HEADER.pack(MAGIC, len(entries), len(identifiers), key_hashes_off, keys_off, ident_hashes_off, idents_off)
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(entries)
+
+
+class SnapshotCache(MutableMapping[str, Response]):
+    """A read-only, memory-mapped snapshot with a writable per-process overlay.
+
+    Pre-forked workers open the same snapshot file and share its pages, each
+    response is only deserialized when it's looked up. New responses go to
+    `overlay`, a dict by default or e.g. an LRUCache or a shared SQLiteCache, and
+    deletes of snapshot entries are remembered in this process. `compact()` writes
+    the snapshot and overlay into a new snapshot, `refresh()` picks up a snapshot
+    compacted by another process.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        overlay: Optional[MutableMapping[str, Response]] = None,
+        lazy: bool = True,
+        memoize: bool = False,
+    ):
+        self.path = path
+        self.lazy = lazy
+        self.memoize = memoize
+        self.snapshot: Optional[Snapshot] = Snapshot(path) if os.path.exists(path) else None
+        self.overlay: MutableMapping[str, Response] = {} if overlay is None else overlay
+        ## Protocol isinstance checks are slow, check once
+        self._overlay_indexed = isinstance(self.overlay, IndexedCache)
+        ## Identifier index of the overlay, unless it keeps its own
+        self._index: dict[str, list[str]] = {}
+        if not self._overlay_indexed:
+            for key, r in self.overlay.items():
+                index_add(self._index, key, r)
+        ## Snapshot keys deleted in this process
+        self._deleted: set[str] = set()
+        ## Deserialized snapshot responses, when memoizing
+        self._loaded: dict[str, Response] = {}
+        self._lock = threading.RLock()
+
+    def snapshot_index(self, key: str) -> int:
+        """The number of a snapshot entry that isn't overridden or deleted, else -1"""
+        if self.snapshot is None or key in self._deleted or key in self.overlay:
+            return -1
+        return self.snapshot.find(key)
+
+    def _decode(self, data: bytes) -> Response:
+        if self.lazy:
+            return Response.model_validate_lazy(loads(data))
+        return Response.model_validate_json(data)
+
+    def __getitem__(self, key: str) -> Response:
+        r = self.overlay.get(key)
+        if r is not None:
+            return r
+        r = self._loaded.get(key)
+        if r is not None:
+            return r
+        with self._lock:
+            i = self.snapshot_index(key)
+            if i < 0:
+                raise KeyError(key)
+            r = self._decode(self.snapshot.data(i))  # type: ignore[union-attr]
+            if self.memoize:
+                self._loaded[key] = r
+            return r
+
+    def __setitem__(self, key: str, value: Response):
+        with self._lock:
+            if not self._overlay_indexed:
+                old = self.overlay.get(key)
+                if old is not None:
+                    index_remove(self._index, key, old)
+                index_add(self._index, key, value)
+            self.overlay[key] = value
+            self._loaded.pop(key, None)
+            self._deleted.discard(key)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            in_snapshot = self.snapshot is not None and key not in self._deleted and self.snapshot.find(key) >= 0
+            old = self.overlay.get(key)
+            if old is None and not in_snapshot:
+                raise KeyError(key)
+            if old is not None:
+                del self.overlay[key]
+                if not self._overlay_indexed:
+                    index_remove(self._index, key, old)
+            if in_snapshot:
+                self._deleted.add(key)
+                self._loaded.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        with self._lock:
+            return key in self.overlay or self.snapshot_index(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        ## list the keys under the lock, a compact or close unmaps the snapshot
+        with self._lock:
+            keys = list(self.overlay)
+            if self.snapshot is not None:
+                keys.extend(
+                    key
+                    for key in self.snapshot.keys()
+                    if key not in self._deleted and key not in self.overlay
+                )
+        yield from keys
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self.snapshot is None:
+                return len(self.overlay)
+            shadowed = sum(1 for key in self.overlay if self.snapshot.find(key) >= 0)
+            deleted = sum(1 for key in self._deleted if key not in self.overlay)
+            return self.snapshot.n_keys - deleted - shadowed + len(self.overlay)
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        with self._lock:
+            if self._overlay_indexed:
+                keys = list(self.overlay.lookup(identifier))  # type: ignore[attr-defined]
+            else:
+                keys = list(self._index.get(identifier, ()))
+            if self.snapshot is not None:
+                for i in self.snapshot.lookup(identifier):
+                    key = self.snapshot.key(i)
+                    ## overridden entries are matched through the overlay
+                    if key not in self._deleted and key not in self.overlay:
+                        keys.append(key)
+            return keys
+
+    def compact(self, path: Optional[str] = None) -> int:
+        """Write the snapshot and overlay into a new snapshot, by default replacing
+        this one. Returns the number of entries. Replacing moves the overlay
+        entries into the snapshot.
+
+        Processes compacting the same file take turns on a lock file, and each
+        starts from the latest snapshot, so no one's compacted entries are lost.
+        """
+        with self._lock, _file_lock(path or self.path):
+            target = path or self.path
+            ## pick up a snapshot another process compacted since we opened ours
+            self.refresh()
+            self.flush()
+            written = {key: self.overlay.get(key) for key in list(self.overlay)}
+            n = write_snapshot(target, self)
+            if target == self.path:
+                for key, r in written.items():
+                    ## a shared overlay may have a newer response by now, keep it
+                    current = self.overlay.get(key)
+                    if current is not None and (current is r or current == r):
+                        del self.overlay[key]
+                if not self._overlay_indexed:
+                    self._index.clear()
+                    for key, r in self.overlay.items():
+                        index_add(self._index, key, r)
+                self._deleted.clear()
+                self._reopen()
+            return n
+
+    def _reopen(self):
+        old = self.snapshot
+        self.snapshot = Snapshot(self.path)
+        self._loaded.clear()
+        if old is not None:
+            old.close()
+
+    def refresh(self) -> bool:
+        """Reopen the snapshot if the file was replaced, e.g. compacted by another
+        process. Overlay entries and deletes are kept.
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            if self.snapshot is not None and self.snapshot.file_id == (st.st_ino, st.st_mtime_ns, st.st_size):
+                return False
+            self._reopen()
+            return True
+
+    def flush(self):
+        """Flush the overlay's buffered writes, e.g. of a SQLiteCache"""
+        flush = getattr(self.overlay, "flush", None)
+        if flush is not None:
+            flush()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self.snapshot is not None:
+                self.snapshot.close()
+                self.snapshot = None
+
+    def __enter__(self) -> "SnapshotCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, MutableMapping, Optional
+
+from pdl_api.cache.base import Identifiers
+from pdl_api.keys import response_identifiers
+from pdl_api.models.response import Response
+
+## {prefix} namespaces the tables, so one file can hold caches of persons and companies
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {prefix}responses (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    query_time TEXT NOT NULL,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS {prefix}identifiers (
+    identifier TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (identifier, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {prefix}identifiers_key ON {prefix}identifiers (key);
+"""
+
+
+class SQLiteCache(MutableMapping[str, Response]):
+    """Persistent response cache backed by sqlite3.
+
+    Responses are stored as their `model_dump_json()` and only deserialized when
+    looked up, so opening a large store is cheap. With `lazy` the person is only
+    validated when accessed. With `memoize` the `memo_size` most recently used
+    responses are kept deserialized. Writes are buffered and flushed in a single
+    transaction every `batch_size` entries, on `flush()` or `close()`, so close the
+    cache (or the PDLPersonAPI using it) before exiting.
+
+    `model` and `identifiers` are the response type and its identifiers, e.g.
+    CompanyResponse and company_response_identifiers with `table_prefix="company_"`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 100,
+        wal: bool = True,
+        memoize: bool = True,
+        lazy: bool = True,
+        memo_size: int = 1024,
+        model: Any = Response,
+        identifiers: Identifiers = response_identifiers,
+        table_prefix: str = "",
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.memoize = memoize
+        self.memo_size = memo_size
+        ## only Response parses lazily
+        self.lazy = lazy and hasattr(model, "model_validate_lazy")
+        self.model = model
+        self.identifiers = identifiers
+        self._responses = f"{table_prefix}responses"
+        self._identifiers = f"{table_prefix}identifiers"
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if wal:
+            ## WAL lets other processes read while we write
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA.format(prefix=table_prefix))
+        ## Buffered writes, None marks a pending delete
+        self._pending: dict[str, Optional[Response]] = {}
+        ## Recently used deserialized responses, least recently used first
+        self._loaded: OrderedDict[str, Response] = OrderedDict()
+
+    def __getitem__(self, key: str) -> Response:
+        with self._lock:
+            if key in self._pending:
+                r = self._pending[key]
+                if r is None:
+                    raise KeyError(key)
+                return r
+            r = self._loaded.get(key)
+            if r is not None:
+                self._loaded.move_to_end(key)
+                return r
+            row = self._conn.execute(f"SELECT data FROM {self._responses} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            r = self._decode(row[0])
+            if self.memoize:
+                self._memo(key, r)
+            return r
+
+    def _memo(self, key: str, r: Response):
+        self._loaded[key] = r
+        self._loaded.move_to_end(key)
+        if len(self._loaded) > self.memo_size:
+            self._loaded.popitem(last=False)
+
+    def _decode(self, data: str) -> Response:
+        if self.lazy:
+            return self.model.model_validate_lazy(json.loads(data))
+        return self.model.model_validate_json(data)
+
+    def __setitem__(self, key: str, value: Response):
+        with self._lock:
+            self._pending[key] = value
+            self._loaded.pop(key, None)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._pending[key] = None
+            self._loaded.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key] is not None
+            if key in self._loaded:
+                return True
+            row = self._conn.execute(f"SELECT 1 FROM {self._responses} WHERE key = ?", (key,)).fetchone()
+            return row is not None
+
+    def __iter__(self) -> Iterator[str]:
+        self.flush()
+        for (key,) in self._conn.execute(f"SELECT key FROM {self._responses}"):
+            yield key
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self._responses}").fetchone()[0]
+
+    def lookup(self, identifier: str) -> list[str]:
+        """Keys of the cached responses matching a normalized identifier"""
+        with self._lock:
+            keys = [
+                key
+                for (key,) in self._conn.execute(
+                    f"SELECT key FROM {self._identifiers} WHERE identifier = ?", (identifier,)
+                )
+                if key not in self._pending
+            ]
+            for key, r in self._pending.items():
+                if r is not None and identifier in self.identifiers(r):
+                    keys.append(key)
+            return keys
+
+    def flush(self):
+        """Write the buffered entries in one transaction. They stay buffered if it fails"""
+        with self._lock:
+            pending = self._pending
+            if not pending:
+                return
+            keys = [(key,) for key in pending]
+            rows = []
+            identifiers = []
+            for key, r in pending.items():
+                if r is None:
+                    continue
+                rows.append((key, r.status, r.query_time.isoformat(), r.model_dump_json()))
+                identifiers.extend((ident, key) for ident in self.identifiers(r))
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(f"DELETE FROM {self._responses} WHERE key = ?", keys)
+                self._conn.executemany(f"DELETE FROM {self._identifiers} WHERE key = ?", keys)
+                self._conn.executemany(f"INSERT INTO {self._responses} VALUES (?, ?, ?, ?)", rows)
+                self._conn.executemany(f"INSERT OR IGNORE INTO {self._identifiers} VALUES (?, ?)", identifiers)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._pending = {}
+            if self.memoize:
+                for key, r in pending.items():
+                    if r is not None:
+                        self._memo(key, r)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def __enter__(self) -> "SQLiteCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,265 @@
+"""Command line tools.
+
+    pdl-api enrich emails.csv --output people.jsonl --cache-path cache.db
+
+`enrich` streams a CSV or JSONL file, skips repeated and cached identities and
+enriches the rest with bounded concurrency. It writes one JSON Response per line
+and keeps a checkpoint next to the output, so a crashed or quota-stopped run picks
+up where it left off when started again with the same arguments.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterator, Optional
+
+from pdl_api.cache.sqlite import SQLiteCache
+from pdl_api.keys import query_key
+from pdl_api.models.exceptions import PDLAccountLimitException, PDLException
+from pdl_api.person_api import PDLPersonAPI, PDLSettings
+
+## Exit status when the account runs out of credits, the run can be resumed later
+EXIT_ACCOUNT_LIMIT = 2
+## Exit status for invalid settings, an input without the identity column, or a bad row
+EXIT_BAD_INPUT = 1
+
+
+class RowParams(dict):
+    """Enrichment params that remember the input row they were read from"""
+
+    __slots__ = ("row",)
+
+    def __init__(self, row: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.row = row
+
+
+@dataclass
+class Checkpoint:
+    """Progress of an enrich run.
+
+    Every input row before `rows` is done, as are the rows in `done` that finished
+    out of order. `offset` is the size of the output when the checkpoint was taken.
+    """
+
+    rows: int = 0
+    offset: int = 0
+    done: set[int] = field(default_factory=set)
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(rows=data["rows"], offset=data["offset"], done=set(data["done"]))
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"rows": self.rows, "offset": self.offset, "done": sorted(self.done)}, f)
+        os.replace(tmp, path)
+
+    def mark(self, row: int):
+        self.done.add(row)
+        while self.rows in self.done:
+            self.done.remove(self.rows)
+            self.rows += 1
+
+    def is_done(self, row: int) -> bool:
+        return row < self.rows or row in self.done
+
+
+def read_rows(f: IO[str], format: str, column: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """The rows of the input, raising ValueError right away if a CSV has no `column`"""
+    if format == "csv":
+        reader = csv.DictReader(f)
+        if column is not None and column not in (reader.fieldnames or ()):
+            raise ValueError(f"Input has no column {column!r}, its columns are {reader.fieldnames}")
+        return reader
+    return (json.loads(line) for line in f if line.strip())
+
+
+def _format(path: str, format: Optional[str]) -> str:
+    if format:
+        return format
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+class Enricher:
+    """Runs one `pdl-api enrich` over an input file"""
+
+    def __init__(
+        self,
+        api: PDLPersonAPI,
+        output: str,
+        checkpoint: str,
+        column: str = "email",
+        param: str = "email",
+        dedup_window: int = 100_000,
+        checkpoint_every: int = 1000,
+    ):
+        self.api = api
+        self.output = output
+        self.checkpoint_path = checkpoint
+        self.column = column
+        self.param = param
+        self.dedup_window = dedup_window
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint = Checkpoint()
+        ## query keys recently queued, oldest first
+        self.recent: OrderedDict[str, None] = OrderedDict()
+        self.written = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def _params(self, rows: Iterator[Any]) -> Iterator[RowParams]:
+        """Params for the rows still to do, marking empty and repeated rows as done"""
+        for i, row in enumerate(rows):
+            if self.checkpoint.is_done(i):
+                continue
+            if not isinstance(row, dict):
+                raise ValueError(f"Row {i}: is a {type(row).__name__}, expected an object")
+            value = row.get(self.column)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(
+                    f"Row {i}: column {self.column!r} is a {type(value).__name__}, expected a string"
+                )
+            value = (value or "").strip()
+            params = RowParams(i, {self.param: [value]})
+            key = query_key(params) if value else ""
+            if not value or key in self.recent:
+                self.skipped += 1
+                self.checkpoint.mark(i)
+                continue
+            self.recent[key] = None
+            if len(self.recent) > self.dedup_window:
+                self.recent.popitem(last=False)
+            yield params
+
+    def _save(self, out: IO[str]):
+        out.flush()
+        os.fsync(out.fileno())
+        if isinstance(self.api.existing_queries, SQLiteCache):
+            self.api.existing_queries.flush()
+        self.checkpoint.offset = out.tell()
+        self.checkpoint.save(self.checkpoint_path)
+
+    def run(self, input: str, format: Optional[str] = None):
+        """Enrich every row of `input`, raises PDLAccountLimitException after saving the checkpoint"""
+        if os.path.exists(self.checkpoint_path) and os.path.exists(self.output):
+            self.checkpoint = Checkpoint.load(self.checkpoint_path)
+            out = open(self.output, "r+")
+            ## drop lines written after the checkpoint, their rows are redone
+            out.truncate(self.checkpoint.offset)
+            out.seek(self.checkpoint.offset)
+        else:
+            self.checkpoint = Checkpoint()
+            out = open(self.output, "w")
+        since_save = 0
+        try:
+            with open(input, "r", newline="") as f:
+                rows = read_rows(f, _format(input, format), self.column)
+                for params, r in self.api.enrich_many(self._params(rows), return_exceptions=True):
+                    if isinstance(r, PDLAccountLimitException):
+                        raise r
+                    if isinstance(r, PDLException):
+                        self.errors += 1
+                        line = json.dumps({"query": params, "error": str(r)})
+                    else:
+                        self.written += 1
+                        line = r.model_dump_json()
+                    out.write(line + "\n")
+                    self.checkpoint.mark(params.row)  # type: ignore[attr-defined]
+                    since_save += 1
+                    if since_save >= self.checkpoint_every:
+                        self._save(out)
+                        since_save = 0
+        finally:
+            self._save(out)
+            out.close()
+
+
+def _api(args: argparse.Namespace) -> PDLPersonAPI:
+    """The API client for an enrich run, raising ValueError for invalid settings"""
+    settings = PDLSettings(thread_safe=True)
+    update: dict[str, Any] = {}
+    if args.concurrency:
+        update["max_concurrency"] = args.concurrency
+    cache_path = args.cache_path or settings.cache_path
+    if not cache_path and settings.cache_max_entries is None:
+        ## keep memory flat however long the input is
+        update["cache_max_entries"] = args.dedup_window
+    settings = settings.model_copy(update=update)
+    kwargs: dict[str, Any] = {}
+    if cache_path:
+        ## without memoizing, so decoded responses aren't kept for the whole run
+        kwargs["existing_queries"] = SQLiteCache(cache_path, memoize=False)
+    return PDLPersonAPI(settings=settings, **kwargs)
+
+
+def enrich(args: argparse.Namespace) -> int:
+    try:
+        api = _api(args)
+    except ValueError as e:
+        print(f"Stopped, bad settings: {e}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    checkpoint = args.checkpoint or f"{args.output}.checkpoint"
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    enricher = Enricher(
+        api,
+        args.output,
+        checkpoint,
+        column=args.column,
+        param=args.param,
+        dedup_window=args.dedup_window,
+        checkpoint_every=args.checkpoint_every,
+    )
+    status = 0
+    try:
+        enricher.run(args.input, args.format)
+    except PDLAccountLimitException as e:
+        print(f"Stopped, account limit reached: {e}. Run again to resume.", file=sys.stderr)
+        status = EXIT_ACCOUNT_LIMIT
+    except ValueError as e:
+        print(f"Stopped, bad input: {e}", file=sys.stderr)
+        status = EXIT_BAD_INPUT
+    finally:
+        if isinstance(api.existing_queries, SQLiteCache):
+            api.existing_queries.close()
+    print(
+        f"{enricher.written} responses, {enricher.errors} errors, {enricher.skipped} skipped, "
+        f"{enricher.checkpoint.rows} rows done",
+        file=sys.stderr,
+    )
+    return status
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="pdl-api", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("enrich", help="Enrich a CSV or JSONL file of identities")
+    p.add_argument("input", help="CSV with a header row, or JSONL of objects")
+    p.add_argument("--output", "-o", required=True, help="JSONL file of responses")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="Input format, by extension by default")
+    p.add_argument("--column", default="email", help="Input column holding the identity")
+    p.add_argument("--param", default="email", help="Enrichment parameter to send it as, e.g. profile")
+    p.add_argument("--cache-path", help="sqlite cache shared between runs, defaults to PDL_CACHE_PATH")
+    p.add_argument("--concurrency", type=int, help="Concurrent requests, defaults to PDL_MAX_CONCURRENCY")
+    p.add_argument("--dedup-window", type=int, default=100_000, help="Recent identities remembered to skip repeats")
+    p.add_argument("--checkpoint", help="Checkpoint file, defaults to OUTPUT.checkpoint")
+    p.add_argument("--checkpoint-every", type=int, default=1000, help="Rows between checkpoints")
+    p.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    p.set_defaults(func=enrich)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Iterable, MutableMapping, Optional
+
+from peopledatalabs import PDLPY  # type: ignore
+
+from pdl_api.keys import company_param_identifiers, company_response_identifiers, query_key, raw_field
+from pdl_api.metrics import Metrics
+from pdl_api.models.decode import loads
+from pdl_api.models.response import CompanyResponse, Response
+from pdl_api.person_api import PDLSettings, check_record, response_json, with_retries
+from pdl_api.query_cache import QueryCacheMixin
+from pdl_api.rate_limit import TokenBucket
+
+
+def company_ids(responses: Iterable[Response]) -> list[str]:
+    """The unique Company.id values of the experience of the persons, in order of appearance.
+    Lazily parsed persons are read raw, without validating them.
+    """
+    ids: dict[str, None] = {}
+    for r in responses:
+        if not r.is_person:
+            continue
+        person = r.raw_value("person") or r.person
+        for experience in raw_field(person, "experience") or ():
+            company_id = raw_field(raw_field(experience, "company"), "id")
+            if company_id:
+                ids[company_id] = None
+    return list(ids)
+
+
+@dataclass
+class PDLCompanyAPI(QueryCacheMixin):
+    """Company enrichment with the caching and error handling of PDLPersonAPI.
+
+    Responses are cached by query key and found again through their company id,
+    website, LinkedIn URL or ticker. A 402 raises PDLAccountLimitException, 429/5xx
+    that outlast the retries PDLTransientException and "not_found" is cached as an
+    error response. The cache is picked from the settings like PDLPersonAPI's, in
+    its own tables or keys, so close the API before exiting.
+    """
+
+    _model = CompanyResponse
+    _identifiers = staticmethod(company_response_identifiers)
+    _cache_namespace = "company"
+
+    settings: PDLSettings = field(default_factory=PDLSettings)
+
+    ## Cache for the queries to avoid repeated calls. A dict by default,
+    ## or any IndexedCache such as SQLiteCache
+    existing_queries: MutableMapping[str, CompanyResponse] = field(default_factory=dict)
+
+    ## PDL API client
+    client: Optional[PDLPY] = None
+
+    ## initialize the client with these kwargs
+    init_kwargs: dict[str, Any] = field(default_factory=dict)
+
+    ## Normalized identifier -> keys into existing_queries, kept up to date by save_queries
+    identity_index: dict[str, list[str]] = field(default_factory=dict)
+
+    ## Cache hit/miss, API call and latency metrics, shared with a PDLPersonAPI if given
+    metrics: Metrics = field(default_factory=Metrics)
+
+    ## Adapts to PDL's rate limit headers, pass a PDLPersonAPI's to share its limit
+    rate_limiter: Optional[TokenBucket] = None
+
+    ## Guards identity_index and its cache entries
+    _cache_lock: threading.RLock = field(init=False, repr=False, default_factory=threading.RLock)
+
+    ## Whether existing_queries was created from the settings, and is closed with the API
+    _owns_cache: bool = field(init=False, repr=False, default=False)
+
+    def __post_init__(self):
+        if self.rate_limiter is None:
+            self.rate_limiter = TokenBucket(self.settings.rate_limit, self.settings.rate_burst)
+        if self.client is None:
+            kwargs = dict(self.init_kwargs)
+            if self.settings.base_path:
+                kwargs.setdefault("base_path", self.settings.base_path)
+            self.client = PDLPY(api_key=self.settings.api_key, **kwargs)
+        self._init_cache()
+
+    def close(self):
+        """Flush the cache's buffered writes, closing it if it was created from the settings"""
+        self._close_cache()
+
+    def __enter__(self) -> "PDLCompanyAPI":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def save_queries(self, queries: dict[str, CompanyResponse]):
+        self._store(queries)
+
+    def find_existing_query(
+        self, params: dict[str, Any], key: Optional[str] = None
+    ) -> Optional[CompanyResponse]:
+        """The cached response for the exact query, or a company with one of its identifiers"""
+        with self.metrics.time("lookup"):
+            pr = self.existing_queries.get(key or query_key(params))
+            match = "exact" if pr is not None else None
+            if pr is None:
+                for ident in company_param_identifiers(params):
+                    for hsh in self._lookup(ident):
+                        pr = self.existing_queries.get(hsh)
+                        if pr is not None:
+                            match = "identity"
+                            break
+                    if pr is not None:
+                        break
+        if match:
+            self.metrics.cache_hit(match)
+        else:
+            self.metrics.cache_miss()
+        return pr
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any]:
+        if not self.client:
+            raise ValueError("PDLCompanyAPI: Client not initialized")
+        self.metrics.api_call("company")
+        with self.metrics.time("network"):
+            r = with_retries(lambda: self.client.company.enrichment(**params), self.rate_limiter, self.settings)
+        return response_json(r)
+
+    def _get_bulk_response(self, list_params: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """One call to the bulk company enrichment endpoint, records come back in request order"""
+        if not self.client:
+            raise ValueError("PDLCompanyAPI: Client not initialized")
+        bulk_requests = [{"params": params} for params in list_params]
+        self.metrics.api_call("company_bulk")
+        with self.metrics.time("network"):
+            json_response = response_json(
+                with_retries(
+                    lambda: self.client.company.bulk(requests=bulk_requests), self.rate_limiter, self.settings
+                )
+            )
+        if isinstance(json_response, dict):
+            ## The whole call failed, e.g. a 402 for the account
+            return [json_response] * len(list_params)
+        return json_response
+
+    def _to_response(self, params: dict[str, Any], json_response: dict[str, Any] | bytes) -> CompanyResponse:
+        """Create the CompanyResponse for an API record, raising for errors that shouldn't be cached"""
+        with self.metrics.time("parse"):
+            if isinstance(json_response, (bytes, str)):
+                json_response = loads(json_response)
+            if json_response["status"] != 200:
+                self.metrics.api_error(json_response["status"])
+                check_record(json_response)
+            return CompanyResponse(**{**json_response, "query": params})
+
+    def get_company(self, params: dict[str, Any], use_cache: bool = True) -> CompanyResponse:
+        """Enrich one company, e.g. {"pdl_id": ...} or {"website": ...}"""
+        hsh = query_key(params)
+        if use_cache:
+            existing = self.find_existing_query(params, key=hsh)
+            if existing:
+                return existing
+        pr = self._to_response(params, self._get_response(params))
+        if use_cache or pr.is_error:
+            self.save_queries({hsh: pr})
+        return pr
+
+    def get_companies(self, list_params: list[dict[str, Any]], use_cache: bool = True) -> list[CompanyResponse]:
+        """Enrich many companies, one CompanyResponse per params in the same order.
+        Duplicate queries are only looked up once, cached ones aren't sent and the
+        rest go to the bulk endpoint in batches of `settings.bulk_size`. A 402 or
+        unexpected 404 raises after the rest of its batch has been cached.
+        """
+        keys = [query_key(params) for params in list_params]
+        results: dict[str, CompanyResponse] = {}
+        missing: dict[str, dict[str, Any]] = {}
+        for hsh, params in zip(keys, list_params):
+            if hsh in results or hsh in missing:
+                continue
+            existing = self.find_existing_query(params, key=hsh) if use_cache else None
+            if existing:
+                results[hsh] = existing
+            else:
+                missing[hsh] = params
+
+        results.update(self._fetch_many(missing, save=use_cache))
+        return [results[hsh] for hsh in keys]
+
+    def enrich_employers(self, responses: Iterable[Response], use_cache: bool = True) -> dict[str, CompanyResponse]:
+        """Enrich every company the persons have worked at, once per Company.id however
+        many persons share it, with bulk calls. Returns the responses by company id.
+        """
+        ids = company_ids(responses)
+        results = self.get_companies([{"pdl_id": company_id} for company_id in ids], use_cache=use_cache)
+        return dict(zip(ids, results))
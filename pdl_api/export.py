@@ -0,0 +1,225 @@
+"""Columnar export of Responses for analytics.
+
+    tables = to_arrow(api.existing_queries.values())
+    write_parquet(api.existing_queries.values(), "people/")
+
+Persons go to a "people" table and their emails, experience, education and
+certifications to child tables keyed by person_id. Values are read from the raw
+data of lazily parsed responses, so nothing is validated or dumped on the way.
+Arrow and Parquet output require the `arrow` extra (pyarrow).
+"""
+
+import os
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
+
+from pdl_api.keys import raw_field
+from pdl_api.models.response import Response
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+## column -> (path into the record, type)
+PEOPLE_COLUMNS: dict[str, tuple[tuple[str, ...], str]] = {
+    "id": (("id",), "str"),
+    "full_name": (("full_name",), "str"),
+    "first_name": (("first_name",), "str"),
+    "sex": (("sex",), "str"),
+    "birth_year": (("birth_year",), "int"),
+    "birth_date": (("birth_date",), "str"),
+    "industry": (("industry",), "str"),
+    "countries": (("countries",), "list"),
+    "first_seen": (("first_seen",), "str"),
+    "linkedin_url": (("linkedin_url",), "str"),
+    "twitter_url": (("twitter_url",), "str"),
+    "facebook_url": (("facebook_url",), "str"),
+    "github_url": (("github_url",), "str"),
+}
+
+EMAIL_COLUMNS: dict[str, tuple[tuple[str, ...], str]] = {
+    "address": (("address",), "str"),
+    "type": (("type",), "str"),
+    "first_seen": (("first_seen",), "str"),
+    "last_seen": (("last_seen",), "str"),
+    "num_sources": (("num_sources",), "int"),
+}
+
+EXPERIENCE_COLUMNS: dict[str, tuple[tuple[str, ...], str]] = {
+    "company_id": (("company", "id"), "str"),
+    "company_name": (("company", "name"), "str"),
+    "company_website": (("company", "website"), "str"),
+    "company_industry": (("company", "industry"), "str"),
+    "company_size": (("company", "size"), "str"),
+    "title_name": (("title", "name"), "str"),
+    "title_role": (("title", "role"), "str"),
+    "title_sub_role": (("title", "sub_role"), "str"),
+    "title_levels": (("title", "levels"), "list"),
+    "start_date": (("start_date",), "str"),
+    "end_date": (("end_date",), "str"),
+    "is_primary": (("is_primary",), "bool"),
+    "location_names": (("location_names",), "list"),
+}
+
+EDUCATION_COLUMNS: dict[str, tuple[tuple[str, ...], str]] = {
+    "school_id": (("school", "id"), "str"),
+    "school_name": (("school", "name"), "str"),
+    "school_type": (("school", "type"), "str"),
+    "degrees": (("degrees",), "list"),
+    "majors": (("majors",), "list"),
+    "minors": (("minors",), "list"),
+    "gpa": (("gpa",), "float"),
+    "start_date": (("start_date",), "str"),
+    "end_date": (("end_date",), "str"),
+}
+
+CERTIFICATION_COLUMNS: dict[str, tuple[tuple[str, ...], str]] = {
+    "name": (("name",), "str"),
+    "organization": (("organization",), "str"),
+    "start_date": (("start_date",), "str"),
+    "end_date": (("end_date",), "str"),
+}
+
+## child table -> (Person field, columns)
+CHILD_TABLES: dict[str, tuple[str, dict[str, tuple[tuple[str, ...], str]]]] = {
+    "emails": ("emails", EMAIL_COLUMNS),
+    "experience": ("experience", EXPERIENCE_COLUMNS),
+    "education": ("education", EDUCATION_COLUMNS),
+    "certifications": ("certifications", CERTIFICATION_COLUMNS),
+}
+
+TABLES = ("people", *CHILD_TABLES)
+
+
+def _path(obj: Any, path: tuple[str, ...]) -> Any:
+    for name in path:
+        ## education.school can be just the school name
+        obj = obj if name == "name" and isinstance(obj, str) else raw_field(obj, name)
+        if obj is None:
+            return None
+    return obj
+
+
+def _empty(columns: dict[str, Any], child: bool = False) -> dict[str, list]:
+    names = (["person_id"] if child else []) + list(columns)
+    return {name: [] for name in names}
+
+
+def _columns(table: str) -> dict[str, tuple[tuple[str, ...], str]]:
+    return PEOPLE_COLUMNS if table == "people" else CHILD_TABLES[table][1]
+
+
+def iter_columns(
+    responses: Iterable[Response], chunk_size: int = 10_000, unique: bool = True
+) -> Iterator[dict[str, dict[str, list]]]:
+    """Chunks of at most `chunk_size` persons as {table: {column: values}}.
+    Error responses are skipped, and with `unique` so are persons already exported.
+    """
+    seen: set[str] = set()
+    chunk = {"people": _empty(PEOPLE_COLUMNS, False)} | {
+        table: _empty(columns, True) for table, (_, columns) in CHILD_TABLES.items()
+    }
+    people = chunk["people"]
+    rows = 0
+    for r in responses:
+        if r.is_error:
+            continue
+        person = raw_field(r, "person")
+        if person is None:
+            continue
+        person_id = raw_field(person, "id")
+        if unique and person_id is not None:
+            if person_id in seen:
+                continue
+            seen.add(person_id)
+        for name, (path, _) in PEOPLE_COLUMNS.items():
+            people[name].append(_path(person, path))
+        for table, (source, columns) in CHILD_TABLES.items():
+            out = chunk[table]
+            for item in raw_field(person, source) or ():
+                out["person_id"].append(person_id)
+                for name, (path, _) in columns.items():
+                    out[name].append(_path(item, path))
+        rows += 1
+        if rows >= chunk_size:
+            yield chunk
+            chunk = {table: {name: [] for name in cols} for table, cols in chunk.items()}
+            people = chunk["people"]
+            rows = 0
+    if rows:
+        yield chunk
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("Arrow export requires pyarrow, install the `arrow` extra") from e
+    return pyarrow
+
+
+def arrow_schema(table: str) -> "pa.Schema":
+    pa = _pyarrow()
+    types = {
+        "str": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "list": pa.list_(pa.string()),
+    }
+    fields = [] if table == "people" else [pa.field("person_id", pa.string())]
+    fields += [pa.field(name, types[kind]) for name, (_, kind) in _columns(table).items()]
+    return pa.schema(fields)
+
+
+def iter_arrow(
+    responses: Iterable[Response], chunk_size: int = 10_000, unique: bool = True
+) -> Iterator[dict[str, "pa.RecordBatch"]]:
+    """Chunks of `iter_columns` as Arrow record batches with a fixed schema per table"""
+    pa = _pyarrow()
+    schemas = {table: arrow_schema(table) for table in TABLES}
+    for chunk in iter_columns(responses, chunk_size, unique):
+        yield {
+            table: pa.RecordBatch.from_pydict(columns, schema=schemas[table])
+            for table, columns in chunk.items()
+        }
+
+
+def to_arrow(
+    responses: Iterable[Response], chunk_size: int = 10_000, unique: bool = True
+) -> dict[str, "pa.Table"]:
+    """All tables in memory as Arrow tables, e.g. for `.to_pandas()` or pyarrow.compute"""
+    pa = _pyarrow()
+    batches: dict[str, list] = {table: [] for table in TABLES}
+    for chunk in iter_arrow(responses, chunk_size, unique):
+        for table, batch in chunk.items():
+            batches[table].append(batch)
+    return {table: pa.Table.from_batches(b, schema=arrow_schema(table)) for table, b in batches.items()}
+
+
+def write_parquet(
+    responses: Iterable[Response],
+    directory: str,
+    chunk_size: int = 10_000,
+    unique: bool = True,
+    compression: Optional[str] = "zstd",
+) -> dict[str, str]:
+    """Write one `<table>.parquet` per table to `directory`, a row group per chunk.
+    Returns the paths by table.
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    paths = {table: os.path.join(directory, f"{table}.parquet") for table in TABLES}
+    writers = {
+        table: pq.ParquetWriter(paths[table], arrow_schema(table), compression=compression)
+        for table in TABLES
+    }
+    try:
+        for chunk in iter_arrow(responses, chunk_size, unique):
+            for table, batch in chunk.items():
+                if batch.num_rows:
+                    writers[table].write_batch(batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return paths
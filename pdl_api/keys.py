@@ -0,0 +1,174 @@
+import hashlib
+import json
+from typing import Any, Optional
+
+from pdl_api.models.lazy import LazyModel
+from pdl_api.models.response import CompanyResponse, Response
+
+## Query parameters that identify a single person, mapped to the identifier kind
+PARAM_IDENTIFIERS = {"email": "email", "profile": "profile", "pdl_id": "id"}
+
+## Person fields holding profile URLs
+PROFILE_FIELDS = ("linkedin_url", "facebook_url", "twitter_url", "github_url")
+
+## Query parameters that identify a single company, mapped to the identifier kind
+COMPANY_PARAM_IDENTIFIERS = {"pdl_id": "company_id", "website": "website", "profile": "company_profile", "ticker": "ticker"}
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def normalize_profile(url: str) -> str:
+    """Strip the scheme, "www." and trailing slashes so profile URLs compare equal"""
+    url = url.strip().lower()
+    for prefix in ("https://", "http://", "www."):
+        url = url.removeprefix(prefix)
+    return url.rstrip("/")
+
+
+def identifier(kind: str, value: Any) -> Optional[str]:
+    """Build a normalized identifier like "email:a@x.com", or None for empty values"""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    if kind == "email":
+        value = normalize_email(value)
+    elif kind in ("profile", "company_profile", "website"):
+        value = normalize_profile(value)
+    elif kind == "ticker":
+        value = value.strip().upper()
+    else:
+        value = value.strip()
+    return f"{kind}:{value}"
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def raw_field(obj: Any, name: str) -> Any:
+    """A field of a model or raw dict, preferring the raw data of a lazy model"""
+    if type(obj) is dict:
+        return obj.get(name)
+    ## model fields are plain __dict__ entries, lazy ones are missing until loaded
+    d = getattr(obj, "__dict__", None)
+    if d is None:
+        return None
+    if name in d:
+        return d[name]
+    if isinstance(obj, LazyModel):
+        return obj.raw_value(name)
+    return None
+
+
+def param_identifiers(params: dict[str, Any]) -> list[str]:
+    """Identifiers for the person-identifying values of a query"""
+    identifiers = []
+    for key, kind in PARAM_IDENTIFIERS.items():
+        for value in _as_list(params.get(key)):
+            ident = identifier(kind, value)
+            if ident and ident not in identifiers:
+                identifiers.append(ident)
+    return identifiers
+
+
+def response_identifiers(response: Response) -> list[str]:
+    """Identifiers a cached response can be found by.
+    Only person responses are indexed, errors are only found by their exact query.
+    """
+    if not response.is_person:
+        return []
+    ## Read lazily parsed data raw, indexing shouldn't force validation
+    person = response.raw_value("person") or response.person
+    emails = raw_field(person, "emails")
+    identifiers = param_identifiers(response.query)
+    candidates = [identifier("id", raw_field(person, "id"))]
+    candidates.extend(identifier("email", raw_field(email, "address")) for email in emails or [])
+    candidates.extend(identifier("profile", raw_field(person, f)) for f in PROFILE_FIELDS)
+    for ident in candidates:
+        if ident and ident not in identifiers:
+            identifiers.append(ident)
+    return identifiers
+
+
+def company_param_identifiers(params: dict[str, Any]) -> list[str]:
+    """Identifiers for the company-identifying values of a query"""
+    identifiers = []
+    for key, kind in COMPANY_PARAM_IDENTIFIERS.items():
+        for value in _as_list(params.get(key)):
+            ident = identifier(kind, value)
+            if ident and ident not in identifiers:
+                identifiers.append(ident)
+    return identifiers
+
+
+def company_response_identifiers(response: CompanyResponse) -> list[str]:
+    """Identifiers a cached company response can be found by, errors only by their exact query"""
+    company = response.company
+    if company is None:
+        return []
+    identifiers = company_param_identifiers(response.query)
+    candidates = [
+        identifier("company_id", company.id),
+        identifier("website", company.website),
+        identifier("company_profile", company.linkedin_url),
+        identifier("ticker", company.ticker),
+    ]
+    for ident in candidates:
+        if ident and ident not in identifiers:
+            identifiers.append(ident)
+    return identifiers
+
+
+def _is_empty(value: Any) -> bool:
+    ## {} and [] are kept, {"query": {"match_all": {}}} isn't the same search as no query
+    return value is None or value == ""
+
+
+def _dedupe(items: list) -> list:
+    """Unique scalars in a stable order, 1 and True or 1 and 1.0 are different values"""
+    unique = {(type(v).__name__, v): v for v in items}
+    return [unique[k] for k in sorted(unique, key=lambda k: (k[0], str(k[1])))]
+
+
+def normalize_params(params: Any, key: Optional[str] = None) -> Any:
+    """Canonical form of a query parameter tree.
+    None and empty strings are dropped, identifier values (email, profile) are
+    normalized, lists of scalars are sorted and deduplicated and single item lists
+    collapse to the item so {"email": ["A@x.com"]} and {"email": "a@x.com"} are the
+    same query.
+    """
+    if isinstance(params, dict):
+        normalized = {}
+        for k, v in params.items():
+            v = normalize_params(v, key=k)
+            if not _is_empty(v):
+                normalized[str(k)] = v
+        return normalized
+    if isinstance(params, (list, tuple, set)):
+        items = [normalize_params(v, key=key) for v in params]
+        items = [v for v in items if not _is_empty(v)]
+        if all(not isinstance(v, (dict, list)) for v in items):
+            items = _dedupe(items)
+        if len(items) == 1:
+            return items[0]
+        return items
+    if isinstance(params, str):
+        if key == "email":
+            return normalize_email(params)
+        if key == "profile":
+            return normalize_profile(params)
+        return params.strip()
+    return params
+
+
+def query_key(params: dict[str, Any]) -> str:
+    """Stable content hash of the normalized query, valid across processes and restarts"""
+    canonical = json.dumps(
+        normalize_params(params), sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,339 @@
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from pdl_api.keys import normalize_profile, raw_field
+from pdl_api.models.response import Response, utcnow
+
+## A conjunction of (field, allowed values), what a completed search is remembered as
+Atoms = frozenset[tuple[str, frozenset[str]]]
+
+
+class UnsupportedQuery(ValueError):
+    """A clause or field LocalIndex can't evaluate"""
+
+
+def _value(value: Any) -> Optional[str]:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip().lower()
+
+
+def _website(value: Any) -> Optional[str]:
+    return normalize_profile(value) if isinstance(value, str) and value.strip() else None
+
+
+def _experiences(person: Any) -> list[Any]:
+    return list(raw_field(person, "experience") or ())
+
+
+def _primary(person: Any) -> list[Any]:
+    return [e for e in _experiences(person) if raw_field(e, "is_primary")][:1]
+
+
+def _title(key: str, current: bool) -> Callable[[Any], Iterator[Any]]:
+    def values(person: Any) -> Iterator[Any]:
+        for e in _primary(person) if current else _experiences(person):
+            yield raw_field(raw_field(e, "title"), key)
+
+    return values
+
+
+def _company(key: str, current: bool) -> Callable[[Any], Iterator[Any]]:
+    def values(person: Any) -> Iterator[Any]:
+        for e in _primary(person) if current else _experiences(person):
+            yield raw_field(raw_field(e, "company"), key)
+
+    return values
+
+
+def _person(key: str) -> Callable[[Any], Iterable[Any]]:
+    def values(person: Any) -> Iterable[Any]:
+        value = raw_field(person, key)
+        return value if isinstance(value, list) else [value]
+
+    return values
+
+
+## PDL search field -> (values of a person, normalization of them and of query values).
+## The job_* fields are those of the primary experience
+FIELDS: dict[str, tuple[Callable[[Any], Iterable[Any]], Callable[[Any], Optional[str]]]] = {
+    "job_title_role": (_title("role", True), _value),
+    "job_title_sub_role": (_title("sub_role", True), _value),
+    "job_company_id": (_company("id", True), _value),
+    "job_company_website": (_company("website", True), _website),
+    "job_company_industry": (_company("industry", True), _value),
+    "experience.title.role": (_title("role", False), _value),
+    "experience.title.sub_role": (_title("sub_role", False), _value),
+    "experience.company.id": (_company("id", False), _value),
+    "experience.company.website": (_company("website", False), _website),
+    "countries": (_person("countries"), _value),
+    "industry": (_person("industry"), _value),
+}
+
+## Leaf clauses comparing a field to values, all exact on the normalized values
+_TERM_CLAUSES = ("term", "match", "match_phrase")
+
+
+@dataclass
+class LocalResult:
+    ## Cached persons matching the query, in the order they were added
+    matches: list[Response]
+    ## Whether the matches are all the persons a remote search would return, because
+    ## a completed search for the query or a broader one put them all in the cache
+    complete: bool
+    ## Why the result isn't complete, None if it is
+    reason: Optional[str] = None
+
+
+class LocalIndex:
+    """Secondary indexes over cached persons, to answer search queries without the API.
+
+    Evaluates the Elasticsearch subset of PDL search made of `bool` (must, filter,
+    should, must_not), `term`, `terms`, `match`, `match_phrase`, `exists` and `match_all`
+    on the fields in FIELDS, with set operations on the posting lists. Values are
+    compared lowercased and websites normalized like profile URLs. `match` is exact
+    rather than full text, as PDL's values for these fields are canonical.
+
+    The index only holds the persons seen so far, so a result is only `complete` when
+    `mark_complete` was called for a search whose results contain all of the query's:
+    the same query, or a conjunction of term(s) clauses the query narrows down.
+
+    At most `max_entries` persons are kept, the least recently added are evicted
+    first, and persons expire `ttl` seconds after their query_time. A completed
+    search stops counting once it's `ttl` seconds old or one of its persons is
+    evicted or expires, and only the latest `max_covered` are remembered.
+    """
+
+    def __init__(
+        self,
+        responses: Iterable[Response] = (),
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_covered: int = 1024,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_covered = max_covered
+        self._lock = threading.RLock()
+        self._people: OrderedDict[str, tuple[int, Response]] = OrderedDict()
+        self._postings: dict[str, dict[str, set[str]]] = {name: {} for name in FIELDS}
+        self._values: dict[str, list[tuple[str, str]]] = {}
+        self._seq = itertools.count()
+        ## (canonical query, its atoms or None, time.time() it completed) of the completed searches
+        self._covered: list[tuple[str, Optional[Atoms], float]] = []
+        for r in responses:
+            self.add(r)
+
+    def __len__(self) -> int:
+        return len(self._people)
+
+    def add(self, r: Response):
+        """Index a person response, replacing an earlier one for the same person. Others are ignored"""
+        if not r.is_person:
+            return
+        person = r.raw_value("person") or r.person
+        person_id = raw_field(person, "id")
+        if not person_id:
+            return
+        values = []
+        for name, (extract, normalize) in FIELDS.items():
+            seen = set()
+            for raw in extract(person):
+                value = normalize(raw)
+                if value is not None and value not in seen:
+                    seen.add(value)
+                    values.append((name, value))
+        with self._lock:
+            ## a replaced person keeps the searches that covered it, they return it again
+            self._remove(person_id, uncover=False)
+            self._people[person_id] = (next(self._seq), r)
+            self._values[person_id] = values
+            for name, value in values:
+                self._postings[name].setdefault(value, set()).add(person_id)
+            while self.max_entries is not None and len(self._people) > self.max_entries:
+                self._remove(next(iter(self._people)))
+
+    def _remove(self, person_id: str, uncover: bool = True):
+        if self._people.pop(person_id, None) is None:
+            return
+        values = self._values.pop(person_id)
+        for name, value in values:
+            ids = self._postings[name][value]
+            ids.discard(person_id)
+            if not ids:
+                del self._postings[name][value]
+        if uncover:
+            ## searches that returned the person no longer have all their results
+            held = set(values)
+            self._covered = [
+                (k, atoms, at)
+                for k, atoms, at in self._covered
+                if atoms is not None and not all(any((f, v) in held for v in vs) for f, vs in atoms)
+            ]
+
+    def remove(self, person_id: str):
+        with self._lock:
+            self._remove(person_id)
+
+    def _expired(self, r: Response) -> bool:
+        return self.ttl is not None and utcnow() - r.query_time > timedelta(seconds=self.ttl)
+
+    def mark_complete(self, query: dict[str, Any], person_ids: Iterable[str] = ()) -> bool:
+        """Record that every person matching the search query has been added. `person_ids`
+        are the search's results, it isn't recorded if one of them was evicted since.
+        Returns whether it was recorded
+        """
+        key = _canonical(query)
+        with self._lock:
+            if not all(person_id in self._people for person_id in person_ids):
+                return False
+            self._covered = [c for c in self._covered if c[0] != key]
+            self._covered.append((key, _atoms(query.get("query")), time.time()))
+            del self._covered[: -self.max_covered]
+        return True
+
+    def is_complete(self, query: dict[str, Any]) -> bool:
+        """Whether a completed search covers all results of the query"""
+        key = _canonical(query)
+        atoms = _atoms(query.get("query"))
+        with self._lock:
+            if self.ttl is not None:
+                oldest = time.time() - self.ttl
+                self._covered = [c for c in self._covered if c[2] > oldest]
+            covered = list(self._covered)
+        for k, c, _ in covered:
+            if k == key or (atoms is not None and c is not None and _implies(atoms, c)):
+                return True
+        return False
+
+    def search(self, query: dict[str, Any], limit: Optional[int] = None) -> LocalResult:
+        """The cached persons matching a search query (`{"query": ...}`), and whether that's all of them.
+        A query using anything unsupported, including `{"sql": ...}`, has no matches and isn't complete.
+        """
+        if "query" not in query:
+            return LocalResult([], False, "only Elasticsearch queries are supported")
+        with self._lock:
+            try:
+                ids = self._evaluate(query["query"])
+            except UnsupportedQuery as e:
+                return LocalResult([], False, str(e))
+            people = self._people
+            for person_id in [i for i in ids if self._expired(people[i][1])]:
+                self._remove(person_id)
+                ids.discard(person_id)
+            ordered = sorted((people[i] for i in ids), key=lambda p: p[0])
+        matches = [r for _, r in ordered[:limit]]
+        if self.is_complete(query):
+            return LocalResult(matches, True)
+        return LocalResult(matches, False, "no completed search covers the query")
+
+    def _evaluate(self, clause: Any) -> set[str]:
+        if not isinstance(clause, dict) or len(clause) != 1:
+            raise UnsupportedQuery(f"expected a single clause, got {clause!r}")
+        ((kind, body),) = clause.items()
+        if kind == "bool":
+            return self._bool(body)
+        if kind == "match_all":
+            return set(self._people)
+        if kind == "exists":
+            postings = self._field(body.get("field") if isinstance(body, dict) else None)
+            return set().union(*postings.values())
+        if kind in _TERM_CLAUSES or kind == "terms":
+            field, values = _leaf(kind, body)
+            postings = self._field(field)
+            normalize = FIELDS[field][1]
+            ids: set[str] = set()
+            for value in values:
+                ids |= postings.get(normalize(value) or "", set())
+            return ids
+        raise UnsupportedQuery(f"unsupported clause {kind!r}")
+
+    def _field(self, field: Any) -> dict[str, set[str]]:
+        if field not in FIELDS:
+            raise UnsupportedQuery(f"unsupported field {field!r}")
+        return self._postings[field]
+
+    def _bool(self, body: Any) -> set[str]:
+        if not isinstance(body, dict) or set(body) - {"must", "filter", "should", "must_not"}:
+            raise UnsupportedQuery(f"unsupported bool query {body!r}")
+        required = [*_clauses(body.get("must")), *_clauses(body.get("filter"))]
+        ids: Optional[set[str]] = None
+        ## smallest first, so the intersection stays small
+        for result in sorted((self._evaluate(c) for c in required), key=len):
+            ids = result if ids is None else ids & result
+        should = _clauses(body.get("should"))
+        if should and not required:
+            ## without must/filter at least one should clause has to match
+            ids = set().union(*(self._evaluate(c) for c in should))
+        if ids is None:
+            ids = set(self._people)
+        for c in _clauses(body.get("must_not")):
+            ids = ids - self._evaluate(c)
+        return ids
+
+
+def _clauses(value: Any) -> list[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _leaf(kind: str, body: Any) -> tuple[str, list[Any]]:
+    """The field and values of a term(s)/match clause"""
+    if not isinstance(body, dict) or len(body) != 1:
+        raise UnsupportedQuery(f"expected one field in {kind!r}, got {body!r}")
+    ((field, value),) = body.items()
+    if kind == "terms":
+        if not isinstance(value, list):
+            raise UnsupportedQuery(f"expected a list of values for {field!r}")
+        return field, value
+    if isinstance(value, dict):
+        ## {"field": {"value": ...}} or {"field": {"query": ...}}
+        value = value.get("value", value.get("query"))
+    return field, [value]
+
+
+def _canonical(query: dict[str, Any]) -> str:
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+def _atoms(clause: Any) -> Optional[Atoms]:
+    """The query as a conjunction of term(s) clauses on FIELDS, None if it isn't one"""
+    if not isinstance(clause, dict) or len(clause) != 1:
+        return None
+    ((kind, body),) = clause.items()
+    if kind == "match_all":
+        return frozenset()
+    if kind == "bool":
+        if not isinstance(body, dict) or set(body) - {"must", "filter"}:
+            return None
+        atoms: set[tuple[str, frozenset[str]]] = set()
+        for c in [*_clauses(body.get("must")), *_clauses(body.get("filter"))]:
+            sub = _atoms(c)
+            if sub is None:
+                return None
+            atoms |= sub
+        return frozenset(atoms)
+    if kind in _TERM_CLAUSES or kind == "terms":
+        try:
+            field, values = _leaf(kind, body)
+        except UnsupportedQuery:
+            return None
+        if field not in FIELDS:
+            return None
+        normalize = FIELDS[field][1]
+        return frozenset([(field, frozenset(normalize(v) or "" for v in values))])
+    return None
+
+
+def _implies(query: Atoms, covered: Atoms) -> bool:
+    """Whether every person matching `query` matches `covered`: each covered clause
+    has a query clause on the same field allowing a subset of its values
+    """
+    return all(any(f == field and v <= values for f, v in query) for field, values in covered)
@@ -0,0 +1,124 @@
+import bisect
+import contextlib
+import threading
+import time
+from typing import ContextManager, Iterator
+
+_NOOP = contextlib.nullcontext()
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """Metrics hook for PDLPersonAPI, the default does nothing.
+
+    Match types are "exact" (same query key), "identity" (found through the
+    identifier index), "negative" (a known not_found query) and "local" (a search
+    answered by the LocalIndex). Stages timed are "lookup", "network" and "parse".
+    """
+
+    def cache_hit(self, match: str):
+        pass
+
+    def cache_miss(self):
+        pass
+
+    def api_call(self, api_type: str):
+        pass
+
+    def api_error(self, status: int):
+        pass
+
+    def time(self, stage: str) -> ContextManager:
+        return _NOOP
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class PrometheusMetrics(Metrics):
+    """Thread-safe in-process metrics rendered in the Prometheus text format"""
+
+    def __init__(self, prefix: str = "pdl", buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.hits: dict[str, int] = {}
+        self.misses = 0
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.latency: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def cache_hit(self, match: str):
+        with self._lock:
+            self.hits[match] = self.hits.get(match, 0) + 1
+
+    def cache_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def api_call(self, api_type: str):
+        with self._lock:
+            self.calls[str(api_type)] = self.calls.get(str(api_type), 0) + 1
+
+    def api_error(self, status: int):
+        kind = str(status) if status in (402, 404) else "other"
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self.latency:
+                self.latency[stage] = Histogram(self.buckets)
+            self.latency[stage].observe(seconds)
+
+    @contextlib.contextmanager
+    def _timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def time(self, stage: str) -> ContextManager:
+        return self._timer(stage)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        p = self.prefix
+        lines = []
+
+        def counter(name: str, help: str, values: dict[str, int], label: str):
+            lines.append(f"# HELP {p}_{name} {help}")
+            lines.append(f"# TYPE {p}_{name} counter")
+            for k, v in sorted(values.items()):
+                lines.append(f'{p}_{name}{{{label}="{k}"}} {v}')
+
+        with self._lock:
+            counter("cache_hits_total", "Cache hits by match type", self.hits, "match")
+            lines.append(f"# HELP {p}_cache_misses_total Cache misses")
+            lines.append(f"# TYPE {p}_cache_misses_total counter")
+            lines.append(f"{p}_cache_misses_total {self.misses}")
+            counter("api_calls_total", "API calls by type", self.calls, "api_type")
+            counter("api_errors_total", "API error responses by status", self.errors, "status")
+            lines.append(f"# HELP {p}_stage_seconds Time spent per stage")
+            lines.append(f"# TYPE {p}_stage_seconds histogram")
+            for stage, h in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip((*h.buckets, float("inf")), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,19 @@
+import functools
+from typing import Optional
+
+
+@functools.lru_cache(maxsize=4096)
+def date_ordinal(value: Optional[str]) -> int:
+    """Sortable int for a PDL partial date, "YYYY", "YYYY-MM" or "YYYY-MM-DD".
+    Missing month/day sort before any given one, None and unparseable dates are 0.
+    """
+    if not value:
+        return 0
+    parts = value.split("-", 2)
+    try:
+        year = int(parts[0])
+        month = int(parts[1]) if len(parts) > 1 else 0
+        day = int(parts[2][:2]) if len(parts) > 2 else 0
+    except ValueError:
+        return 0
+    return year * 10000 + month * 100 + day
@@ -0,0 +1,61 @@
+import json
+from typing import Any, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from pdl_api.models.person import Person
+from pdl_api.models.response import ErrorResponse, Response
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON with orjson when it's installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ApiRecord(BaseModel):
+    """A person record as the API sends it, validated straight from the JSON body"""
+
+    status: int
+    data: Optional[Person] = None
+    error: Optional[ErrorResponse] = None
+    likelihood: Optional[int] = None
+    dataset_version: Optional[str] = None
+
+
+def decode_person_response(
+    body: bytes | str, query: dict[str, Any], lazy: bool = False
+) -> Optional[Response]:
+    """Build a Response from a successful API body without intermediate dicts.
+    Returns None if the body isn't a successful person record, the caller then
+    goes through the dict path which handles errors.
+    """
+    if lazy:
+        record = loads(body)
+        if not isinstance(record, dict) or record.get("status") != 200:
+            return None
+        record["query"] = query
+        r = Response.model_validate_lazy(record)
+        r._size.value = len(body)
+        return r
+    try:
+        record = ApiRecord.model_validate_json(body)
+    except ValidationError:
+        return None
+    if record.status != 200:
+        return None
+    r = Response.model_construct(
+        person=record.data,
+        status=record.status,
+        dataset_version=record.dataset_version,
+        likelihood=record.likelihood,
+        query=query,
+    )
+    r._size.value = len(body)
+    return r
@@ -9,3 +9,11 @@ class PDLAccountLimitException(PDLException):
 
 class PDLUnknownException(PDLException):
     pass
+
+class PDLTransientException(PDLException):
+    """A 429, 5xx or timeout that persisted through all retries, never cached"""
+    pass
+
+class PDLDeadlineException(PDLException):
+    """A scheduled request whose deadline passed before it could be sent"""
+    pass
@@ -0,0 +1,127 @@
+import contextlib
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass
+class InternStats:
+    hits: int = 0
+    misses: int = 0
+    ## Same key but different data, validated without interning
+    conflicts: int = 0
+    ## Approximate bytes of the instances that hits didn't have to allocate
+    bytes_saved: int = 0
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate memory of a model including its fields and nested models"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, BaseModel):
+        size += sys.getsizeof(obj.__dict__)
+        return size + sum(deep_sizeof(v) for v in obj.__dict__.values())
+    if isinstance(obj, (list, tuple)):
+        return size + sum(deep_sizeof(v) for v in obj)
+    return size
+
+
+def matches(value: Any, data: Any) -> bool:
+    """Whether validating `data` would give `value`, without validating it"""
+    if isinstance(value, BaseModel):
+        if not isinstance(data, dict):
+            return False
+        fields = value.__dict__
+        for k, v in fields.items():
+            if k in data:
+                if not matches(v, data[k]):
+                    return False
+            elif v is not None:
+                return False
+        return True
+    if isinstance(value, list):
+        return isinstance(data, list) and len(value) == len(data) and all(map(matches, value, data))
+    return value == data
+
+
+class Interner:
+    """Shared instances of repeated submodels, by kind and key.
+
+    An instance is only reused when the new data is identical to what it was built
+    from, otherwise the data is validated as usual and counted as a conflict.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.tables: dict[str, dict[str, tuple[BaseModel, int]]] = {}
+        self.stats = InternStats()
+        self._lock = threading.Lock()
+
+    def intern(self, kind: str, key: str, data: dict[str, Any], build: Callable[[dict[str, Any]], M]) -> Optional[M]:
+        """The shared instance for `data`, built with `build` on first use.
+        None when another instance already has the key.
+        """
+        table = self.tables.setdefault(kind, {})
+        entry = table.get(key)
+        if entry is not None:
+            instance, size = entry
+            if matches(instance, data):
+                with self._lock:
+                    self.stats.hits += 1
+                    self.stats.bytes_saved += size
+                return instance  # type: ignore[return-value]
+            with self._lock:
+                self.stats.conflicts += 1
+            return None
+        instance = build(data)
+        with self._lock:
+            self.stats.misses += 1
+            if len(table) < self.max_entries:
+                table.setdefault(key, (instance, deep_sizeof(instance)))
+        return instance
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self.tables.values())
+
+    def report(self) -> dict[str, Any]:
+        return {**asdict(self.stats), "entries": {kind: len(t) for kind, t in self.tables.items()}}
+
+
+## The active interner, None unless interning is enabled. It's process wide: every
+## client, thread and cache decoding models shares it, which is why it isn't a setting
+_interner: Optional[Interner] = None
+
+
+def get_interner() -> Optional[Interner]:
+    return _interner
+
+
+def enable_interning(interner: Optional[Interner] = None) -> Interner:
+    """Intern Company and Location submodels in every model validated from now on,
+    by any client in the process. Interned instances are frozen, as they are shared
+    between persons.
+    """
+    global _interner
+    _interner = interner or _interner or Interner()
+    return _interner
+
+
+def disable_interning():
+    global _interner
+    _interner = None
+
+
+@contextlib.contextmanager
+def interning(interner: Optional[Interner] = None) -> Iterator[Interner]:
+    """Enable interning for the duration of the block"""
+    global _interner
+    previous = _interner
+    _interner = interner or Interner()
+    try:
+        yield _interner
+    finally:
+        _interner = previous
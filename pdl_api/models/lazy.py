@@ -0,0 +1,141 @@
+import functools
+from typing import Any, Callable, ClassVar, Self, get_args
+
+from pydantic import BaseModel, PrivateAttr, TypeAdapter
+
+
+class LazyModel(BaseModel):
+    """A model whose `__lazy_fields__` can be kept as raw data and only validated
+    on first attribute access.
+
+    `model_validate_lazy` builds such an instance, the normal constructors validate
+    everything as before. Dumping, copying and comparing load all lazy fields first,
+    so a lazy instance behaves like an eagerly validated one.
+    """
+
+    __lazy_fields__: ClassVar[tuple[str, ...]] = ()
+
+    ## Raw values of the lazy fields that haven't been accessed yet
+    _raw: dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def model_validate_lazy(cls, data: dict[str, Any]) -> Self:
+        raw = {k: data[k] for k in cls.__lazy_fields__ if data.get(k) is not None}
+        obj = cls.model_validate({k: v for k, v in data.items() if k not in raw})
+        for k in raw:
+            obj.__dict__.pop(k, None)
+        obj._raw = raw
+        obj.__pydantic_fields_set__.update(raw)
+        return obj
+
+    def __getattr__(self, name: str) -> Any:
+        if not name.startswith("__"):
+            private = object.__getattribute__(self, "__pydantic_private__")
+            raw = private.get("_raw") if private else None
+            if raw and name in raw:
+                return self._load(name, raw)
+        return super().__getattr__(name)  # type: ignore[misc]
+
+    def __setattr__(self, name: str, value: Any):
+        private = object.__getattribute__(self, "__pydantic_private__")
+        if private and private.get("_raw"):
+            private["_raw"].pop(name, None)
+        super().__setattr__(name, value)
+
+    def _load(self, name: str, raw: dict[str, Any]) -> Any:
+        try:
+            value = _loader(type(self), name)(raw[name])
+        except KeyError:
+            ## loaded by another thread in the meantime
+            return self.__dict__[name]
+        self.__dict__[name] = value
+        raw.pop(name, None)
+        if not raw:
+            ## restore the field order, serialization follows it
+            d = self.__dict__
+            ordered = {k: d[k] for k in type(self).model_fields if k in d}
+            ## swapped in whole, a thread sharing the instance never sees it half built
+            object.__setattr__(self, "__dict__", ordered)
+        return value
+
+    def is_loaded(self, name: str) -> bool:
+        return name not in self._raw
+
+    def raw_value(self, name: str) -> Any:
+        """The raw data of a field that hasn't been loaded yet, else None"""
+        return self._raw.get(name)
+
+    def has_value(self, name: str) -> bool:
+        """Whether a field is not None, without loading it"""
+        return name in self._raw or self.__dict__.get(name) is not None
+
+    def materialize(self) -> Self:
+        """Load all lazy fields, including those of nested lazy models"""
+        raw = self._raw
+        for name in list(raw):
+            self._load(name, raw)
+        for value in self.__dict__.values():
+            if isinstance(value, LazyModel):
+                value.materialize()
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, LazyModel):
+                        item.materialize()
+        return self
+
+    def model_dump(self, **kwargs) -> dict[str, Any]:
+        if self._needs_load():
+            self.materialize()
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        if self._needs_load():
+            self.materialize()
+        return super().model_dump_json(**kwargs)
+
+    def model_copy(self, **kwargs) -> Self:
+        if self._needs_load():
+            self.materialize()
+        return super().model_copy(**kwargs)
+
+    def __copy__(self) -> Self:
+        ## a shallow copy would share _raw, and lose the fields the original loads
+        if self._needs_load():
+            self.materialize()
+        return super().__copy__()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyModel):
+            self.materialize()
+            other.materialize()
+        return super().__eq__(other)
+
+    def __getstate__(self) -> dict[Any, Any]:
+        self.materialize()
+        return super().__getstate__()
+
+    def __repr_args__(self):
+        self.materialize()
+        return super().__repr_args__()
+
+    def _needs_load(self) -> bool:
+        """Whether this or a nested lazy model still has raw fields"""
+        if self._raw:
+            return True
+        for value in self.__dict__.values():
+            if isinstance(value, LazyModel) and value._needs_load():
+                return True
+            if isinstance(value, list) and value and isinstance(value[0], LazyModel):
+                if any(item._needs_load() for item in value):
+                    return True
+        return False
+
+
+@functools.cache
+def _loader(cls: type[LazyModel], name: str) -> Callable[[Any], Any]:
+    """Validator for one lazy field, nested lazy models stay lazy"""
+    annotation = cls.model_fields[name].annotation
+    for arg in (annotation, *get_args(annotation)):
+        if isinstance(arg, type) and issubclass(arg, LazyModel):
+            return arg.model_validate_lazy
+    return TypeAdapter(annotation).validate_python
@@ -1,6 +1,33 @@
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, ValidatorFunctionWrapHandler, field_validator
+
+from pdl_api.models import intern
+from pdl_api.models.dates import date_ordinal
+from pdl_api.models.lazy import LazyModel
+
+T = TypeVar("T")
+
+
+class _Views(dict):
+    """Memoized derived views of a model, key -> (source, view). They aren't part
+    of the model's state, so they compare equal, aren't copied and aren't pickled.
+    """
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _Views)
+
+    def __ne__(self, other: Any) -> bool:
+        return not isinstance(other, _Views)
+
+    def __copy__(self) -> "_Views":
+        return _Views()
+
+    def __deepcopy__(self, memo: dict) -> "_Views":
+        return _Views()
+
+    def __reduce__(self):
+        return (_Views, ())
 
 
 class Location(BaseModel):
@@ -28,6 +55,33 @@ class Location(BaseModel):
     )
 
 
+def _location_key(data: dict[str, Any]) -> Optional[str]:
+    name = data.get("name")
+    return " ".join(name.lower().split()) if isinstance(name, str) and name else None
+
+
+def _company_key(data: dict[str, Any]) -> Optional[str]:
+    return data.get("id") or None
+
+
+def _interned(
+    kind: str,
+    key: Callable[[dict[str, Any]], Optional[str]],
+    cls: Callable[[], type[BaseModel]],
+    value: Any,
+    handler: ValidatorFunctionWrapHandler,
+) -> Any:
+    """Wrap validator returning the shared instance when interning is enabled"""
+    interner = intern.get_interner()
+    if interner is None or type(value) is not dict:
+        return handler(value)
+    k = key(value)
+    if k is None:
+        return handler(value)
+    instance = interner.intern(kind, k, value, cls().model_validate)
+    return handler(value) if instance is None else instance
+
+
 class Certification(BaseModel):
     end_date: Optional[str] = Field(
         default=None, description="The expiration date of the certification"
@@ -60,6 +114,11 @@ class EducationSchool(BaseModel):
         default=None, description="The website URL associated with the school"
     )
 
+    @field_validator("location", mode="wrap")
+    @classmethod
+    def _intern_location(cls, value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+        return _interned("location", _location_key, lambda: _InternedLocation, value, handler)
+
 
 class Education(BaseModel):
     degrees: Optional[list[str]] = Field(
@@ -131,6 +190,29 @@ class Company(BaseModel):
         default=None, description="The company's primary website, cleaned and standardized"
     )
 
+    @field_validator("location", mode="wrap")
+    @classmethod
+    def _intern_location(cls, value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+        return _interned("location", _location_key, lambda: _InternedLocation, value, handler)
+
+
+class _InternedLocation(Location, frozen=True):
+    """A Location shared through interning, equal to a Location with the same values"""
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Location):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
+
+class _InternedCompany(Company, frozen=True):
+    """A Company shared through interning, equal to a Company with the same values"""
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Company):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
 
 class ExperienceTitle(BaseModel):
     levels: Optional[list[str]] = Field(default=None, description="The level(s) of the job title")
@@ -174,8 +256,15 @@ class Experience(BaseModel):
         default=None, description="The person's job title while at the company"
     )
 
+    @field_validator("company", mode="wrap")
+    @classmethod
+    def _intern_company(cls, value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+        return _interned("company", _company_key, lambda: _InternedCompany, value, handler)
+
+
+class Person(LazyModel):
+    __lazy_fields__ = ("certifications", "education", "emails", "experience")
 
-class Person(BaseModel):
     birth_date: Optional[str] = Field(default=None, description="The day the person was born")
     birth_year: Optional[int] = Field(default=None, description="The year the person was born")
     certifications: Optional[list[Certification]] = Field(
@@ -218,10 +307,49 @@ class Person(BaseModel):
         default=None, description="The person's GitHub profile username based on source agreement"
     )
     id: str = Field(default=None, description="A unique persistent identifier for the person")
+    linkedin_url: Optional[str] = Field(
+        default=None, description="The person's LinkedIn profile URL based on source agreement"
+    )
+    twitter_url: Optional[str] = Field(
+        default=None, description="The person's Twitter profile URL based on source agreement"
+    )
     industry: Optional[str] = Field(
         default=None, description="The most relevant industry for this person based on their work history"
     )
 
+    ## Sorted and derived views of emails and experience, rebuilt when a field is reassigned.
+    ## Mutating the lists in place isn't noticed.
+    _views: _Views = PrivateAttr(default_factory=_Views)
+
+    def _view(self, source: str, key: str, build: Callable[..., T], *args: Any) -> T:
+        """Memoized `build(getattr(self, source), *args)`, valid while the field is the same list"""
+        value = getattr(self, source)
+        ## skips pydantic's __getattr__ for private attributes, this is the hot path
+        views = self.__pydantic_private__["_views"]
+        entry = views.get(key)
+        if entry is not None and entry[0] is value:
+            return entry[1]
+        result = build(value or (), *args)
+        views[key] = (value, result)
+        return result
+
+    def sorted_emails(self, reverse: bool = True) -> tuple[Email, ...]:
+        """The emails by last_seen, latest first unless `reverse` is False"""
+        return self._view("emails", "emails" if reverse else "emails_asc", _sort_emails, reverse)
+
+    def sorted_experience(self, reverse: bool = True) -> tuple[Experience, ...]:
+        """The experience by start_date, latest first unless `reverse` is False"""
+        return self._view("experience", "experience" if reverse else "experience_asc", _sort_experience, reverse)
+
+    def latest_email(self, type: Optional[str] = None) -> Optional[Email]:
+        """The most recently seen email, of the given type if any"""
+        return self._view("emails", "latest_email", _latest_emails).get(type)
+
+    @property
+    def current_experience(self) -> Optional[Experience]:
+        """The primary experience, else the latest one without an end date"""
+        return self._view("experience", "current_experience", _current_experience)
+
     def get_emails(
         self,
         filter: Optional[dict[str, Any]] = None,
@@ -231,24 +359,18 @@ class Person(BaseModel):
         """
         Get the emails of the person.
         Args:
-            sort_by_start_date (bool): Sort the emails by start date
+            filter (dict): Only emails whose attributes equal these values
+            sort_by_last_seen (bool): Sort the emails by last seen date
             reverse (bool): Reverse the order of the emails
         Returns:
             list[Email]: The emails of the person
         """
         if not self.emails:
             return []
-        l = self.emails.copy()
+        l = self.sorted_emails(reverse) if sort_by_last_seen else self.emails
         if filter is not None:
-            l = [
-                email
-                for email in l
-                if all(getattr(email, key) == value for key, value in filter.items())
-            ]
-
-        if sort_by_last_seen:
-            return sorted(l, key=lambda x: str(x.last_seen) if x.last_seen else str(0), reverse=reverse)
-        return l
+            return [email for email in l if all(getattr(email, key) == value for key, value in filter.items())]
+        return list(l)
 
     def get_experiences(
         self, sort_by_start_date: bool = True, reverse: bool = True
@@ -263,7 +385,33 @@ class Person(BaseModel):
         if not self.experience:
             return []
         if sort_by_start_date:
-            return sorted(
-                self.experience, key=lambda x: str(x.start_date) if x.start_date else str(0), reverse=reverse
-            )
+            return list(self.sorted_experience(reverse))
         return self.experience
+
+
+def _sort_emails(emails: list[Email], reverse: bool) -> tuple[Email, ...]:
+    return tuple(sorted(emails, key=lambda e: date_ordinal(e.last_seen), reverse=reverse))
+
+
+def _sort_experience(exps: list[Experience], reverse: bool) -> tuple[Experience, ...]:
+    return tuple(sorted(exps, key=lambda e: date_ordinal(e.start_date), reverse=reverse))
+
+
+def _latest_emails(emails: list[Email]) -> dict[Optional[str], Email]:
+    """The latest email overall (None) and of each type"""
+    latest: dict[Optional[str], Email] = {}
+    for email in _sort_emails(emails, True):
+        latest.setdefault(None, email)
+        latest.setdefault(email.type, email)
+    return latest
+
+
+def _current_experience(exps: list[Experience]) -> Optional[Experience]:
+    ordered = _sort_experience(exps, True)
+    for exp in ordered:
+        if exp.is_primary:
+            return exp
+    for exp in ordered:
+        if not exp.end_date:
+            return exp
+    return None
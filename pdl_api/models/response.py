@@ -1,23 +1,52 @@
 from datetime import UTC, datetime
-from typing import Optional
+from typing import Any, Optional, Self
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
-from pdl_api.models.person import Person
+from pdl_api.models.lazy import LazyModel
+from pdl_api.models.person import Company, Person
 
 
 def utcnow():
     return datetime.now(UTC)
 
 
+class SizeHint:
+    """A size carried along a model, which doesn't take part in its equality"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Optional[int] = None):
+        self.value = value
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SizeHint)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
 class ErrorResponse(BaseModel):
     type: str = Field(..., description="The type of error")
     message: str = Field(..., description="The error message")
 
 
-class Response(BaseModel):
+def _remap_data(data: dict[str, Any]) -> dict[str, Any]:
+    """API records have the person or error under "data", move it to its own key"""
+    if "data" in data:
+        if "error" in data or "person" in data:
+            raise ValueError("Response can't have both 'data' and 'error' or 'person' keys")
+
+        is_person = "status" in data and data["status"] == 200
+        p_or_e_key = "person" if is_person else "error"
+        data[p_or_e_key] = data.pop("data", {})
+    return data
+
+
+class Response(LazyModel):
     """The response from the API extended with additional data"""
 
+    __lazy_fields__ = ("person",)
+
     person: Optional[Person] = Field(
         None, description="The person data, if the response is successful"
     )
@@ -36,25 +65,25 @@ class Response(BaseModel):
     query_time: datetime = Field(default_factory=utcnow)
     additional_data: dict = Field(default_factory=dict)
 
+    ## Length of the JSON the response was decoded from, when known, for byte budgets
+    _size: "SizeHint" = PrivateAttr(default_factory=lambda: SizeHint())
+
     def __init__(self, **data):
         """Check whether the response is an error or a person response
         and create the appropriate object.
         From an api request the objects are in "data", if the response is from our data model
         it will be under "person" or "error" keys.
         """
-        if "data" in data:
-            if "error" in data or "person" in data:
-                raise ValueError("Response can't have both 'data' and 'error' or 'person' keys")
-
-            is_person = "status" in data and data["status"] == 200
-            p_or_e_key = "person" if is_person else "error"
-            data[p_or_e_key] = data.pop("data", {})
+        super().__init__(**_remap_data(data))
 
-        super().__init__(**data)
+    @classmethod
+    def model_validate_lazy(cls, data: dict[str, Any]) -> Self:
+        """Like `Response(**data)`, but the person is only validated when accessed"""
+        return super().model_validate_lazy(_remap_data(dict(data)))
 
     @property
     def is_person(self) -> bool:
-        return self.person is not None
+        return self.has_value("person")
 
     @property
     def is_error(self) -> bool:
@@ -71,3 +100,58 @@ class Response(BaseModel):
         if not self.error:
             raise ValueError("No error data")
         return self.error
+
+
+## Keys of a company enrichment record that aren't company fields
+_COMPANY_RECORD_KEYS = frozenset(
+    {"status", "likelihood", "error", "query", "query_time", "additional_data", "metadata", "dataset_version"}
+)
+
+
+def _remap_company(data: dict[str, Any]) -> dict[str, Any]:
+    """Company enrichment records have the company fields at the top level, or under
+    "data" like person records, move them to their own key
+    """
+    if "company" in data or "error" in data:
+        return data
+    if "data" in data:
+        key = "company" if data.get("status") == 200 else "error"
+        data[key] = data.pop("data")
+    elif data.get("status") == 200:
+        data["company"] = {k: data.pop(k) for k in list(data) if k not in _COMPANY_RECORD_KEYS}
+    return data
+
+
+class CompanyResponse(BaseModel):
+    """The response from the company enrichment API extended with additional data"""
+
+    company: Optional[Company] = Field(
+        None, description="The company data, if the response is successful"
+    )
+    error: Optional[ErrorResponse] = Field(
+        None, description="The error response, if an error occurred"
+    )
+    status: int = Field(..., description="The HTTP status code of the response")
+    likelihood: Optional[int] = Field(
+        default=None, description="The likelihood of a match. Only present in successful responses."
+    )
+    query: dict = Field(default_factory=dict)
+    query_time: datetime = Field(default_factory=utcnow)
+    additional_data: dict = Field(default_factory=dict)
+
+    def __init__(self, **data):
+        super().__init__(**_remap_company(data))
+
+    @property
+    def is_company(self) -> bool:
+        return self.company is not None
+
+    @property
+    def is_error(self) -> bool:
+        return self.error is not None
+
+    @property
+    def safe_company(self) -> Company:
+        if not self.company:
+            raise ValueError("No company data")
+        return self.company
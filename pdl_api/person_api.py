@@ -1,12 +1,33 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
 from enum import StrEnum
-from typing import Any, Hashable, Optional, TypeVar
+from typing import Any, Callable, Iterable, Iterator, MutableMapping, Optional, Self, TypeVar
 
+import requests
 from peopledatalabs import PDLPY  # type: ignore
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from pdl_api.models.exceptions import PDLAccountLimitException, PDLUnknownException
-from pdl_api.models.response import Response
+from pdl_api.cache.negative import NegativeCache
+from pdl_api.cache.snapshot import SnapshotCache
+from pdl_api.keys import param_identifiers, query_key
+from pdl_api.local_index import LocalIndex
+from pdl_api.metrics import Metrics
+from pdl_api.models.exceptions import (
+    PDLAccountLimitException,
+    PDLException,
+    PDLTransientException,
+    PDLUnknownException,
+)
+from pdl_api.models.decode import decode_person_response, loads
+from pdl_api.models.response import ErrorResponse, Response
+from pdl_api.prefetch import prefetch as prefetch_iter
+from pdl_api.query_cache import QueryCacheMixin
+from pdl_api.rate_limit import RETRY_STATUSES, TokenBucket, backoff
+from pdl_api.refresh import Freshness, Refresher, freshness, version_key
 
 
 class APIType(StrEnum):
@@ -28,28 +49,170 @@ class PDLSettings(BaseSettings):
 
     query_type: APIType = APIType.ENRICH
 
+    ## Override the PDL API url, e.g. a local stand-in "http://127.0.0.1:8765/v5"
+    base_path: Optional[str] = None
+
+    ## Maximum number of records per bulk enrichment call
+    bulk_size: int = 100
+
+    ## Maximum number of concurrent requests for the async and threaded clients
+    max_concurrency: int = 10
+
+    ## Use a lock-striped ShardedCache so one instance can be shared across threads.
+    ## The cache_path and cache_url caches are thread-safe already
+    thread_safe: bool = False
+
+    ## Keep the raw person data and only validate it when accessed
+    lazy_parsing: bool = False
+
+    ## Persist responses to this sqlite file instead of an in-memory dict
+    cache_path: Optional[str] = None
+
+    ## Share responses between processes and nodes through this Redis server
+    ## (RedisCache), e.g. redis://:password@host:6379/0. Takes precedence over cache_path
+    cache_url: Optional[str] = None
+
+    ## Read cached responses from this memory-mapped snapshot (SnapshotCache), shared
+    ## by all processes opening it. New responses go to the cache chosen above
+    cache_snapshot_path: Optional[str] = None
+
+    ## Bound the in-memory cache (LRUCache), None means unbounded. Only for the
+    ## in-memory cache, setting them with cache_path or cache_url is an error
+    cache_max_entries: Optional[int] = None
+    cache_max_bytes: Optional[int] = None
+    ## Seconds until a cached success / not_found response expires. Not supported by
+    ## the sqlite cache of cache_path
+    cache_ttl: Optional[float] = None
+    cache_not_found_ttl: Optional[float] = None
+
+    ## Keep not_found results as hashed query keys in a NegativeCache instead of as
+    ## Responses in the cache, expiring after cache_not_found_ttl
+    negative_cache: bool = False
+
+    ## Index the persons saved by this process in a LocalIndex, so search_people can
+    ## answer searches from them. Holds at most local_index_max_entries persons, which
+    ## expire like the cache (cache_ttl, cache_refresh_days, cache_expire_days)
+    local_index: bool = False
+    local_index_max_entries: Optional[int] = 100_000
+
+    ## Cached responses younger than cache_refresh_days are served as they are, older
+    ## ones are served while a background refresh replaces them, and ones older than
+    ## cache_expire_days are fetched again before returning. None disables each step
+    cache_refresh_days: Optional[float] = None
+    cache_expire_days: Optional[float] = None
+    ## Background refreshes go out in bulk batches of refresh_batch_size, or after
+    ## refresh_interval seconds, at most refresh_rate records per second
+    refresh_batch_size: int = 100
+    refresh_interval: float = 5.0
+    refresh_rate: Optional[float] = None
+
+    ## Client side rate limit in requests per second, None until PDL reports one
+    rate_limit: Optional[float] = None
+    rate_burst: int = 10
+    ## Retries for 429/5xx/timeouts, with jittered exponential backoff in seconds
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    ## Request timeout in seconds for the async client. PDLPY sends its requests
+    ## without one and has no way to pass it, so the sync API can't apply it
+    timeout: Optional[float] = None
+
     model_config = SettingsConfigDict(env_prefix="pdl_")
 
-def param_hash(d: dict | list | Hashable) -> int:
-    """Convert dict/lists/primitives to a hash"""
-    if isinstance(d, dict):
-        items = sorted((key, param_hash(value)) for key, value in d.items())
-        return hash(frozenset(items))
-    # Convert lists to tuples of hashed elements
-    elif isinstance(d, list):
-        t = tuple(param_hash(item) for item in d)
-        return hash(t)
-    # For other types, use the default hash value
-    else:
-        return hash(d)
+    @model_validator(mode="after")
+    def _check_cache_limits(self) -> Self:
+        """Reject limits the chosen cache would ignore: sizes only bound the in-memory
+        caches and the sqlite cache doesn't expire
+        """
+        backend = "cache_url" if self.cache_url else "cache_path" if self.cache_path else None
+        if backend is None:
+            return self
+        for name in ("cache_max_entries", "cache_max_bytes"):
+            if getattr(self, name) is not None:
+                raise ValueError(f"{name} only bounds the in-memory cache, it can't be used with {backend}")
+        if backend == "cache_path":
+            ## SQLiteCache keeps responses until they're replaced, RedisCache expires them
+            ## not_found responses go to the NegativeCache instead with negative_cache
+            ttls = ("cache_ttl",) if self.negative_cache else ("cache_ttl", "cache_not_found_ttl")
+            for name in ttls:
+                if getattr(self, name) is not None:
+                    raise ValueError(f"{name} isn't supported by the sqlite cache of cache_path")
+        return self
+
+def param_hash(d: dict[str, Any]) -> str:
+    """Convert query params to their cache key, kept for backwards compatibility
+    with callers of the old hash()-based function. Prefer `keys.query_key`.
+    """
+    return query_key(d)
+
+
+def response_json(r: requests.Response | Any) -> Any:
+    """The JSON body of an HTTP response, or an error record if it isn't JSON (e.g. a 502 page)"""
+    try:
+        return loads(r.content)
+    except ValueError:
+        return {"status": r.status_code, "error": {"type": "http_error", "message": r.text[:200]}}
+
+
+## Message of the not_found Responses served from the negative cache, if the API gave none
+NOT_FOUND_MESSAGE = "No records were found matching your request"
+
+
+def with_retries(
+    call: Callable[[], requests.Response], rate_limiter: TokenBucket, settings: PDLSettings
+) -> requests.Response:
+    """Rate limit `call` and retry it on 429/5xx/timeouts with jittered backoff.
+    The last response is returned once retries run out, so its status reaches
+    `_to_response`, a network error is raised as PDLTransientException.
+    PDLPY doesn't set a timeout, so requests.Timeout only comes from clients that do.
+    """
+    s = settings
+    for attempt in range(s.max_retries + 1):
+        rate_limiter.acquire()
+        try:
+            r = call()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == s.max_retries:
+                raise PDLTransientException({}, str(e)) from e
+            time.sleep(backoff(attempt, s.backoff_base, s.backoff_max))
+            continue
+        rate_limiter.update(r.headers)
+        if r.status_code not in RETRY_STATUSES or attempt == s.max_retries:
+            return r
+        retry_after = r.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            rate_limiter.pause(float(retry_after))
+        else:
+            time.sleep(backoff(attempt, s.backoff_base, s.backoff_max))
+    raise AssertionError("unreachable")
+
+
+def check_record(json_response: dict[str, Any]):
+    """Raise for an API record whose error shouldn't be cached: a 402, a 429/5xx
+    that outlasted the retries or a 404 other than "not_found"
+    """
+    status = json_response["status"]
+    if status == 200:
+        return
+    msg = json_response.get("error",{}).get("message", "")
+    if status == 402:
+        raise PDLAccountLimitException(json_response, msg)
+    if status in RETRY_STATUSES:
+        raise PDLTransientException(json_response, msg)
+    error_type = json_response.get("error", {}).get("type", None)
+    if status == 404 and error_type != "not_found":
+        ## If it's "not_found", do an ErrorResponse as normal, but otherwise
+        ## raise an error
+        raise PDLUnknownException(json_response, msg)
 
 
 @dataclass
-class PDLPersonAPI:
+class PDLPersonAPI(QueryCacheMixin):
     settings: PDLSettings = field(default_factory=PDLSettings)
 
-    ## Temporary cache for the queries to avoid repeated calls
-    existing_queries: dict[int, Response] = field(default_factory=dict)
+    ## Cache for the queries to avoid repeated calls. A dict by default,
+    ## or any IndexedCache such as SQLiteCache
+    existing_queries: MutableMapping[str, Response] = field(default_factory=dict)
 
     ## PDL API client
     client: Optional[PDLPY] = None
@@ -57,113 +220,512 @@ class PDLPersonAPI:
     ## initialize the client with these kwargs
     init_kwargs: dict[str, Any] = field(default_factory=dict)
 
+    ## Normalized identifier -> keys into existing_queries, kept up to date by save_queries
+    identity_index: dict[str, list[str]] = field(default_factory=dict)
+
+    ## Queries being fetched by a thread, so identical queries wait instead of refetching
+    _inflight_threads: dict[str, Future] = field(init=False, repr=False, default_factory=dict)
+    _inflight_lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+    ## Guards identity_index and its cache entries, written by the refresher thread too
+    _cache_lock: threading.RLock = field(init=False, repr=False, default_factory=threading.RLock)
+
+    ## Query keys known to be not_found, checked before existing_queries and the API.
+    ## Created from settings.negative_cache if not given
+    negative_cache: Optional[NegativeCache] = None
+
+    ## Secondary indexes of the cached persons for searches.
+    ## Created from settings.local_index if not given
+    local_index: Optional[LocalIndex] = None
+
+    ## Cache hit/miss, API call and latency metrics, e.g. PrometheusMetrics. Does nothing by default
+    metrics: Metrics = field(default_factory=Metrics)
+
+    ## Shared by all threads using this instance, adapts to PDL's rate limit headers
+    rate_limiter: TokenBucket = field(init=False, repr=False)
+
+    ## Refreshes stale responses in the background, set when settings.cache_refresh_days is
+    refresher: Optional[Refresher] = field(init=False, repr=False, default=None)
+
+    ## The newest dataset_version seen in a response
+    dataset_version: Optional[str] = field(init=False, repr=False, default=None)
+
+    ## Whether existing_queries was created from the settings, and is closed with the API
+    _owns_cache: bool = field(init=False, repr=False, default=False)
+
     def __post_init__(self):
+        s = self.settings
+        self.rate_limiter = TokenBucket(s.rate_limit, s.rate_burst)
+        self._refresh_after = timedelta(days=s.cache_refresh_days) if s.cache_refresh_days is not None else None
+        self._expire_after = timedelta(days=s.cache_expire_days) if s.cache_expire_days is not None else None
+        if self._refresh_after is not None:
+            self.refresher = Refresher(
+                self.refresh_queries,
+                batch_size=s.refresh_batch_size,
+                interval=s.refresh_interval,
+                rate=s.refresh_rate,
+            )
+        if self.negative_cache is None and s.negative_cache:
+            self.negative_cache = NegativeCache(ttl=s.cache_not_found_ttl)
         if self.client is None:
-            self.client = PDLPY(api_key=self.settings.api_key, **self.init_kwargs)
-    
-    def save_queries(self, queries: dict[int, Response]):
+            kwargs = dict(self.init_kwargs)
+            if self.settings.base_path:
+                kwargs.setdefault("base_path", self.settings.base_path)
+            self.client = PDLPY(api_key=self.settings.api_key, **kwargs)
+        self._init_cache()
+        if self.local_index is None and s.local_index:
+            ## not built from the cache, which would load every response of a lazy backend.
+            ## Searches are only complete once run in this process anyway
+            days = [d * 86400 for d in (s.cache_refresh_days, s.cache_expire_days) if d is not None]
+            ttls = [t for t in (s.cache_ttl, *days) if t is not None]
+            self.local_index = LocalIndex(max_entries=s.local_index_max_entries, ttl=min(ttls, default=None))
+
+    def close(self):
+        """Finish the background refreshes and flush the cache's buffered writes, closing
+        it if it was created from the settings. Call this (or use the API as a context
+        manager) before exiting, a SQLiteCache keeps up to `batch_size` writes buffered.
+        """
+        if self.refresher is not None:
+            self.refresher.close()
+        self._close_cache()
+
+    def __enter__(self) -> "PDLPersonAPI":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _default_cache(self) -> MutableMapping[str, Response]:
+        if self.settings.cache_snapshot_path:
+            ## new responses go to the cache the settings would otherwise pick
+            return SnapshotCache(self.settings.cache_snapshot_path, overlay=self._settings_cache())
+        return self._settings_cache()
+
+    def save_queries(self, queries: dict[str, Response]):
+        if self.local_index is not None:
+            for r in queries.values():
+                self.local_index.add(r)
+        if self.negative_cache is not None:
+            queries = self._save_not_found(queries)
+        self._store(queries)
+
+    def _save_not_found(self, queries: dict[str, Response]) -> dict[str, Response]:
+        """Add not_found responses to the negative cache, returning the others"""
+        negative = self.negative_cache
+        others = {}
         for hsh, r in queries.items():
-            self.existing_queries[hsh] = r
+            if r.error is not None and r.error.type == "not_found":
+                negative.add(  # type: ignore[union-attr]
+                    hsh, queried=r.query_time.timestamp(), message=r.error.message
+                )
+                continue
+            negative.discard(hsh)  # type: ignore[union-attr]
+            others[hsh] = r
+        return others
+
+    def _known_not_found(self, hsh: str, params: dict[str, Any]) -> Optional[Response]:
+        """The not_found Response the negative cache has for the query, rebuilt from
+        its query time and message
+        """
+        known = None if self.negative_cache is None else self.negative_cache.get(hsh)
+        if known is None:
+            return None
+        self.metrics.cache_hit("negative")
+        queried, message = known
+        error = ErrorResponse(type="not_found", message=message or NOT_FOUND_MESSAGE)
+        return Response(status=404, error=error, query=params, query_time=datetime.fromtimestamp(queried, UTC))
+
+    def _see_version(self, version: Optional[str]):
+        """Track the newest dataset_version the API has returned"""
+        if not version or version == self.dataset_version:
+            return
+        if self.dataset_version is None or version_key(version) > version_key(self.dataset_version):
+            self.dataset_version = version
+
+    def _serve(self, hsh: str, params: dict[str, Any], existing: Response) -> bool:
+        """Whether a cached response can be returned, queueing a refresh if it's stale.
+        A stale response from the newest dataset_version isn't refreshed, PDL would
+        return the same data.
+        """
+        if self._refresh_after is None and self._expire_after is None:
+            return True
+        state = freshness(existing, self._refresh_after, self._expire_after)
+        if state is Freshness.EXPIRED:
+            return False
+        if state is Freshness.STALE and self.refresher is not None:
+            if not existing.dataset_version or existing.dataset_version != self.dataset_version:
+                ## refresh the entry that was found, which may be under another query
+                if existing.query:
+                    hsh, params = query_key(existing.query), existing.query
+                self.refresher.submit(hsh, params)
+        return True
+
+    def refresh_queries(self, queries: dict[str, dict[str, Any]]) -> dict[str, Response]:
+        """Fetch queries ({key: params}) again and replace their cached responses"""
+        if self.settings.query_type != APIType.ENRICH:
+            results = {hsh: self._to_response(params, self._get_response(params)) for hsh, params in queries.items()}
+            self.save_queries(results)
+            return results
+        return self._fetch_many(queries, save=True)
 
     def find_existing_queries(
         self,
         params: dict[str, Any],
         limit: Optional[int] = None,
         only_person: Optional[bool] = None,
+        key: Optional[str] = None,
         **kwargs,
     ):
-        """Find existing queries"""
+        """Find existing queries, first by the exact query then through the identity index.
+        `key` is the precomputed query_key of params, if the caller already has it.
+        """
+        with self.metrics.time("lookup"):
+            matches, match = self._find_existing_queries(params, limit, only_person, key)
+        if match:
+            self.metrics.cache_hit(match)
+        else:
+            self.metrics.cache_miss()
+        return matches
+
+    def _find_existing_queries(
+        self,
+        params: dict[str, Any],
+        limit: Optional[int],
+        only_person: Optional[bool],
+        key: Optional[str],
+    ) -> tuple[list[Response], Optional[str]]:
+        """The matches and how the first was found, "exact" or "identity" """
         matches = []
-        hsh = param_hash(params)
-        if hsh in self.existing_queries:
-            matches.append(self.existing_queries[hsh])
+        hsh = key or query_key(params)
+        pr = self.existing_queries.get(hsh)
+        if pr is not None:
+            matches.append(pr)
+        match = "exact" if matches else None
         if limit and len(matches) >= limit:
-            return matches
-        for key, list_values in params.items():
-            for pr in self.existing_queries.values():
-                if only_person:  ## We either want only people or only errors
-                    ## skip if not a person
-                    if only_person and pr.is_error:
-                        continue
-                    ## skip if not an error
-                    if not only_person and pr.is_person:
-                        continue
-                person = pr.person
-                if not person:
+            return matches, match
+        seen = {id(pr) for pr in matches}
+        seen_keys = {hsh}
+        batched = self._batched
+        for ident in param_identifiers(params):
+            keys = [key for key in self._lookup(ident) if key not in seen_keys]
+            seen_keys.update(keys)
+            ## one round trip for all the keys of a shared backend
+            found = self.existing_queries.get_many(keys) if batched and keys else None  # type: ignore[attr-defined]
+            for key in keys:
+                pr = found.get(key) if found is not None else self.existing_queries.get(key)
+                ## skip entries removed from the cache or already matched
+                if pr is None or id(pr) in seen:
                     continue
-                emails = person.get_emails()
-                for email in emails:
-                    for val in list_values:
-                        if key == "email" and val == email.address:
-                            if not pr.query:
-                                print(f"Found {email.address} in {list_values} {pr.query}")
-                                pr.query = {"email": val}
-                                # save
-                                self.save_queries({hsh: pr})
-                            return [pr]
-
-                pr_email = pr.query.get("email")
-                if isinstance(pr_email, list):
-                    pr_email = pr_email[0]
-
-                match = True
-                for val in list_values:
-                    if key == "email" and pr_email and val == pr_email:
-                        break
-                else:
-                    match = False
-                if match:
-                    matches.append(pr)
-                    if limit and len(matches) >= limit:
-                        return matches
-        return matches
+                if only_person and pr.is_error:
+                    continue
+                seen.add(id(pr))
+                matches.append(pr)
+                match = match or "identity"
+                if limit and len(matches) >= limit:
+                    return matches, match
+        return matches, match
 
     def find_existing_query(self, params: dict[str, Any], **kwargs) -> Optional[Response]:
         """Find an existing person in the existing people"""
         l = self.find_existing_queries(params=params, limit=1, **kwargs)
         return l[0] if l else None
 
+    def _find_many(
+        self, queries: dict[str, dict[str, Any]], only_person: Optional[bool] = None, **kwargs
+    ) -> dict[str, Optional[Response]]:
+        """`find_existing_query` for many queries ({key: params}). A CacheBackend answers
+        them all in three round trips: the exact keys, the identifiers, and their keys
+        """
+        if not self._batched:
+            return {
+                hsh: self.find_existing_query(params=params, key=hsh, only_person=only_person, **kwargs)
+                for hsh, params in queries.items()
+            }
+        cache = self.existing_queries
+        results: dict[str, Optional[Response]] = {}
+        matches: dict[str, Optional[str]] = {}
+        with self.metrics.time("lookup"):
+            found = cache.get_many(queries) if queries else {}  # type: ignore[attr-defined]
+            idents = {hsh: param_identifiers(params) for hsh, params in queries.items() if hsh not in found}
+            wanted = {ident for l in idents.values() for ident in l}
+            keys = cache.lookup_many(wanted) if wanted else {}  # type: ignore[attr-defined]
+            candidates = {key for l in keys.values() for key in l} - found.keys()
+            responses = {**found, **(cache.get_many(candidates) if candidates else {})}  # type: ignore[attr-defined]
+            for hsh in queries:
+                pr, match = found.get(hsh), "exact" if hsh in found else None
+                for ident in idents.get(hsh, ()):
+                    for key in keys.get(ident, ()):
+                        candidate = responses.get(key)
+                        ## skip entries removed from the cache, and errors if only_person
+                        if key != hsh and candidate is not None and not (only_person and candidate.is_error):
+                            pr, match = candidate, "identity"
+                            break
+                    if pr is not None:
+                        break
+                results[hsh], matches[hsh] = pr, match
+        for match in matches.values():
+            if match:
+                self.metrics.cache_hit(match)
+            else:
+                self.metrics.cache_miss()
+        return results
+
     def get_person_via_email(self, email: str) -> Response:
         return self.get_person(params={"email": [email]})
 
-    def _get_response(self, params: dict[str, Any]) -> dict[str, Any]:
+    def _with_retries(self, call: Callable[[], requests.Response]) -> requests.Response:
+        return with_retries(call, self.rate_limiter, self.settings)
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any] | bytes:
+        """The API record for params, successful enrichments are left as the raw
+        body so `_to_response` can validate it straight from JSON
+        """
         if not self.client:
             raise ValueError("PDLPersonAPI: Client not initialized")
-        if self.settings.query_type == APIType.ENRICH:
-            return self.client.person.enrichment(**params).json()
-        else:
-            return self.client.person.search(**params).json()
+        self.metrics.api_call(self.settings.query_type)
+        with self.metrics.time("network"):
+            if self.settings.query_type == APIType.ENRICH:
+                r = self._with_retries(lambda: self.client.person.enrichment(**params))
+                if r.status_code == 200:
+                    return r.content
+                return response_json(r)
+            else:
+                return response_json(self._with_retries(lambda: self.client.person.search(**params)))
+
+    def _get_bulk_response(self, list_params: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """One call to the bulk enrichment endpoint, records come back in request order"""
+        if not self.client:
+            raise ValueError("PDLPersonAPI: Client not initialized")
+        bulk_requests = [{"params": params} for params in list_params]
+        self.metrics.api_call("bulk")
+        with self.metrics.time("network"):
+            json_response = response_json(
+                self._with_retries(lambda: self.client.person.bulk(requests=bulk_requests))
+            )
+        if isinstance(json_response, dict):
+            ## The whole call failed, e.g. a 402 for the account
+            return [json_response] * len(list_params)
+        return json_response
+
+    def _to_response(self, params: dict[str, Any], json_response: dict[str, Any] | bytes) -> Response:
+        """Create the Response for an API record, raising for errors that shouldn't be cached"""
+        with self.metrics.time("parse"):
+            if isinstance(json_response, (bytes, str)):
+                pr = decode_person_response(json_response, params, lazy=self.settings.lazy_parsing)
+                if pr is not None:
+                    self._see_version(pr.dataset_version)
+                    return pr
+                json_response = loads(json_response)
+            status = json_response["status"]
+            if status != 200:
+                self.metrics.api_error(status)
+                check_record(json_response)
+            self._see_version(json_response.get("dataset_version"))
+            if self.settings.lazy_parsing:
+                return Response.model_validate_lazy({**json_response, "query": params})
+            return Response(query=params, **json_response)
 
     def get_person(self, params: dict[str, Any], use_cache: bool = True, **find_kwargs) -> Response:
         """Get a person from the API, while the api
         can take multiple this function is only for 1"""
 
-        hsh = param_hash(params)
+        hsh = query_key(params)
 
         if use_cache:
-            existing = self.find_existing_query(params=params, **find_kwargs)
+            known = self._known_not_found(hsh, params)
+            if known:
+                return known
+            existing = self.find_existing_query(params=params, key=hsh, **find_kwargs)
             ## remove existing people from params
-            if existing:
+            if existing and self._serve(hsh, params, existing):
                 return existing
 
-        json_response = self._get_response(params)
-        status = json_response["status"]
-        if status != 200:
-            msg = json_response.get("error",{}).get("message", "")
-            if status == 402:
-                raise PDLAccountLimitException(json_response, msg)
-            error_type = json_response.get("error", {}).get("type", None)
-            if status == 404 and error_type != "not_found":
-                ## If it's "not_found", do an ErrorResponse as normal, but otherwise
-                ## raise an error
-                raise PDLUnknownException(json_response, msg)
-
-            pr = Response(query=params, **json_response)
-            self.existing_queries[hsh] = pr
-        else:
-            pr = Response(query=params, **json_response)
-
-        if use_cache:
+        pr = self._to_response(params, self._get_response(params))
+        if use_cache or pr.is_error:
             self.save_queries({hsh: pr})
 
         return pr
+
+    def get_people(
+        self, list_params: list[dict[str, Any]], use_cache: bool = True, **find_kwargs
+    ) -> list[Response]:
+        """Get many people, one Response per params in the same order.
+        Duplicate queries are only looked up once, cached ones aren't sent and
+        the rest go to the bulk enrichment endpoint in batches of `settings.bulk_size`.
+        A 402 or unexpected 404 raises like `get_person`, after the records of
+        the batch that did succeed have been cached.
+        """
+        if self.settings.query_type != APIType.ENRICH:
+            return [self.get_person(params, use_cache=use_cache, **find_kwargs) for params in list_params]
+
+        keys = [query_key(params) for params in list_params]
+        results: dict[str, Response] = {}
+        missing: dict[str, dict[str, Any]] = {}
+        found: dict[str, Optional[Response]] = {}
+        if use_cache:
+            lookups: dict[str, dict[str, Any]] = {}
+            for hsh, params in zip(keys, list_params):
+                if hsh in results or hsh in lookups:
+                    continue
+                known = self._known_not_found(hsh, params)
+                if known:
+                    results[hsh] = known
+                else:
+                    lookups[hsh] = params
+            found = self._find_many(lookups, **find_kwargs)
+        for hsh, params in zip(keys, list_params):
+            if hsh in results or hsh in missing:
+                continue
+            existing = found.get(hsh)
+            if existing and self._serve(hsh, params, existing):
+                results[hsh] = existing
+            else:
+                missing[hsh] = params
+
+        results.update(self._fetch_many(missing, save=use_cache))
+        return [results[hsh] for hsh in keys]
+
+    def _get_person_coalesced(self, params: dict[str, Any], use_cache: bool = True, **find_kwargs) -> Response:
+        """`get_person` where threads asking for the same query share one request"""
+        hsh = query_key(params)
+        with self._inflight_lock:
+            fut = self._inflight_threads.get(hsh)
+            owner = fut is None
+            if owner:
+                fut = self._inflight_threads[hsh] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            pr = self.get_person(params, use_cache=use_cache, **find_kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(pr)
+        finally:
+            with self._inflight_lock:
+                del self._inflight_threads[hsh]
+        return pr
+
+    def enrich_many(
+        self,
+        iterable: Iterable[dict[str, Any]],
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+        return_exceptions: bool = False,
+        **find_kwargs,
+    ) -> Iterator[tuple[dict[str, Any], Response]]:
+        """Enrich params from a thread pool, yielding (params, Response) as they complete.
+        Only a window of 2 * max_workers params is read ahead from the iterable and
+        identical in-flight queries are fetched once. Errors from `get_person` are
+        raised from the iterator, or yielded in place of the Response with
+        `return_exceptions`. Use with `settings.thread_safe` or a thread-safe cache.
+        """
+        max_workers = max_workers or self.settings.max_concurrency
+        params_iter = iter(iterable)
+        pending: dict[Future, dict[str, Any]] = {}
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdl-enrich")
+        try:
+            while True:
+                for params in params_iter:
+                    fut = pool.submit(self._get_person_coalesced, params, use_cache, **find_kwargs)
+                    pending[fut] = params
+                    if len(pending) >= 2 * max_workers:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    params = pending.pop(fut)
+                    if return_exceptions and isinstance(fut.exception(), PDLException):
+                        yield params, fut.exception()
+                    else:
+                        yield params, fut.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _search_pages(
+        self, query: dict[str, Any], size: int, max_results: Optional[int]
+    ) -> Iterator[dict[str, Any]]:
+        """Successful search pages, following the scroll token until the results run out"""
+        if not self.client:
+            raise ValueError("PDLPersonAPI: Client not initialized")
+        fetched = 0
+        scroll_token = None
+        while max_results is None or fetched < max_results:
+            params = dict(query, size=size if max_results is None else min(size, max_results - fetched))
+            if scroll_token:
+                params["scroll_token"] = scroll_token
+            self.metrics.api_call(APIType.SEARCH)
+            with self.metrics.time("network"):
+                page = response_json(self._with_retries(lambda: self.client.person.search(**params)))
+            status = page.get("status")
+            if status != 200:
+                self.metrics.api_error(status)
+                error = page.get("error") or {}
+                if status == 404 and error.get("type") == "not_found":
+                    ## no results
+                    return
+                check_record(page)
+                raise PDLUnknownException(page, error.get("message", ""))
+            data = page.get("data") or []
+            self._see_version(page.get("dataset_version"))
+            yield page
+            fetched += len(data)
+            scroll_token = page.get("scroll_token")
+            if not data or not scroll_token or fetched >= page.get("total", fetched + 1):
+                return
+
+    def iter_search(
+        self,
+        query: dict[str, Any],
+        size: int = 100,
+        prefetch: int = 1,
+        max_results: Optional[int] = None,
+        use_cache: bool = True,
+    ) -> Iterator[Response]:
+        """Yield one Response per person matching a search (`{"query": ...}` or `{"sql": ...}`).
+        Pages of `size` are fetched `prefetch` pages ahead in a background thread,
+        so only those pages are held in memory. Each person is cached under its
+        `pdl_id` query so later enrichments of them are free.
+        """
+        ## the persons of this scroll, to check they're all still indexed at the end
+        seen: Optional[list[str]] = [] if use_cache and self.local_index is not None else None
+        for page in prefetch_iter(self._search_pages(query, size, max_results), prefetch):
+            for data in page.get("data") or []:
+                record = {"status": 200, "person": data, "dataset_version": page.get("dataset_version")}
+                person_id = data.get("id")
+                record["query"] = {"pdl_id": person_id} if person_id else {}
+                if self.settings.lazy_parsing:
+                    pr = Response.model_validate_lazy(record)
+                else:
+                    pr = Response(**record)
+                if use_cache and person_id:
+                    self.save_queries({query_key(pr.query): pr})
+                if seen is not None:
+                    limit = self.local_index.max_entries  # type: ignore[union-attr]
+                    if person_id and (limit is None or len(seen) < limit):
+                        seen.append(person_id)
+                    else:
+                        ## without an id a person isn't indexed, and past max_entries some
+                        ## are evicted, so the search can't be complete
+                        seen = None
+                yield pr
+        ## only reached once the scroll ran out, failed pages raise in _search_pages
+        if seen is not None and max_results is None:
+            self.local_index.mark_complete(query, seen)  # type: ignore[union-attr]
+
+    def search_people(self, query: dict[str, Any], remote: bool = True, **kwargs) -> list[Response]:
+        """The persons matching a search, from the local index when it has all of them.
+        Otherwise the search goes to the API through iter_search (with `kwargs`), unless
+        `remote` is False and the cached matches are returned as they are.
+        """
+        if self.local_index is not None:
+            result = self.local_index.search(query)
+            if result.complete:
+                self.metrics.cache_hit("local")
+                return result.matches
+            if not remote:
+                return result.matches
+        elif not remote:
+            return []
+        return list(self.iter_search(query, **kwargs))
@@ -0,0 +1,155 @@
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, MutableMapping, Optional
+
+from pdl_api.cache.base import CacheBackend, Identifiers, IndexedCache, implements, index_add, index_remove
+from pdl_api.cache.memory import LRUCache, ShardedCache
+from pdl_api.cache.redis import RedisCache
+from pdl_api.cache.sqlite import SQLiteCache
+from pdl_api.keys import response_identifiers
+from pdl_api.models.exceptions import PDLException
+from pdl_api.models.response import Response
+
+if TYPE_CHECKING:
+    import threading
+
+    from pdl_api.person_api import PDLSettings
+
+
+class QueryCacheMixin:
+    """The `existing_queries` cache and its identifier index, shared by PDLPersonAPI
+    and PDLCompanyAPI.
+
+    An empty `existing_queries` dict is replaced by the cache the settings pick.
+    `identity_index` is only kept in memory when the cache doesn't index itself
+    (IndexedCache), and is guarded by `_cache_lock` as background threads write too.
+    `_fetch_many` runs the bulk calls of the client's `_get_bulk_response`.
+    """
+
+    settings: "PDLSettings"
+    existing_queries: MutableMapping[str, Any]
+    identity_index: dict[str, list[str]]
+    _cache_lock: "threading.RLock"
+    _owns_cache: bool
+    save_queries: Callable[[dict[str, Any]], None]
+    _get_bulk_response: Callable[[list[dict[str, Any]]], list[Any]]
+    _to_response: Callable[[dict[str, Any], Any], Any]
+
+    ## The cached response type and the identifiers it's found by
+    _model: ClassVar[Any] = Response
+    _identifiers: ClassVar[Identifiers] = staticmethod(response_identifiers)
+    ## Keeps the caches built from the settings apart, "" for persons
+    _cache_namespace: ClassVar[str] = ""
+
+    def _init_cache(self):
+        if type(self.existing_queries) is dict and not self.existing_queries:
+            self.existing_queries = self._default_cache()
+            self._owns_cache = True
+        if not self._self_indexed:
+            for hsh, r in self.existing_queries.items():
+                self._index(hsh, r)
+
+    def _default_cache(self) -> MutableMapping[str, Any]:
+        return self._settings_cache()
+
+    def _settings_cache(self) -> MutableMapping[str, Any]:
+        s = self.settings
+        ns = self._cache_namespace
+        kinds = {"model": self._model, "identifiers": self._identifiers}
+        if s.cache_url:
+            return RedisCache.from_url(
+                s.cache_url,
+                prefix=f"pdl:{ns}:" if ns else "pdl:",
+                ttl=s.cache_ttl,
+                not_found_ttl=s.cache_not_found_ttl,
+                **kinds,
+            )
+        if s.cache_path:
+            return SQLiteCache(s.cache_path, table_prefix=f"{ns}_" if ns else "", **kinds)
+        limits = (s.cache_max_entries, s.cache_max_bytes, s.cache_ttl, s.cache_not_found_ttl)
+        if s.thread_safe:
+            return ShardedCache(
+                max_entries=s.cache_max_entries,
+                max_bytes=s.cache_max_bytes,
+                ttl=s.cache_ttl,
+                not_found_ttl=s.cache_not_found_ttl,
+                identifiers=self._identifiers,
+            )
+        if any(limit is not None for limit in limits):
+            return LRUCache(
+                max_entries=s.cache_max_entries,
+                max_bytes=s.cache_max_bytes,
+                ttl=s.cache_ttl,
+                not_found_ttl=s.cache_not_found_ttl,
+                identifiers=self._identifiers,
+            )
+        return {}
+
+    @property
+    def _self_indexed(self) -> bool:
+        return implements(self.existing_queries, IndexedCache)
+
+    @property
+    def _batched(self) -> bool:
+        return implements(self.existing_queries, CacheBackend)
+
+    def _lookup(self, identifier: str) -> list[str]:
+        if self._self_indexed:
+            return self.existing_queries.lookup(identifier)  # type: ignore[attr-defined]
+        with self._cache_lock:
+            return list(self.identity_index.get(identifier, ()))
+
+    def _index(self, hsh: str, r: Any):
+        index_add(self.identity_index, hsh, r, self._identifiers)
+
+    def _unindex(self, hsh: str, r: Any):
+        index_remove(self.identity_index, hsh, r, self._identifiers)
+
+    def _store(self, queries: dict[str, Any]):
+        """Write responses to the cache, keeping identity_index up to date"""
+        if self._batched:
+            self.existing_queries.put_many(queries)  # type: ignore[attr-defined]
+            return
+        if self._self_indexed:
+            for hsh, r in queries.items():
+                self.existing_queries[hsh] = r
+            return
+        with self._cache_lock:
+            for hsh, r in queries.items():
+                old = self.existing_queries.get(hsh)
+                if old is not None and old is not r:
+                    self._unindex(hsh, old)
+                self.existing_queries[hsh] = r
+                self._index(hsh, r)
+
+    def _close_cache(self):
+        """Close the cache if it was created from the settings, else flush its buffered writes"""
+        cache = self.existing_queries
+        if self._owns_cache and hasattr(cache, "close"):
+            cache.close()
+        elif hasattr(cache, "flush"):
+            cache.flush()
+
+    def _fetch_many(self, queries: dict[str, dict[str, Any]], save: bool = True) -> dict[str, Any]:
+        """Fetch queries ({key: params}) in bulk batches of `settings.bulk_size` and cache
+        the responses, only errors unless `save`. A 402 or unexpected 404 raises after
+        the rest of its batch has been cached.
+        """
+        results: dict[str, Any] = {}
+        batch = list(queries.items())
+        for i in range(0, len(batch), self.settings.bulk_size):
+            chunk = batch[i : i + self.settings.bulk_size]
+            records = self._get_bulk_response([params for _, params in chunk])
+            error: Optional[Exception] = None
+            to_save: dict[str, Any] = {}
+            for (hsh, params), record in zip(chunk, records):
+                try:
+                    pr = self._to_response(params, record)
+                except PDLException as e:
+                    error = error or e
+                    continue
+                results[hsh] = pr
+                if save or pr.is_error:
+                    to_save[hsh] = pr
+            self.save_queries(to_save)
+            if error:
+                raise error
+        return results
@@ -0,0 +1,92 @@
+import random
+import re
+import threading
+import time
+from typing import Mapping, Optional
+
+## Statuses worth retrying, the request didn't fail because of its params
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+
+def parse_rate(value: str) -> Optional[float]:
+    """Requests per second from a rate limit header.
+    PDL sends e.g. "{'minute': 100}", a bare number is taken as per minute.
+    """
+    rates = [
+        int(count) / _PERIODS[period]
+        for period, count in re.findall(r"(second|minute|hour)\W+(\d+)", value)
+    ]
+    if rates:
+        return min(rates)
+    if value.strip().isdigit():
+        return int(value) / 60.0
+    return None
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    `rate` tokens per second refill a bucket of `burst` tokens, a `rate` of None
+    doesn't limit until the API reports a limit through `update`. The rate follows
+    the reported limit up and down, but never above the `rate` given here.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 10):
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            paused = max(0.0, self.paused_until - now)
+            if self.rate is None:
+                return paused
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return paused
+            return max(paused, -self.tokens / self.rate)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back all callers for `seconds`, e.g. on a 429 with Retry-After"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update(self, headers: Mapping[str, str]):
+        """Adapt to the rate limit headers of a response"""
+        limit = headers.get("x-ratelimit-limit")
+        rate = parse_rate(limit) if limit else None
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if rate is not None:
+                self.rate = rate if self.max_rate is None else min(rate, self.max_rate)
+            remaining = headers.get("x-ratelimit-remaining")
+            if remaining is not None and self.rate is not None:
+                left = re.findall(r"\d+", remaining)
+                if left and int(left[0]) == 0:
+                    ## The window is used up, wait for at least one refill
+                    self.tokens = min(self.tokens, 0.0)
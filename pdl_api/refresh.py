@@ -0,0 +1,174 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import StrEnum
+from typing import Any, Callable, Optional
+
+from pdl_api.models.exceptions import PDLAccountLimitException
+from pdl_api.models.response import Response, utcnow
+from pdl_api.rate_limit import TokenBucket
+
+
+class Freshness(StrEnum):
+    ## Served as is
+    FRESH = "fresh"
+    ## Served, and refreshed in the background
+    STALE = "stale"
+    ## Fetched again before returning
+    EXPIRED = "expired"
+
+
+def freshness(
+    r: Response,
+    refresh_after: Optional[timedelta],
+    expire_after: Optional[timedelta],
+    now: Optional[datetime] = None,
+) -> Freshness:
+    """How a cached response should be served, by the age of its `query_time`"""
+    age = (now or utcnow()) - r.query_time
+    if expire_after is not None and age > expire_after:
+        return Freshness.EXPIRED
+    if refresh_after is not None and age > refresh_after:
+        return Freshness.STALE
+    return Freshness.FRESH
+
+
+def version_key(version: str) -> tuple[int, ...]:
+    """Sortable form of a dataset version such as "v25.2" """
+    return tuple(int(n) for n in re.findall(r"\d+", version))
+
+
+@dataclass
+class RefreshStats:
+    queued: int = 0
+    refreshed: int = 0
+    failed: int = 0
+    ## Not queued because the queue was full or refreshing stopped
+    dropped: int = 0
+    batches: int = 0
+
+
+class Refresher:
+    """Refreshes stale cache entries from a background thread.
+
+    Queries are collected until `batch_size` are waiting or the oldest has waited
+    `interval` seconds, then handed to `fetch` as one {key: params} batch. `rate`
+    limits the records per second sent, on top of the API's own rate limiter.
+    A 402 stops refreshing, as every later batch would fail too.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[dict[str, dict[str, Any]]], Any],
+        batch_size: int = 100,
+        interval: float = 5.0,
+        rate: Optional[float] = None,
+        max_pending: int = 10_000,
+    ):
+        self.fetch = fetch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.limiter = TokenBucket(rate, batch_size)
+        self.max_pending = max_pending
+        self.stats = RefreshStats()
+        self.stopped = False
+        self.last_error: Optional[BaseException] = None
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._first_queued = 0.0
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, key: str, params: dict[str, Any]) -> bool:
+        """Queue a refresh, False if it was already queued or dropped"""
+        with self._cond:
+            if key in self._pending:
+                return False
+            if self.stopped or self._closed or len(self._pending) >= self.max_pending:
+                self.stats.dropped += 1
+                return False
+            if not self._pending:
+                self._first_queued = time.monotonic()
+            self._pending[key] = params
+            self.stats.queued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pdl-refresh", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _take(self) -> Optional[dict[str, dict[str, Any]]]:
+        """The next batch, waiting until it is full or due. None once closed"""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._first_queued + self.interval
+                    remaining = due - time.monotonic()
+                    if len(self._pending) >= self.batch_size or remaining <= 0 or self._closed:
+                        break
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+            keys = list(self._pending)[: self.batch_size]
+            batch = {key: self._pending.pop(key) for key in keys}
+            self._busy = True
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            wait = max(self.limiter.reserve() for _ in batch)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.fetch(batch)
+            except PDLAccountLimitException as e:
+                self._fail(batch, e)
+                with self._cond:
+                    self.stopped = True
+                    self.stats.dropped += len(self._pending)
+                    self._pending.clear()
+            except Exception as e:
+                self._fail(batch, e)
+            else:
+                self.stats.refreshed += len(batch)
+            with self._cond:
+                self.stats.batches += 1
+                self._busy = False
+                self._cond.notify_all()
+
+    def _fail(self, batch: dict[str, Any], error: BaseException):
+        self.stats.failed += len(batch)
+        self.last_error = error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send what is queued now and wait until it's done, False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._first_queued = 0.0
+            self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Finish the queued refreshes and stop the thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,285 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from pdl_api.keys import query_key
+from pdl_api.models.exceptions import PDLAccountLimitException, PDLDeadlineException
+from pdl_api.models.response import Response
+from pdl_api.person_api import PDLPersonAPI
+
+## Why a scheduler isn't sending requests
+PAUSED_MANUAL = "manual"
+PAUSED_BUDGET = "budget"
+PAUSED_ACCOUNT_LIMIT = "account_limit"
+
+_NO_DEADLINE = float("inf")
+
+
+@dataclass
+class SchedulerStatus:
+    queued: int
+    in_flight: int
+    ## Queued requests by priority, highest first
+    queued_by_priority: dict[int, int]
+    budget: Optional[int]
+    spent: int
+    ## Credits left to spend, None without a budget
+    remaining: Optional[int]
+    ## None while sending, else PAUSED_MANUAL, PAUSED_BUDGET or PAUSED_ACCOUNT_LIMIT
+    paused: Optional[str]
+
+
+@dataclass
+class _Request:
+    """One queued query and everyone waiting for it"""
+
+    key: str
+    params: dict[str, Any]
+    priority: int
+    seq: int
+    ## (future, time.monotonic() deadline or inf)
+    waiters: list[tuple[Future, float]] = field(default_factory=list)
+    ## The sort key of its current heap entry, older entries are skipped
+    entry: tuple = ()
+
+    def sort_key(self) -> tuple:
+        return (-self.priority, min(d for _, d in self.waiters), self.seq)
+
+
+class Scheduler:
+    """Priority queue of enrichments in front of a PDLPersonAPI, spending a credit budget.
+
+    Cached queries are answered by `submit` without queueing. The rest are sent by
+    `workers` threads, highest priority first and then earliest deadline, so an
+    interactive request only waits for a worker to finish its current request however
+    long a backfill queue is. A request still queued at its deadline fails with
+    PDLDeadlineException, and requests for the same query share one lookup.
+
+    A credit is counted for each person found, as PDL only charges for matches.
+    Sending stops when the budget runs out or PDL answers 402, without failing what
+    is queued, until `resume`. `reserve` credits of the budget are kept for requests
+    of at least `reserve_priority`.
+    """
+
+    def __init__(
+        self,
+        api: PDLPersonAPI,
+        budget: Optional[int] = None,
+        workers: Optional[int] = None,
+        reserve: int = 0,
+        reserve_priority: int = 1,
+    ):
+        self.api = api
+        self.budget = budget
+        self.reserve = reserve
+        self.reserve_priority = reserve_priority
+        self.spent = 0
+        self.paused: Optional[str] = None
+        self._heap: list[tuple[tuple, _Request]] = []
+        self._deadlines: list[tuple[float, int, Future, _Request]] = []
+        self._queued: dict[str, _Request] = {}
+        self._in_flight = 0
+        self._seq = itertools.count()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"pdl-scheduler-{i}", daemon=True)
+            for i in range(workers or api.settings.max_concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _cached(self, key: str, params: dict[str, Any]) -> Optional[Response]:
+        known = self.api._known_not_found(key, params)
+        if known:
+            return known
+        existing = self.api.find_existing_query(params=params, key=key)
+        if existing and self.api._serve(key, params, existing):
+            return existing
+        return None
+
+    def _push(self, request: _Request):
+        sort_key = request.sort_key()
+        if sort_key != request.entry:
+            request.entry = sort_key
+            heapq.heappush(self._heap, (sort_key, request))
+
+    def submit(
+        self, params: dict[str, Any], priority: int = 0, deadline: Optional[float] = None
+    ) -> "Future[Response]":
+        """Queue an enrichment, `deadline` in seconds from now. Higher priorities go first"""
+        fut: Future[Response] = Future()
+        key = query_key(params)
+        cached = self._cached(key, params)
+        if cached is not None:
+            fut.set_result(cached)
+            return fut
+        due = time.monotonic() + deadline if deadline is not None else _NO_DEADLINE
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            request = self._queued.get(key)
+            if request is None:
+                request = self._queued[key] = _Request(key, params, priority, next(self._seq))
+            request.priority = max(request.priority, priority)
+            request.waiters.append((fut, due))
+            if deadline is not None:
+                heapq.heappush(self._deadlines, (due, next(self._seq), fut, request))
+            self._push(request)
+            self._cond.notify()
+        return fut
+
+    def _expire(self):
+        """Fail the waiters whose deadline passed"""
+        now = time.monotonic()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, fut, request = heapq.heappop(self._deadlines)
+            waiters = [(f, d) for f, d in request.waiters if f is not fut]
+            if self._queued.get(request.key) is not request or len(waiters) == len(request.waiters):
+                continue
+            request.waiters = waiters
+            if not fut.done():
+                fut.set_exception(PDLDeadlineException({}, "Deadline passed before the request was sent"))
+            if request.waiters:
+                self._push(request)
+            else:
+                del self._queued[request.key]
+
+    def _top(self) -> Optional[_Request]:
+        while self._heap:
+            sort_key, request = self._heap[0]
+            if self._queued.get(request.key) is request and request.entry == sort_key:
+                return request
+            heapq.heappop(self._heap)
+        return None
+
+    def _affordable(self, request: _Request) -> bool:
+        if self.budget is None:
+            return True
+        ## every in-flight request may still find a person
+        left = self.budget - self.spent - self._in_flight
+        if request.priority < self.reserve_priority:
+            left -= self.reserve
+        return left > 0
+
+    def _next(self) -> Optional[_Request]:
+        """The next request to send, waiting while paused or empty. None once closed"""
+        with self._cond:
+            while not self._closed:
+                self._expire()
+                request = self._top()
+                if request is not None and self.paused is None and self._affordable(request):
+                    heapq.heappop(self._heap)
+                    del self._queued[request.key]
+                    request.entry = ()
+                    ## drop waiters that cancelled, the rest can't cancel from here on
+                    request.waiters = [
+                        (f, d) for f, d in request.waiters if f.running() or f.set_running_or_notify_cancel()
+                    ]
+                    if not request.waiters:
+                        continue
+                    self._in_flight += 1
+                    return request
+                timeout = max(0.0, self._deadlines[0][0] - time.monotonic()) if self._deadlines else None
+                self._cond.wait(timeout)
+            return None
+
+    def _run(self):
+        while True:
+            request = self._next()
+            if request is None:
+                return
+            pr: Optional[Response] = None
+            try:
+                pr = self.api._get_person_coalesced(request.params)
+            except PDLAccountLimitException:
+                with self._cond:
+                    self._in_flight -= 1
+                    self.paused = PAUSED_ACCOUNT_LIMIT
+                    self._requeue(request)
+                continue
+            except BaseException as e:
+                for fut, _ in request.waiters:
+                    fut.set_exception(e)
+            else:
+                for fut, _ in request.waiters:
+                    fut.set_result(pr)
+            with self._cond:
+                self._in_flight -= 1
+                if pr is not None and pr.is_person:
+                    self.spent += 1
+                self._cond.notify_all()
+
+    def _requeue(self, request: _Request):
+        queued = self._queued.get(request.key)
+        if queued is None:
+            queued = self._queued[request.key] = request
+        else:
+            ## submitted again while in flight
+            queued.waiters.extend(request.waiters)
+            queued.priority = max(queued.priority, request.priority)
+        for fut, due in request.waiters:
+            if due != _NO_DEADLINE:
+                heapq.heappush(self._deadlines, (due, next(self._seq), fut, queued))
+        self._push(queued)
+
+    def pause(self):
+        with self._cond:
+            self.paused = self.paused or PAUSED_MANUAL
+
+    def resume(self, credits: int = 0):
+        """Continue sending, e.g. after topping up the account. `credits` are added to the budget"""
+        with self._cond:
+            if self.budget is not None:
+                self.budget += credits
+            self.paused = None
+            self._cond.notify_all()
+
+    @property
+    def remaining(self) -> Optional[int]:
+        return None if self.budget is None else max(0, self.budget - self.spent)
+
+    def status(self) -> SchedulerStatus:
+        with self._cond:
+            by_priority: dict[int, int] = {}
+            for request in self._queued.values():
+                by_priority[request.priority] = by_priority.get(request.priority, 0) + len(request.waiters)
+            paused = self.paused
+            top = self._top()
+            if paused is None and top is not None and not self._in_flight and not self._affordable(top):
+                paused = PAUSED_BUDGET
+            return SchedulerStatus(
+                queued=sum(by_priority.values()),
+                in_flight=self._in_flight,
+                queued_by_priority=dict(sorted(by_priority.items(), reverse=True)),
+                budget=self.budget,
+                spent=self.spent,
+                remaining=self.remaining,
+                paused=paused,
+            )
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop the workers after their current request, cancelling what is still queued"""
+        with self._cond:
+            self._closed = True
+            for request in self._queued.values():
+                for fut, _ in request.waiters:
+                    ## requeued after a 402 they're already running
+                    if not fut.cancel():
+                        fut.set_exception(CancelledError())
+            self._queued.clear()
+            self._heap.clear()
+            self._deadlines.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
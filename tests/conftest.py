@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+
+import pytest
+
+from pdl_api import AsyncPDLPersonAPI, PDLPersonAPI, PDLSettings
+
+## Get the directory of the current file
+dir_path = os.path.dirname(os.path.realpath(__file__))
+example_dir = os.path.join(dir_path, "examples")
+person_json_file = os.path.join(example_dir, "person_example.json")
+
+## API records of the common errors
+NOT_FOUND = {"status": 404, "error": {"type": "not_found", "message": "No records"}}
+PAYMENT_REQUIRED = {"status": 402, "error": {"type": "payment_required", "message": "limit"}}
+
+
+@pytest.fixture
+def success_json():
+    with open(person_json_file, "r") as f:
+        return json.load(f)
+
+
+class StubResponse:
+    """Stands in for the requests.Response returned by the PDLPY client"""
+
+    def __init__(self, data: Any, status_code: int = 200, headers: Optional[dict[str, str]] = None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self.data).encode()
+
+    def json(self) -> Any:
+        return self.data
+
+
+def record_response(record: dict[str, Any]) -> StubResponse:
+    """A StubResponse for an API record, with its status"""
+    return StubResponse(record, record["status"])
+
+
+class StubClient:
+    """Stands in for PDLPY, with stubs of its person and company endpoints"""
+
+    def __init__(self, person: Any = None, company: Any = None):
+        self.person = person
+        self.company = company
+
+
+def found(person_json: dict[str, Any], email: str, **record) -> dict[str, Any]:
+    """A successful API record for the example person, with `email` as its id and email"""
+    data = dict(person_json, id=email, emails=[{"address": email}])
+    return {"status": 200, "likelihood": 10, "data": data, **record}
+
+
+def first_email(params: dict[str, Any]) -> str:
+    email = params["email"]
+    return email[0] if isinstance(email, list) else email
+
+
+class StubPerson:
+    """Stands in for client.person: emails starting with "known" are found, others
+    not_found. The params of each call are kept in `calls`, one list per call.
+    Override `record` for other answers.
+    """
+
+    def __init__(self, person_json: Optional[dict[str, Any]] = None):
+        self.person_json = person_json or {}
+        self.calls: list[list[dict[str, Any]]] = []
+
+    def record(self, params: dict[str, Any]) -> dict[str, Any]:
+        email = first_email(params)
+        return found(self.person_json, email) if email.startswith("known") else NOT_FOUND
+
+    def enrichment(self, **params) -> StubResponse:
+        self.calls.append([params])
+        return record_response(self.record(params))
+
+    def bulk(self, requests: list[dict[str, Any]]) -> StubResponse:
+        params = [r["params"] for r in requests]
+        self.calls.append(params)
+        return StubResponse([self.record(p) for p in params])
+
+    @property
+    def emails(self) -> list[list[str]]:
+        """The emails looked up by each call"""
+        return [[first_email(p) for p in call] for call in self.calls]
+
+    @property
+    def records(self) -> int:
+        return sum(len(call) for call in self.calls)
+
+
+def make_api(person: Any, **settings) -> PDLPersonAPI:
+    """A PDLPersonAPI calling the `person` stub, with the given settings"""
+    return PDLPersonAPI(settings=PDLSettings(api_key="test", **settings), client=StubClient(person))
+
+
+class CountingAPI(PDLPersonAPI):
+    """Counts its calls, every query is not_found"""
+
+    def __init__(self, *args, **kwargs):
+        self.count = 0
+        super().__init__(*args, **kwargs)
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any]:
+        self.count += 1
+        return NOT_FOUND
+
+    def _get_bulk_response(self, list_params: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [self._get_response(params) for params in list_params]
+
+
+class SlowAPI(PDLPersonAPI):
+    """Finds every email after a short sleep, counting the calls from all threads"""
+
+    def __init__(self, *args, person_json: Optional[dict[str, Any]] = None, **kwargs):
+        self.person_json = person_json or {}
+        self.count = 0
+        self.count_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any]:
+        with self.count_lock:
+            self.count += 1
+        time.sleep(0.02)
+        return found(self.person_json, first_email(params))
+
+
+class AsyncSlowAPI(AsyncPDLPersonAPI):
+    """Finds every email after a short sleep, counting the calls and the most running at once"""
+
+    def __init__(self, *args, person_json: Optional[dict[str, Any]] = None, **kwargs):
+        self.person_json = person_json or {}
+        self.count = 0
+        self.running = 0
+        self.max_running = 0
+        super().__init__(*args, **kwargs)
+
+    async def _aget_response(self, params: dict[str, Any]) -> dict[str, Any]:
+        self.count += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return found(self.person_json, first_email(params))
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from pdl_api import AsyncPDLPersonAPI, PDLSettings
+
+from conftest import AsyncSlowAPI
+
+
+def test_single_flight(success_json):
+    api = AsyncSlowAPI(settings=PDLSettings(api_key="test"), person_json=success_json)
+
+    async def run():
+        return await asyncio.gather(*(api.aget_person({"email": "a@x.com"}) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert api.count == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_bounded_concurrency(success_json):
+    api = AsyncSlowAPI(settings=PDLSettings(api_key="test", max_concurrency=3), person_json=success_json)
+
+    async def run():
+        return await asyncio.gather(*(api.aget_person({"email": f"{i}@x.com"}) for i in range(12)))
+
+    results = asyncio.run(run())
+    assert api.count == 12
+    assert api.max_running == 3
+    assert {r.safe_person.id for r in results} == {f"{i}@x.com" for i in range(12)}
+
+
+def test_aget_people_over_http(success_json):
+    httpx = pytest.importorskip("httpx")
+    bulk_sizes = []
+
+    def handler(request: "httpx.Request") -> "httpx.Response":
+        assert request.url.path == "/v5/person/bulk"
+        body = json.loads(request.content)
+        bulk_sizes.append(len(body["requests"]))
+        records = []
+        for r in body["requests"]:
+            if r["params"]["email"].startswith("known"):
+                records.append({"status": 200, "data": dict(success_json, id=r["params"]["email"])})
+            else:
+                records.append({"status": 404, "error": {"type": "not_found", "message": ""}})
+        return httpx.Response(200, json=records)
+
+    settings = PDLSettings(api_key="test", bulk_size=2)
+    http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="https://api.peopledatalabs.com/v5/"
+    )
+    api = AsyncPDLPersonAPI(settings=settings, http_client=http_client)
+    emails = ["known1", "missing", "known1", "known2"]
+
+    async def run():
+        async with api:
+            return await api.aget_people([{"email": e} for e in emails])
+
+    results = asyncio.run(run())
+    assert [r.status for r in results] == [200, 404, 200, 200]
+    assert results[0] is results[2]
+    assert sorted(bulk_sizes) == [1, 2]
+
+
+def test_blocking_cache_off_the_loop(success_json, tmp_path):
+    api = AsyncSlowAPI(
+        settings=PDLSettings(api_key="test", cache_path=str(tmp_path / "cache.sqlite")),
+        person_json=success_json,
+    )
+    threads = set()
+    lookup = api.find_existing_query
+
+    def find_existing_query(*args, **kwargs):
+        threads.add(threading.get_ident())
+        return lookup(*args, **kwargs)
+
+    api.find_existing_query = find_existing_query
+
+    async def run(email: str):
+        return await api.aget_person({"email": email})
+
+    ## the semaphore is recreated for each event loop
+    first = asyncio.run(run("a@x.com"))
+    assert asyncio.run(run("a@x.com")).safe_person.id == first.safe_person.id
+    assert api.count == 1
+    assert threads and threading.get_ident() not in threads
+    api.close()
+
+
+def test_single_flight_until_saved(success_json, tmp_path):
+    api = AsyncSlowAPI(
+        settings=PDLSettings(api_key="test", cache_path=str(tmp_path / "cache.sqlite")),
+        person_json=success_json,
+    )
+    save = api.save_queries
+    saving = threading.Event()
+
+    def save_queries(*args, **kwargs):
+        saving.set()
+        time.sleep(0.05)
+        return save(*args, **kwargs)
+
+    api.save_queries = save_queries
+
+    async def run():
+        first = asyncio.create_task(api.aget_person({"email": "a@x.com"}))
+        while not saving.is_set():
+            await asyncio.sleep(0.001)
+        ## the fetch is done but the save isn't, the second call waits for the first
+        second = await api.aget_person({"email": "a@x.com"})
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert api.count == 1
+    assert first is second
+    api.close()
@@ -0,0 +1,52 @@
+from typing import Any
+
+import pytest
+
+from pdl_api import PDLAccountLimitException
+
+from conftest import PAYMENT_REQUIRED, StubPerson, make_api
+
+
+class LimitedPerson(StubPerson):
+    """Answers 402 for every record after the first `limit_after`"""
+
+    def __init__(self, person_json: dict[str, Any], limit_after: int | None = None):
+        super().__init__(person_json)
+        self.limit_after = limit_after
+        self.seen = 0
+
+    def record(self, params: dict[str, Any]) -> dict[str, Any]:
+        self.seen += 1
+        if self.limit_after is not None and self.seen > self.limit_after:
+            return PAYMENT_REQUIRED
+        return super().record(params)
+
+
+def test_get_people_order_and_dedup(success_json):
+    person = LimitedPerson(success_json)
+    api = make_api(person, bulk_size=2)
+    emails = ["known1", "missing1", "KNOWN1", "known2", "known3"]
+    results = api.get_people([{"email": [e]} for e in emails])
+    assert [r.status for r in results] == [200, 404, 200, 200, 200]
+    assert results[0] is results[2]
+    assert results[3].safe_person.id == "known2"
+    ## 4 unique queries in batches of 2
+    assert [len(c) for c in person.calls] == [2, 2]
+
+
+def test_get_people_uses_cache(success_json):
+    person = LimitedPerson(success_json)
+    api = make_api(person)
+    api.get_people([{"email": ["known1"]}, {"email": ["missing1"]}])
+    results = api.get_people([{"email": ["known1"]}, {"email": ["missing1"]}, {"email": ["known2"]}])
+    assert [r.status for r in results] == [200, 404, 200]
+    assert [len(c) for c in person.calls] == [2, 1]
+
+
+def test_get_people_account_limit(success_json):
+    person = LimitedPerson(success_json, limit_after=1)
+    api = make_api(person)
+    with pytest.raises(PDLAccountLimitException):
+        api.get_people([{"email": ["known1"]}, {"email": ["known2"]}, {"email": ["known3"]}])
+    ## records that succeeded before the limit are cached
+    assert api.find_existing_query({"email": ["known1"]})
@@ -0,0 +1,289 @@
+import json
+import sqlite3
+import time
+from datetime import timedelta
+
+import pytest
+
+from pdl_api import LRUCache, PDLSettings, Response, SQLiteCache
+from pdl_api.cache.memory import approx_size
+from pdl_api.keys import identifier
+from pdl_api.models.decode import decode_person_response
+from pdl_api.models.response import utcnow
+
+from conftest import CountingAPI
+
+
+@pytest.fixture
+def success_response(success_json):
+    return Response(status=200, likelihood=1, data=success_json, query={"email": "myemail"})
+
+
+def test_sqlite_round_trip(tmp_path, success_response, success_json):
+    path = str(tmp_path / "cache.db")
+    with SQLiteCache(path) as cache:
+        cache["k"] = success_response
+        ## served from the write buffer before a flush
+        assert cache["k"] is success_response
+    cache = SQLiteCache(path)
+    assert len(cache) == 1
+    assert "k" in cache
+    assert cache["k"] == success_response
+    assert cache.lookup(identifier("id", success_json["id"])) == ["k"]
+    assert cache.lookup(identifier("email", "MyEmail")) == ["k"]
+    del cache["k"]
+    assert "k" not in cache
+    assert cache.lookup(identifier("email", "myemail")) == []
+    cache.close()
+
+
+def test_sqlite_batched_writes(tmp_path, success_response):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), batch_size=3)
+    for i in range(2):
+        cache[str(i)] = success_response
+    assert cache._pending
+    cache["2"] = success_response
+    assert not cache._pending
+    cache.close()
+
+
+def test_sqlite_failed_flush_keeps_writes(tmp_path, success_response):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, memo_size=1)
+    cache._conn.execute("PRAGMA busy_timeout=0")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    cache["a"] = success_response
+    with pytest.raises(sqlite3.OperationalError):
+        cache.flush()
+    assert cache["a"] is success_response
+    other.execute("ROLLBACK")
+    cache["b"] = success_response
+    cache.flush()
+    assert len(cache) == 2
+    ## only the most recently used response stays deserialized
+    assert len(cache._loaded) == 1
+    cache.close()
+
+
+def test_api_close_flushes(tmp_path, success_response):
+    settings = PDLSettings(api_key="test", cache_path=str(tmp_path / "cache.db"))
+    with CountingAPI(settings=settings) as api:
+        api.save_queries({"k": success_response})
+        assert api.existing_queries._pending
+    assert SQLiteCache(settings.cache_path)["k"] == success_response
+
+
+def test_warm_start(tmp_path, success_response, success_json):
+    settings = PDLSettings(api_key="test", cache_path=str(tmp_path / "cache.db"))
+    api = CountingAPI(settings=settings)
+    assert isinstance(api.existing_queries, SQLiteCache)
+    api.save_queries({"k": success_response})
+    api.existing_queries.close()
+
+    api = CountingAPI(settings=settings)
+    other = success_json["emails"][0]["address"]
+    pr = api.get_person_via_email(other)
+    assert pr.is_person
+    assert api.count == 0
+    assert not api.identity_index
+
+
+def test_lru_eviction(success_response, success_json):
+    cache = LRUCache(max_entries=2)
+    cache["a"] = success_response
+    cache["b"] = Response(status=404, error={"type": "not_found", "message": ""})
+    assert cache["a"]  # a is now most recently used
+    cache["c"] = Response(status=404, error={"type": "not_found", "message": ""})
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats.evictions == 1
+    cache["d"] = Response(status=404, error={"type": "not_found", "message": ""})
+    ## a is evicted and drops out of the identity index
+    assert "a" not in cache
+    assert cache.lookup(identifier("id", success_json["id"])) == []
+
+
+def test_lru_byte_budget(success_response):
+    cache = LRUCache(max_bytes=int(approx_size(success_response) * 2.5))
+    for key in "abc":
+        cache[key] = success_response
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_approx_size_without_serializing(success_json):
+    body = json.dumps({"status": 200, "data": success_json})
+    assert approx_size(decode_person_response(body, {})) == len(body)
+    lazy = Response.model_validate_lazy({"status": 200, "data": success_json})
+    ## estimated from the raw data, which stays unvalidated
+    assert 0.5 < approx_size(lazy) / len(body) < 2
+    assert not lazy.is_loaded("person")
+    eager = Response(status=200, data=success_json)
+    assert 0.5 < approx_size(eager) / len(eager.model_dump_json()) < 2
+
+
+def test_lru_ttl(success_response):
+    cache = LRUCache(ttl=60, not_found_ttl=0)
+    old = success_response.model_copy(update={"query_time": utcnow() - timedelta(seconds=120)})
+    cache["old"] = old
+    cache["new"] = success_response
+    cache["nf"] = Response(status=404, error={"type": "not_found", "message": ""})
+    assert cache.get("old") is None
+    assert cache.get("nf") is None
+    assert cache.get("new") is success_response
+    assert cache.stats.expirations == 2
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_lru_from_settings(monkeypatch):
+    monkeypatch.setenv("PDL_CACHE_MAX_ENTRIES", "10")
+    monkeypatch.setenv("PDL_CACHE_NOT_FOUND_TTL", "3600")
+    api = CountingAPI(settings=PDLSettings(api_key="test"))
+    assert isinstance(api.existing_queries, LRUCache)
+    assert api.existing_queries.max_entries == 10
+    api.get_person_via_email("myemail")
+    api.get_person_via_email("myemail")
+    assert api.count == 1
+
+
+def test_limits_need_the_memory_cache(tmp_path):
+    with pytest.raises(ValueError, match="cache_max_entries .* cache_path"):
+        PDLSettings(api_key="test", cache_path=str(tmp_path / "c.db"), cache_max_entries=10)
+    with pytest.raises(ValueError, match="cache_max_bytes .* cache_url"):
+        PDLSettings(api_key="test", cache_url="redis://localhost", cache_max_bytes=1000)
+    with pytest.raises(ValueError, match="cache_ttl .* sqlite"):
+        PDLSettings(api_key="test", cache_path=str(tmp_path / "c.db"), cache_ttl=60)
+    PDLSettings(api_key="test", cache_path=str(tmp_path / "c.db"), negative_cache=True, cache_not_found_ttl=60)
+    PDLSettings(api_key="test", cache_url="redis://localhost", cache_ttl=60)
+
+
+def test_lru_iterates_live_entries(success_response):
+    cache = LRUCache(max_entries=2, ttl=60)
+    old = success_response.model_copy(update={"query_time": utcnow() - timedelta(seconds=120)})
+    cache["a"], cache["b"], cache["old"] = success_response, success_response, old
+    cache["a"] = success_response
+    hits = cache.stats.hits
+    assert len(cache) == 1 and list(cache) == ["a"] and cache.values() == [success_response]
+    assert dict(cache.items()) == {"a": success_response}
+    ## without counting hits or moving "a" ahead of later entries
+    assert cache.stats.hits == hits
+    lru = LRUCache(max_entries=2)
+    lru["x"], lru["y"] = success_response, success_response
+    assert len(lru.values()) == 2
+    lru["z"] = success_response
+    assert list(lru) == ["y", "z"]
+
+
+def test_snapshot_round_trip(tmp_path, success_response):
+    from pdl_api import SnapshotCache
+    from pdl_api.cache import write_snapshot
+
+    path = str(tmp_path / "cache.snap")
+    other = Response(status=200, person={"id": "other", "emails": [{"address": "x@y.com"}]}, query={"email": "x@y.com"})
+    assert write_snapshot(path, {"a": success_response, "b": other}) == 2
+    with SnapshotCache(path) as cache:
+        assert len(cache) == 2 and set(cache) == {"a", "b"}
+        assert cache["a"] == success_response
+        assert cache.lookup(identifier("email", "x@y.com")) == ["b"]
+        assert "c" not in cache
+
+        ## writes and deletes stay in this process until compacted
+        cache["c"] = Response(status=200, person={"id": "c", "emails": [{"address": "c@y.com"}]})
+        del cache["b"]
+        assert cache.lookup(identifier("email", "x@y.com")) == []
+        assert cache.lookup(identifier("email", "c@y.com")) == ["c"]
+        with SnapshotCache(path) as reader:
+            assert set(reader) == {"a", "b"}
+            assert cache.compact() == 2
+            assert not cache.overlay
+            assert reader.refresh()
+            assert set(reader) == {"a", "c"}
+            assert reader.lookup(identifier("email", "c@y.com")) == ["c"]
+            assert not reader.refresh()
+
+
+def test_concurrent_compactions_keep_entries(tmp_path, success_response):
+    from pdl_api import SnapshotCache
+    from pdl_api.cache import write_snapshot
+
+    path = str(tmp_path / "cache.snap")
+    write_snapshot(path, {"a": success_response})
+    first, second = SnapshotCache(path), SnapshotCache(path)
+    first["b"] = success_response
+    second["c"] = success_response
+    assert first.compact() == 2
+    ## starts from the snapshot the first process wrote
+    assert second.compact() == 3
+    assert set(SnapshotCache(path)) == {"a", "b", "c"}
+    first.close()
+    second.close()
+
+
+def test_snapshot_iterates_across_compact(tmp_path, success_response):
+    from pdl_api import SnapshotCache
+    from pdl_api.cache import write_snapshot
+
+    path = str(tmp_path / "cache.snap")
+    write_snapshot(path, {"a": success_response, "b": success_response})
+    with SnapshotCache(path) as cache:
+        keys = iter(cache)
+        first = next(keys)
+        ## unmaps the snapshot being iterated
+        cache["c"] = success_response
+        cache.compact()
+        assert {first, *keys} == {"a", "b"}
+        assert len(cache) == 3 and "c" in cache
+
+
+def test_snapshot_settings(tmp_path, success_response):
+    from pdl_api import SnapshotCache
+    from pdl_api.cache import write_snapshot
+
+    path = str(tmp_path / "cache.snap")
+    write_snapshot(path, {"a": success_response})
+    api = CountingAPI(settings=PDLSettings(api_key="test", cache_snapshot_path=path, cache_max_entries=10))
+    assert isinstance(api.existing_queries, SnapshotCache)
+    assert isinstance(api.existing_queries.overlay, LRUCache)
+    assert api.get_person({"email": "myemail"}) == success_response
+    api.get_person({"email": "missing"})
+    assert api.count == 1
+    assert len(api.existing_queries.overlay) == 1
+
+
+def test_negative_cache(monkeypatch):
+    from pdl_api import NegativeCache
+
+    cache = NegativeCache(ttl=60, capacity=16)
+    keys = [f"k{i}" for i in range(100)]
+    for key in keys:
+        cache.add(key)
+    ## grown past its initial capacity, everything still found
+    assert len(cache) == 100 and all(key in cache for key in keys)
+    assert not any(f"other{i}" in cache for i in range(100))
+    assert cache.stats.filtered > 90
+    cache.add("k1", queried=1000.5, message="No records")
+    assert cache.get("k1") == (1000.5, "No records") and cache.get("other") is None
+    cache.discard("k0")
+    assert "k0" not in cache and len(cache) == 99
+    cache.add("short", ttl=0)
+    now = time.time()
+    monkeypatch.setattr("pdl_api.cache.negative.time.time", lambda: now + 120)
+    assert "short" not in cache and "k1" not in cache
+    cache.purge()
+    assert len(cache) == 0
+
+
+def test_negative_cache_api():
+    api = CountingAPI(settings=PDLSettings(api_key="test", negative_cache=True))
+    first = api.get_person_via_email("myemail")
+    assert first.error.type == "not_found"
+    ## not stored as a Response, and served without another call
+    assert not api.existing_queries
+    again = api.get_people([{"email": ["MyEmail"]}, {"email": ["other"]}])
+    assert [r.status for r in again] == [404, 404]
+    assert again[0].error.type == "not_found"
+    ## rebuilt from the stored response, not a new one
+    assert again[0].query_time == first.query_time
+    assert again[0].error.message == first.error.message == "No records"
+    assert api.count == 2
+    assert len(api.negative_cache) == 2
@@ -0,0 +1,98 @@
+import json
+import threading
+from typing import Any
+
+import pytest
+
+from pdl_api import PDLAccountLimitException, PDLPersonAPI, PDLSettings
+from pdl_api.cli import EXIT_BAD_INPUT, Checkpoint, Enricher, main
+
+
+class QuotaAPI(PDLPersonAPI):
+    """Finds emails starting with "known" and runs out of credits after `limit` calls"""
+
+    def __init__(self, *args, limit: int | None = None, **kwargs):
+        self.limit = limit
+        self.calls: list[str] = []
+        self.count_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _get_response(self, params: dict[str, Any]) -> dict[str, Any]:
+        email = params["email"][0]
+        with self.count_lock:
+            if self.limit is not None and len(self.calls) >= self.limit:
+                return {"status": 402, "error": {"type": "payment_required", "message": "limit"}}
+            self.calls.append(email)
+        if email.startswith("known"):
+            return {"status": 200, "data": {"id": email, "emails": [{"address": email}]}}
+        return {"status": 404, "error": {"type": "not_found", "message": "No records"}}
+
+
+def make_api(limit: int | None = None) -> QuotaAPI:
+    return QuotaAPI(settings=PDLSettings(api_key="test", thread_safe=True, max_concurrency=4), limit=limit)
+
+
+def test_checkpoint_low_water_mark():
+    c = Checkpoint()
+    for row in (1, 3, 0):
+        c.mark(row)
+    assert c.rows == 2 and c.done == {3}
+    assert c.is_done(3) and not c.is_done(2)
+
+
+def test_enrich_csv_dedups(tmp_path):
+    input = tmp_path / "in.csv"
+    input.write_text("name,email\na,known1@x.com\nb,missing@x.com\nc,KNOWN1@x.com\nd,\ne,known2@x.com\n")
+    output = tmp_path / "out.jsonl"
+    api = make_api()
+    enricher = Enricher(api, str(output), str(tmp_path / "ckpt"))
+    enricher.run(str(input))
+    lines = [json.loads(l) for l in output.read_text().splitlines()]
+    assert sorted(l["status"] for l in lines) == [200, 200, 404]
+    assert sorted(api.calls) == ["known1@x.com", "known2@x.com", "missing@x.com"]
+    assert enricher.skipped == 2
+    assert Checkpoint.load(str(tmp_path / "ckpt")).rows == 5
+
+
+def test_enrich_resumes_after_account_limit(tmp_path):
+    input = tmp_path / "in.jsonl"
+    input.write_text("".join(json.dumps({"email": f"known{i}@x.com"}) + "\n" for i in range(50)))
+    output = tmp_path / "out.jsonl"
+    checkpoint = str(tmp_path / "ckpt")
+
+    first = make_api(limit=20)
+    with pytest.raises(PDLAccountLimitException):
+        Enricher(first, str(output), checkpoint, checkpoint_every=5).run(str(input))
+    done = Checkpoint.load(checkpoint)
+    assert 0 < done.rows <= 20
+
+    second = make_api()
+    Enricher(second, str(output), checkpoint, checkpoint_every=5).run(str(input))
+    ids = [json.loads(l)["person"]["id"] for l in output.read_text().splitlines()]
+    assert sorted(ids) == sorted(f"known{i}@x.com" for i in range(50))
+    ## only rows without output at the checkpoint are fetched again
+    assert len(second.calls) == 50 - done.rows - len(done.done)
+
+
+def test_enrich_rejects_bad_columns(tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    input = tmp_path / "in.csv"
+    input.write_text("name,mail\na,known1@x.com\n")
+    with pytest.raises(ValueError, match="'email'"):
+        Enricher(make_api(), output, str(tmp_path / "ckpt")).run(str(input))
+    input = tmp_path / "in.jsonl"
+    input.write_text(json.dumps({"email": "known1@x.com"}) + "\n" + json.dumps({"email": ["known2@x.com"]}) + "\n")
+    with pytest.raises(ValueError, match="Row 1: column 'email' is a list"):
+        Enricher(make_api(), output, str(tmp_path / "ckpt2")).run(str(input))
+    input.write_text(json.dumps({"email": "known1@x.com"}) + "\n" + json.dumps(["known2@x.com"]) + "\n")
+    with pytest.raises(ValueError, match="Row 1: is a list"):
+        Enricher(make_api(), output, str(tmp_path / "ckpt3")).run(str(input))
+
+
+def test_enrich_rejects_bad_settings(tmp_path, monkeypatch, capsys):
+    input = tmp_path / "in.csv"
+    input.write_text("email\nknown1@x.com\n")
+    monkeypatch.setenv("PDL_API_KEY", "test")
+    monkeypatch.setenv("PDL_MAX_CONCURRENCY", "lots")
+    assert main(["enrich", str(input), "-o", str(tmp_path / "out.jsonl")]) == EXIT_BAD_INPUT
+    assert "bad settings" in capsys.readouterr().err
@@ -0,0 +1,103 @@
+from typing import Any
+
+import pytest
+
+from pdl_api import PDLAccountLimitException, PDLCompanyAPI, PDLSettings, Response, SQLiteCache
+from pdl_api.keys import query_key
+
+from conftest import PAYMENT_REQUIRED, StubClient, StubResponse, record_response
+
+
+class StubCompany:
+    """Stands in for client.company, every id starting with "missing" is not found"""
+
+    def __init__(self, limit_after: int | None = None):
+        self.calls: list[list[dict[str, Any]]] = []
+        self.limit_after = limit_after
+        self.records = 0
+
+    def _record(self, params: dict[str, Any]) -> dict[str, Any]:
+        self.records += 1
+        if self.limit_after is not None and self.records > self.limit_after:
+            return PAYMENT_REQUIRED
+        company_id = params.get("pdl_id") or "c-" + params.get("website", "")
+        if company_id.startswith("missing"):
+            return {"status": 404, "error": {"type": "not_found", "message": "No records"}}
+        ## company fields are at the top level of the record
+        return {
+            "status": 200,
+            "likelihood": 6,
+            "id": company_id,
+            "name": f"company {company_id}",
+            "website": f"{company_id}.com",
+            "employee_count": 10,
+            "location": {"name": "san francisco, california, united states"},
+        }
+
+    def enrichment(self, **params) -> StubResponse:
+        self.calls.append([params])
+        return record_response(self._record(params))
+
+    def bulk(self, requests: list[dict[str, Any]]) -> StubResponse:
+        self.calls.append([r["params"] for r in requests])
+        return StubResponse([self._record(r["params"]) for r in requests])
+
+
+def make_api(company: StubCompany, bulk_size: int = 100) -> PDLCompanyAPI:
+    return PDLCompanyAPI(settings=PDLSettings(api_key="test", bulk_size=bulk_size), client=StubClient(company=company))
+
+
+def test_get_company_cached_by_identifier():
+    company = StubCompany()
+    api = make_api(company)
+    r = api.get_company({"pdl_id": "acme"})
+    assert r.safe_company.name == "company acme"
+    assert r.safe_company.location.name.startswith("san francisco")
+    ## found again by its website, without another call
+    assert api.get_company({"website": "https://www.ACME.com/"}) is r
+    assert api.get_company({"pdl_id": "missing1"}).error.type == "not_found"
+    assert len(company.calls) == 2
+
+
+def test_get_companies_bulk_and_errors():
+    company = StubCompany(limit_after=3)
+    api = make_api(company, bulk_size=2)
+    results = api.get_companies([{"pdl_id": "a"}, {"pdl_id": "missing1"}, {"pdl_id": "a"}, {"pdl_id": "b"}])
+    assert [r.status for r in results] == [200, 404, 200, 200]
+    assert [len(c) for c in company.calls] == [2, 1]
+    with pytest.raises(PDLAccountLimitException):
+        api.get_companies([{"pdl_id": "c"}, {"pdl_id": "b"}])
+
+
+def test_enrich_employers_once_per_company(success_json):
+    def person(pid: str, companies: list[str]) -> Response:
+        experience = [{"company": {"id": c, "name": c}} for c in companies]
+        return Response(status=200, likelihood=5, data=dict(success_json, id=pid, experience=experience))
+
+    people = [person("p1", ["x", "y"]), person("p2", ["y", "z"]), person("p3", ["x"])]
+    lazy = Response.model_validate_lazy({"status": 200, "data": dict(success_json, experience=[{"company": {"id": "w"}}])})
+    company = StubCompany()
+    api = make_api(company)
+    companies = api.enrich_employers([*people, lazy])
+    assert list(companies) == ["x", "y", "z", "w"]
+    assert companies["y"].safe_company.id == "y"
+    assert company.calls == [[{"pdl_id": c} for c in "xyzw"]]
+    ## all cached now
+    api.enrich_employers(people)
+    assert len(company.calls) == 1
+
+
+def test_cache_from_settings(success_json, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    company = StubCompany()
+    settings = PDLSettings(api_key="test", cache_path=path)
+    with PDLCompanyAPI(settings=settings, client=StubClient(company=company)) as api:
+        assert isinstance(api.existing_queries, SQLiteCache)
+        api.get_company({"pdl_id": "acme"})
+    ## persons in the same file, under the same query key, are kept apart
+    with SQLiteCache(path) as people:
+        people[query_key({"pdl_id": "acme"})] = Response(status=200, likelihood=1, data=success_json)
+    with PDLCompanyAPI(settings=settings, client=StubClient(company=company)) as api:
+        assert api.get_company({"pdl_id": "acme"}).safe_company.id == "acme"
+        assert api.get_company({"website": "acme.com"}).safe_company.id == "acme"
+    assert len(company.calls) == 1
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from pdl_api import PDLAccountLimitException, PDLPersonAPI, PDLSettings, Response
+from pdl_api.models.decode import decode_person_response
+
+
+@pytest.fixture
+def body(success_json):
+    return json.dumps({"status": 200, "likelihood": 5, "dataset_version": "1", "data": success_json}).encode()
+
+
+def test_decode_matches_dict_path(body):
+    query = {"email": ["myemail"]}
+    decoded = decode_person_response(body, query)
+    assert decoded is not None
+    expected = Response(query=query, query_time=decoded.query_time, **json.loads(body))
+    assert decoded == expected
+    assert decoded.model_dump_json() == expected.model_dump_json()
+
+
+def test_decode_errors_fall_back(body):
+    assert decode_person_response(b'{"status": 404, "error": {"type": "not_found", "message": ""}}', {}) is None
+    assert decode_person_response(b'{"status": 200, "data": [{"id": "1"}]}', {}) is None
+
+
+def test_bytes_from_get_response(body):
+    class BytesAPI(PDLPersonAPI):
+        def _get_response(self, params):
+            if params["email"] == "limited":
+                return b'{"status": 402, "error": {"type": "payment_required", "message": "limit"}}'
+            return body
+
+    api = BytesAPI(settings=PDLSettings(api_key="test"))
+    assert api.get_person_via_email("myemail").safe_person.full_name
+    with pytest.raises(PDLAccountLimitException):
+        api.get_person(params={"email": "limited"})
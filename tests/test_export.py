@@ -0,0 +1,47 @@
+import pytest
+
+from pdl_api import Response
+from pdl_api.export import iter_columns
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from pdl_api.export import to_arrow, write_parquet  # noqa: E402
+
+
+@pytest.fixture
+def responses(success_json):
+    person = success_json
+    record = {"status": 200, "likelihood": 8, "data": person}
+    eager = Response(query={"email": ["a"]}, **record)
+    lazy = Response.model_validate_lazy({**record, "data": dict(person, id="other"), "query": {"email": ["b"]}})
+    error = Response(status=404, error={"type": "not_found", "message": "no"}, query={"email": ["c"]})
+    ## the same person again, exported once
+    return [eager, lazy, error, eager]
+
+
+def test_iter_columns_chunks(responses):
+    chunks = list(iter_columns(responses, chunk_size=1))
+    assert [c["people"]["id"] for c in chunks] == [[responses[0].person.id], ["other"]]
+    emails = chunks[0]["emails"]
+    assert emails["person_id"] == [responses[0].person.id] * len(responses[0].person.emails)
+    assert emails["address"] == [e.address for e in responses[0].person.emails]
+    ## lazy responses are read without validating them
+    assert not responses[1].is_loaded("person")
+
+
+def test_to_arrow(responses):
+    tables = to_arrow(responses)
+    assert tables["people"].num_rows == 2
+    experience = tables["experience"]
+    assert experience.num_rows == 2 * len(responses[0].person.experience)
+    assert experience.column("company_id").to_pylist()[0] == responses[0].person.experience[0].company.id
+    assert tables["people"].schema.field("countries").type == pa.list_(pa.string())
+
+
+def test_write_parquet(responses, tmp_path):
+    paths = write_parquet(responses * 3, str(tmp_path), chunk_size=1)
+    assert set(paths) == {"people", "emails", "experience", "education", "certifications"}
+    people = pq.read_table(paths["people"])
+    assert people.column("id").to_pylist() == [responses[0].person.id, "other"]
+    assert pq.read_table(paths["certifications"]).schema.names[0] == "person_id"
@@ -0,0 +1,56 @@
+import json
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from pdl_api import Person, Response
+from pdl_api.models.decode import decode_person_response
+from pdl_api.models.intern import disable_interning, enable_interning, get_interner, interning
+
+
+@pytest.fixture
+def person_json(success_json):
+    return success_json
+
+
+def companies(person: Person):
+    return [exp.company for exp in person.experience if exp.company and exp.company.id]
+
+
+def test_shares_companies(person_json):
+    plain = Person(**person_json)
+    with interning() as interner:
+        a = Person(**person_json)
+        body = json.dumps({"status": 200, "data": dict(person_json, id="b")}).encode()
+        b = decode_person_response(body, {}).person
+    assert get_interner() is None
+    assert all(x is y for x, y in zip(companies(a), companies(b)))
+    assert interner.stats.hits >= len(companies(b))
+    assert interner.stats.bytes_saved > 0
+    ## interned instances are frozen but compare equal to plain ones
+    assert a == plain
+    with pytest.raises(ValidationError):
+        companies(a)[0].name = "changed"
+    assert pickle.loads(pickle.dumps(a)) == plain
+
+
+def test_conflicting_data_not_shared(person_json):
+    exp = person_json["experience"][0]
+    other = dict(exp, company=dict(exp["company"], size="1-10"))
+    with interning() as interner:
+        a = Person(experience=[exp])
+        b = Person(experience=[other])
+    assert a.experience[0].company is not b.experience[0].company
+    assert b.experience[0].company.size == "1-10"
+    assert interner.stats.conflicts >= 1
+
+
+def test_enable_process_wide(person_json):
+    try:
+        enable_interning()
+        assert get_interner() is not None
+        r = Response.model_validate_lazy({"status": 200, "data": person_json})
+        assert companies(r.person)[0] is companies(Person(**person_json))[0]
+    finally:
+        disable_interning()
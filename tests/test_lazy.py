@@ -0,0 +1,64 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from pdl_api import Person, PDLPersonAPI, PDLSettings, Response
+
+
+@pytest.fixture
+def record(success_json):
+    return {"status": 200, "likelihood": 1, "data": success_json, "query_time": "2024-06-01T00:00:00Z"}
+
+
+def test_lazy_validates_on_access(record):
+    r = Response.model_validate_lazy(record)
+    assert r.is_person
+    assert not r.is_loaded("person")
+    person = r.person
+    assert isinstance(person, Person)
+    assert person.full_name == record["data"]["full_name"]
+    assert not person.is_loaded("experience")
+    assert person.get_experiences()[0].title
+    assert person.is_loaded("experience")
+
+
+def test_lazy_matches_eager(record):
+    eager = Response(**json.loads(json.dumps(record)))
+    assert Response.model_validate_lazy(json.loads(json.dumps(record))) == eager
+    lazy = Response.model_validate_lazy(json.loads(json.dumps(record)))
+    assert lazy.model_dump(mode="json") == eager.model_dump(mode="json")
+    lazy = Response.model_validate_lazy(json.loads(json.dumps(record)))
+    assert lazy.model_dump_json() == eager.model_dump_json()
+    lazy = Response.model_validate_lazy(json.loads(json.dumps(record)))
+    assert pickle.loads(pickle.dumps(lazy)) == eager
+
+
+def test_lazy_copy(record):
+    lazy = Response.model_validate_lazy(record)
+    shallow = copy.copy(lazy)
+    ## loading the original doesn't leave the copy without its person
+    assert lazy.person.full_name == shallow.person.full_name
+    deep = copy.deepcopy(Response.model_validate_lazy(record))
+    assert deep.person.full_name == record["data"]["full_name"]
+    ## the field order is restored once everything is loaded
+    assert list(lazy.__dict__) == list(Response.model_fields)
+
+
+def test_lazy_error(record):
+    r = Response.model_validate_lazy({"status": 404, "error": {"type": "not_found", "message": ""}})
+    assert r.is_error and not r.is_person
+    assert r.person is None
+
+
+def test_lazy_parsing_setting(record):
+    class LazyAPI(PDLPersonAPI):
+        def _get_response(self, params):
+            return json.loads(json.dumps(record))
+
+    api = LazyAPI(settings=PDLSettings(api_key="test", lazy_parsing=True))
+    r = api.get_person_via_email("myemail")
+    assert not r.is_loaded("person")
+    ## the identity index reads emails from the person
+    assert api.find_existing_query({"email": record["data"]["emails"][0]["address"]}) is r
@@ -0,0 +1,160 @@
+from datetime import timedelta
+from typing import Any
+
+import pytest
+
+from pdl_api import LocalIndex, PDLPersonAPI, PDLUnknownException, Response
+
+from conftest import StubClient, StubResponse, make_api
+
+
+def person(pid: str, role: str, website: str, countries: list[str], past: str = "") -> dict[str, Any]:
+    experience = [{"company": {"id": website, "website": website}, "title": {"role": role}, "is_primary": True}]
+    if past:
+        experience.append({"company": {"id": past, "website": past}, "title": {"role": "sales"}})
+    return {"id": pid, "industry": "computer software", "countries": countries, "experience": experience}
+
+
+PEOPLE = [
+    person("p1", "engineering", "acme.com", ["united states"], past="initech.com"),
+    person("p2", "sales", "acme.com", ["canada"]),
+    person("p3", "engineering", "initech.com", ["united states", "canada"]),
+]
+
+
+class SearchPerson:
+    """Stands in for client.person.search, answering term queries on job_company_website"""
+
+    def __init__(self):
+        self.calls: list[dict[str, Any]] = []
+        self.status = 200
+
+    def search(self, **params) -> StubResponse:
+        self.calls.append(params)
+        if self.status != 200:
+            return StubResponse({"status": self.status, "error": {"type": "invalid_request_error", "message": "bad"}}, self.status)
+        website = params["query"]["bool"]["must"][0]["term"]["job_company_website"]
+        data = [p for p in PEOPLE if p["experience"][0]["company"]["website"] == website]
+        return StubResponse({"status": 200, "data": data, "total": len(data)})
+
+
+def response(data: dict[str, Any], lazy: bool = False) -> Response:
+    record = {"status": 200, "data": data, "query": {"pdl_id": data["id"]}}
+    return Response.model_validate_lazy(record) if lazy else Response(**record)
+
+
+def ids(result) -> list[str]:
+    return [r.safe_person.id for r in result.matches]
+
+
+def test_evaluates_supported_filters():
+    lazy = response(PEOPLE[1], lazy=True)
+    index = LocalIndex([response(PEOPLE[0]), lazy, response(PEOPLE[2])])
+    ## indexed from its raw data
+    assert not lazy.is_loaded("person")
+    must = [{"term": {"job_title_role": "Engineering"}}, {"match": {"job_company_website": "https://www.acme.com/"}}]
+    assert ids(index.search({"query": {"bool": {"must": must}}})) == ["p1"]
+    assert ids(index.search({"query": {"term": {"experience.company.website": "initech.com"}}})) == ["p1", "p3"]
+    query = {"bool": {"filter": {"terms": {"countries": ["canada"]}}, "must_not": [{"term": {"job_title_role": "sales"}}]}}
+    assert ids(index.search({"query": query})) == ["p3"]
+    should = {"bool": {"should": [{"term": {"job_company_id": "initech.com"}}, {"term": {"countries": "canada"}}]}}
+    assert ids(index.search({"query": should})) == ["p2", "p3"]
+
+    result = index.search({"query": {"range": {"birth_year": {"gte": 1980}}}})
+    assert (result.matches, result.complete) == ([], False)
+    assert "range" in result.reason
+    assert not index.search({"query": {"term": {"location_metro": "boston"}}}).complete
+    assert not index.search({"sql": "SELECT * FROM person"}).complete
+
+    ## replaced when the person is added again
+    index.add(response(person("p1", "sales", "acme.com", ["mexico"])))
+    assert ids(index.search({"query": {"term": {"countries": "united states"}}})) == ["p3"]
+    index.remove("p3")
+    assert len(index) == 2
+
+
+def test_complete_after_a_covering_search():
+    index = LocalIndex(response(p) for p in PEOPLE)
+    acme = {"query": {"bool": {"must": [{"term": {"job_company_website": "acme.com"}}]}}}
+    narrower = {"query": {"bool": {"filter": [{"term": {"job_company_website": "acme.com"}}, {"term": {"countries": "canada"}}]}}}
+    assert not index.search(narrower).complete
+    index.mark_complete(acme)
+    result = index.search(narrower)
+    assert result.complete and ids(result) == ["p2"]
+    assert index.search(acme).complete
+    ## broader than the completed search, or not a conjunction
+    assert not index.search({"query": {"terms": {"job_company_website": ["acme.com", "initech.com"]}}}).complete
+    assert not index.search({"query": {"bool": {"must_not": {"term": {"job_company_website": "acme.com"}}}}}).complete
+
+
+def test_search_people_answers_locally_once_complete():
+    stub = SearchPerson()
+    api = make_api(stub, local_index=True)
+    query = {"query": {"bool": {"must": [{"term": {"job_company_website": "acme.com"}}]}}}
+    assert api.search_people(query, remote=False) == []
+    assert [r.safe_person.id for r in api.search_people(query)] == ["p1", "p2"]
+    assert len(stub.calls) == 1
+    engineers = {"query": {"bool": {"must": [{"term": {"job_company_website": "acme.com"}}, {"term": {"job_title_role": "engineering"}}]}}}
+    assert [r.safe_person.id for r in api.search_people(engineers)] == ["p1"]
+    assert len(stub.calls) == 1
+    ## p1 only worked there before, and p3 isn't cached yet
+    initech = {"query": {"bool": {"must": [{"term": {"job_company_website": "initech.com"}}]}}}
+    assert [r.safe_person.id for r in api.search_people(initech, remote=False)] == []
+    api.search_people(initech)
+    assert len(stub.calls) == 2
+    ## a new instance doesn't load the cache into its index
+    again = PDLPersonAPI(
+        settings=api.settings, client=StubClient(stub), existing_queries=api.existing_queries
+    )
+    assert len(again.local_index) == 0
+
+
+def test_failed_search_is_not_complete():
+    stub = SearchPerson()
+    stub.status = 400
+    api = make_api(stub, local_index=True)
+    query = {"query": {"bool": {"must": [{"term": {"job_company_website": "acme.com"}}]}}}
+    with pytest.raises(PDLUnknownException):
+        api.search_people(query)
+    assert not api.local_index.search(query).complete
+    stub.status = 200
+    assert [r.safe_person.id for r in api.search_people(query)] == ["p1", "p2"]
+    assert len(stub.calls) == 2
+
+
+def test_not_complete_when_results_were_evicted():
+    stub = SearchPerson()
+    api = make_api(stub, local_index=True, local_index_max_entries=1)
+    query = {"query": {"bool": {"must": [{"term": {"job_company_website": "acme.com"}}]}}}
+    assert [r.safe_person.id for r in api.search_people(query)] == ["p1", "p2"]
+    assert not api.local_index.search(query).complete
+    assert [r.safe_person.id for r in api.search_people(query)] == ["p1", "p2"]
+    assert len(stub.calls) == 2
+    ## checked against the index too, not only the count
+    index = LocalIndex([response(PEOPLE[1])], max_entries=1)
+    assert not index.mark_complete(query, ["p1", "p2"])
+    assert index.mark_complete(query, ["p2"])
+
+
+def test_bounded_and_expiring():
+    index = LocalIndex((response(p) for p in PEOPLE), max_entries=2, ttl=60)
+    assert len(index) == 2
+    acme = {"query": {"term": {"job_company_website": "acme.com"}}}
+    initech = {"query": {"term": {"job_company_website": "initech.com"}}}
+    index.add(response(PEOPLE[1]))
+    index.mark_complete(acme)
+    index.mark_complete(initech)
+    ## evicting p3 drops the initech search it was a result of, not the acme one
+    index.add(response(PEOPLE[0]))
+    assert ids(index.search(initech)) == [] and not index.search(initech).complete
+    assert index.search(acme).complete
+    ## an expired person is dropped, and with it the searches it was a result of
+    old = response(PEOPLE[1])
+    old.query_time = old.query_time - timedelta(seconds=120)
+    index.add(old)
+    result = index.search(acme)
+    assert ids(result) == ["p1"] and not result.complete
+    ## completed searches expire too
+    index.mark_complete(acme)
+    index._covered = [(k, atoms, at - 120) for k, atoms, at in index._covered]
+    assert not index.search(acme).complete
@@ -0,0 +1,57 @@
+from typing import Any
+
+import pytest
+
+from pdl_api import PDLAccountLimitException, PDLPersonAPI, PDLSettings, PrometheusMetrics
+
+from conftest import PAYMENT_REQUIRED, StubClient, StubPerson
+
+
+class BrokePerson(StubPerson):
+    """Emails starting with "broke" hit the account limit"""
+
+    def record(self, params: dict[str, Any]) -> dict[str, Any]:
+        if params["email"][0].startswith("broke"):
+            return PAYMENT_REQUIRED
+        return super().record(params)
+
+
+@pytest.fixture
+def api(success_json):
+    return PDLPersonAPI(
+        settings=PDLSettings(api_key="test"),
+        client=StubClient(BrokePerson(success_json)),
+        metrics=PrometheusMetrics(),
+    )
+
+
+def test_counts(api):
+    m = api.metrics
+    api.get_person({"email": ["known@example.com"]})
+    api.get_person({"email": ["known@example.com"]})
+    api.get_person({"email": ["known@example.com"], "min_likelihood": 5})
+    api.get_person({"email": ["missing@example.com"]})
+    with pytest.raises(PDLAccountLimitException):
+        api.get_person({"email": ["broke@example.com"]})
+
+    assert m.hits == {"exact": 1, "identity": 1}
+    assert m.misses == 3
+    assert m.calls == {"enrich": 3}
+    assert m.errors == {"402": 1, "404": 1}
+    assert m.latency["lookup"].count == 5
+    assert m.latency["network"].count == 3
+    assert m.latency["parse"].count == 3
+
+
+def test_render(api):
+    api.get_person({"email": ["known@example.com"]})
+    text = api.metrics.render()
+    assert 'pdl_api_calls_total{api_type="enrich"} 1' in text
+    assert "pdl_cache_misses_total 1" in text
+    assert 'pdl_stage_seconds_bucket{stage="network",le="+Inf"} 1' in text
+    assert 'pdl_stage_seconds_count{stage="parse"} 1' in text
+
+
+def test_noop_default():
+    api = PDLPersonAPI(settings=PDLSettings(api_key="test"))
+    assert api.find_existing_query({"email": ["a@b.com"]}) is None
@@ -58,6 +58,45 @@ def test_experience_model(example_data):
     assert experience
 
 
+def test_date_ordinal():
+    from pdl_api.models.dates import date_ordinal
+
+    assert date_ordinal(None) == 0
+    assert date_ordinal("2020") < date_ordinal("2020-01") < date_ordinal("2020-01-02") < date_ordinal("2021")
+    assert date_ordinal("garbage") == 0
+
+
+def test_person_views():
+    person = Person(
+        id="p1",
+        emails=[
+            {"address": "old@x.com", "type": "personal", "last_seen": "2019-05"},
+            {"address": "new@x.com", "type": "professional", "last_seen": "2023"},
+            {"address": "none@x.com", "type": "personal"},
+        ],
+        experience=[
+            {"start_date": "2015", "end_date": "2018"},
+            {"start_date": "2020-02", "is_primary": True},
+            {"start_date": "2022"},
+        ],
+    )
+    assert [e.address for e in person.get_emails()] == ["new@x.com", "old@x.com", "none@x.com"]
+    assert person.get_emails() is not person.get_emails()
+    assert person.sorted_emails() is person.sorted_emails()
+    assert person.latest_email().address == "new@x.com"
+    assert person.latest_email("personal").address == "old@x.com"
+    assert person.latest_email("disposable") is None
+    assert [e.start_date for e in person.get_experiences(reverse=False)] == ["2015", "2020-02", "2022"]
+    assert person.current_experience.start_date == "2020-02"
+
+    ## reassigning a field rebuilds its views, which aren't part of equality
+    copy = person.model_copy()
+    copy.emails = copy.emails[:1]
+    assert copy.latest_email().address == "old@x.com"
+    assert person.latest_email().address == "new@x.com"
+    assert Person(**person.model_dump()) == person
+
+
 if __name__ == "__main__":
     pytest.main(["-v", __file__])
     # pytest.main(["-v", __file__, "-k", "test_experience_model"])
@@ -5,6 +5,7 @@ from typing import Any
 import pytest
 
 from pdl_api import PDLPersonAPI, Response, PDLSettings
+from pdl_api.keys import query_key
 
 ## Get the directory of the current file
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -112,5 +113,50 @@ def test_error_no_repeated_calls(error_api: CountingAPI):
     assert error_api.count == 1
 
 
+def test_found_by_other_email(success_api: CountingAPI, success_json):
+    success_api.get_person_via_email("myemail")
+    other = success_json["emails"][1]["address"].upper()
+    pr = success_api.get_person_via_email(other)
+    assert pr.is_person
+    assert success_api.count == 1
+
+
+def test_found_by_pdl_id_and_profile(success_api: CountingAPI, success_json):
+    pr1 = success_api.get_person_via_email("myemail")
+    pr2 = success_api.get_person(params={"pdl_id": success_json["id"]})
+    pr3 = success_api.get_person(params={"profile": "https://www." + success_json["linkedin_url"] + "/"})
+    assert pr1 is pr2 is pr3
+    assert success_api.count == 1
+
+
+def test_index_skips_errors(error_api: CountingAPI):
+    error_api.get_person_via_email("myemail")
+    assert not error_api.identity_index
+    assert error_api.find_existing_queries({"email": ["other"]}) == []
+
+
+def test_query_key_normalized():
+    key = query_key({"email": ["a@x.com"]})
+    ## fixed content hash, independent of PYTHONHASHSEED
+    assert key == "c469bcb676189f2b8e23446efb1b7f8f"
+    assert query_key({"email": [" A@X.com"], "name": None, "company": ""}) == key
+    assert query_key({"email": "a@x.com"}) == key
+    assert query_key({"email": ["b@x.com", "a@x.com"]}) == query_key({"email": ["a@x.com", "b@x.com"]})
+    assert query_key({"email": ["b@x.com"]}) != key
+
+
+def test_query_key_keeps_empty_containers():
+    ## match_all isn't the same search as no query
+    assert query_key({"query": {"match_all": {}}}) != query_key({})
+    assert query_key({"query": {"match_all": {}}}) != query_key({"query": {}})
+    assert query_key({"company": []}) != query_key({})
+
+
+def test_query_key_dedupes_by_type():
+    assert query_key({"size": [1, True]}) != query_key({"size": [1]})
+    assert query_key({"size": [1, True]}) == query_key({"size": [True, 1, 1]})
+    assert query_key({"size": [1, 1.0]}) != query_key({"size": 1})
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,75 @@
+import pytest
+
+from pdl_api import PDLTransientException
+from pdl_api.rate_limit import TokenBucket, parse_rate
+
+from conftest import StubResponse, make_api
+
+
+class FlakyPerson:
+    """Stands in for client.person, failing with `status` for the first `failures` calls"""
+
+    def __init__(self, status: int, failures: int, headers: dict[str, str] | None = None):
+        self.status = status
+        self.failures = failures
+        self.headers = headers or {}
+        self.calls = 0
+
+    def enrichment(self, **params) -> StubResponse:
+        self.calls += 1
+        if self.calls <= self.failures:
+            error = {"status": self.status, "error": {"type": "rate_limit", "message": "slow down"}}
+            return StubResponse(error, self.status, self.headers)
+        return StubResponse({"status": 200, "data": {"id": "1"}}, 200, self.headers)
+
+
+def test_parse_rate():
+    assert parse_rate("{'minute': 120}") == 2
+    assert parse_rate('{"second": 10, "minute": 300}') == 5
+    assert parse_rate("60") == 1
+    assert parse_rate("unknown") is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=100, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0 < bucket.reserve() <= 0.01
+    assert TokenBucket().reserve() == 0
+
+
+def test_token_bucket_adapts_to_headers():
+    bucket = TokenBucket()
+    bucket.update({"x-ratelimit-limit": "{'minute': 600}", "x-ratelimit-remaining": "{'minute': 0}"})
+    assert bucket.rate == 10
+    assert bucket.reserve() > 0
+    ## follows the limit back up
+    bucket.update({"x-ratelimit-limit": "{'minute': 300}"})
+    assert bucket.rate == 5
+    bucket.update({"x-ratelimit-limit": "{'minute': 1200}"})
+    assert bucket.rate == 20
+    ## but not above the configured rate
+    capped = TokenBucket(rate=2)
+    capped.update({"x-ratelimit-limit": "{'minute': 600}"})
+    assert capped.rate == 2
+    capped.update({"x-ratelimit-limit": "{'minute': 60}"})
+    assert capped.rate == 1
+
+
+def test_retry_then_success():
+    person = FlakyPerson(429, failures=2)
+    api = make_api(person, backoff_base=0)
+    pr = api.get_person_via_email("a@x.com")
+    assert pr.is_person
+    assert person.calls == 3
+
+
+def test_transient_not_cached():
+    person = FlakyPerson(503, failures=3)
+    api = make_api(person, max_retries=2, backoff_base=0)
+    with pytest.raises(PDLTransientException):
+        api.get_person_via_email("a@x.com")
+    assert person.calls == 3
+    assert not api.existing_queries
+    ## the next call goes to the API again
+    assert api.get_person_via_email("a@x.com").is_person
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.redis_standin import RedisStandInServer
+from pdl_api import CacheBackend, PDLPersonAPI, RedisCache, Response
+from pdl_api.keys import identifier
+
+from conftest import NOT_FOUND, PAYMENT_REQUIRED, StubPerson, make_api
+
+
+@pytest.fixture
+def server():
+    server = RedisStandInServer(password="secret").start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_node(server: RedisStandInServer, person: StubPerson) -> PDLPersonAPI:
+    """An API on its own node, sharing the server's cache"""
+    return make_api(person, cache_url=server.url)
+
+
+def test_shared_between_nodes(server, success_json):
+    first, second = StubPerson(success_json), StubPerson(success_json)
+    a, b = make_node(server, first), make_node(server, second)
+    assert isinstance(a.existing_queries, RedisCache)
+    assert isinstance(a.existing_queries, CacheBackend)
+    assert a.get_person({"email": ["known1"]}).status == 200
+    ## the other node is served from the shared cache, by key and by identifier
+    assert b.get_person({"email": ["known1"]}).safe_person.id == "known1"
+    assert b.get_person({"email": ["known1"], "min_likelihood": 5}).safe_person.id == "known1"
+    assert (first.records, second.records) == (1, 0)
+
+
+def test_get_people_batched(server, success_json):
+    person = StubPerson(success_json)
+    api = make_node(server, person)
+    api.get_people([{"email": ["known1"]}, {"email": ["missing1"]}])
+    results = make_node(server, person).get_people(
+        [{"email": ["known1"]}, {"email": ["missing1"]}, {"email": ["known2"]}]
+    )
+    assert [r.status for r in results] == [200, 404, 200]
+    ## only known2 is sent again
+    assert person.records == 3
+
+
+def test_round_trip_and_stale_identifiers(server, success_json):
+    cache = RedisCache.from_url(server.url, prefix="t:", compress=False)
+    data = dict(success_json, id="p1", emails=[{"address": "old@example.com"}])
+    cache["k"] = Response(status=200, likelihood=1, data=data)
+    assert cache.lookup(identifier("email", "old@example.com")) == ["k"]
+    data = dict(data, emails=[{"address": "new@example.com"}])
+    cache["k"] = Response(status=200, likelihood=1, data=data)
+    assert cache.lookup(identifier("email", "old@example.com")) == []
+    assert cache.lookup(identifier("email", "new@example.com")) == ["k"]
+    ## an entry written without its identifiers beside it is decoded instead
+    cache.connection.execute("DEL", "t:k:k")
+    data = dict(data, emails=[{"address": "newer@example.com"}])
+    cache["k"] = Response(status=200, likelihood=1, data=data)
+    assert cache.lookup(identifier("email", "new@example.com")) == []
+    assert cache["k"].safe_person.id == "p1"
+    assert list(cache) == ["k"] and len(cache) == 1
+    assert cache.get_many(["k", "nope"]).keys() == {"k"}
+    del cache["k"]
+    assert "k" not in cache
+    assert cache.lookup(identifier("id", "p1")) == []
+    cache.close()
+
+
+def test_ttl_from_query_time(server, success_json):
+    cache = RedisCache.from_url(server.url, ttl=3600, not_found_ttl=60)
+    fresh = Response(status=200, likelihood=1, data=success_json)
+    assert 3590_000 < cache._ttl_ms(fresh) <= 3600_000
+    old = Response(status=200, likelihood=1, data=success_json)
+    old.query_time = old.query_time - timedelta(seconds=3000)
+    assert 590_000 < cache._ttl_ms(old) <= 600_000
+    ## only not_found uses not_found_ttl, other errors expire like the rest
+    assert cache._ttl_ms(Response(**NOT_FOUND)) <= 60_000
+    assert cache._ttl_ms(Response(**PAYMENT_REQUIRED)) > 60_000
+    ## already expired
+    old.query_time = old.query_time - timedelta(seconds=3600)
+    assert cache._ttl_ms(old) == 1
+    cache.close()
+
+
+def test_round_trips(server, success_json):
+    person = StubPerson(success_json)
+    api = make_node(server, person)
+    connection = api.existing_queries.connection
+    trips: list[list[str]] = []
+    pipeline = connection.pipeline
+
+    def counting(commands):
+        trips.append([c[0] for c in commands])
+        return pipeline(commands)
+
+    connection.pipeline = counting
+    emails = [f"known{i}" for i in range(50)] + [f"missing{i}" for i in range(10)]
+    api.get_people([{"email": [e]} for e in emails])
+    ## the exact keys, the identifiers, then one round trip to read the replaced
+    ## entries' identifiers and one to write
+    assert len(trips) == 4
+    assert trips[1] == ["SMEMBERS"] * 60
+    trips.clear()
+    ## found again by identifier, without decoding the replaced entries to write
+    results = api.get_people([{"email": [e], "min_likelihood": 2} for e in emails[:50]])
+    assert [r.safe_person.id for r in results] == emails[:50]
+    assert len(trips) == 3 and person.records == 60
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from typing import Any
+
+from pdl_api import PDLPersonAPI, Response
+from pdl_api.keys import query_key
+from pdl_api.models.response import utcnow
+from pdl_api.refresh import Freshness, freshness
+
+from conftest import PAYMENT_REQUIRED, StubPerson, first_email, found, make_api
+
+
+class RefreshPerson(StubPerson):
+    """Every email is found, from dataset v26.1, unless `status` is 402"""
+
+    def __init__(self, person_json: dict[str, Any], status: int = 200):
+        super().__init__(person_json)
+        self.status = status
+
+    def record(self, params: dict[str, Any]) -> dict[str, Any]:
+        if self.status == 402:
+            return PAYMENT_REQUIRED
+        return found(self.person_json, first_email(params), dataset_version="v26.1")
+
+
+def make_refresh_api(person: StubPerson) -> PDLPersonAPI:
+    return make_api(person, cache_refresh_days=7, cache_expire_days=30, refresh_interval=0.05)
+
+
+def cache_old(api: PDLPersonAPI, success_json, email: str, days: float, version: str = "v25.2"):
+    params = {"email": [email]}
+    data = dict(success_json, id=email, emails=[{"address": email}])
+    r = Response(status=200, likelihood=1, dataset_version=version, data=data, query=params)
+    r.query_time = utcnow() - timedelta(days=days)
+    api.save_queries({query_key(params): r})
+    return r
+
+
+def test_freshness(success_json):
+    r = Response(status=200, likelihood=1, data=success_json)
+    week, month = timedelta(days=7), timedelta(days=30)
+    assert freshness(r, week, month) is Freshness.FRESH
+    assert freshness(r, week, month, now=r.query_time + timedelta(days=8)) is Freshness.STALE
+    assert freshness(r, week, month, now=r.query_time + timedelta(days=31)) is Freshness.EXPIRED
+    assert freshness(r, None, None, now=r.query_time + timedelta(days=365)) is Freshness.FRESH
+
+
+def test_stale_served_then_refreshed_in_batches(success_json):
+    person = RefreshPerson(success_json)
+    api = make_refresh_api(person)
+    old = [cache_old(api, success_json, f"p{i}@example.com", days=10) for i in range(3)]
+    fresh = cache_old(api, success_json, "fresh@example.com", days=1)
+    for i, r in enumerate(old):
+        assert api.get_person({"email": [f"p{i}@example.com"]}) is r
+    assert api.get_person({"email": ["fresh@example.com"]}) is fresh
+    assert person.calls == []
+    assert api.refresher.flush(timeout=5)
+    ## one bulk call for the stale entries, and the cache now has the new responses
+    assert person.emails == [[f"p{i}@example.com" for i in range(3)]]
+    r = api.get_person({"email": ["p0@example.com"]})
+    assert r is not old[0] and r.dataset_version == "v26.1"
+    assert api.dataset_version == "v26.1"
+    assert api.refresher.stats.refreshed == 3
+
+
+def test_expired_fetched_synchronously(success_json):
+    person = RefreshPerson(success_json)
+    api = make_refresh_api(person)
+    old = cache_old(api, success_json, "old@example.com", days=45)
+    r = api.get_person({"email": ["old@example.com"]})
+    assert r is not old and r.dataset_version == "v26.1"
+    assert person.emails == [["old@example.com"]]
+    results = api.get_people([{"email": ["old@example.com"]}, {"email": ["new@example.com"]}])
+    assert results[0] is r
+    assert person.emails[1:] == [["new@example.com"]]
+
+
+def test_current_dataset_version_not_refreshed(success_json):
+    person = RefreshPerson(success_json)
+    api = make_refresh_api(person)
+    api.dataset_version = "v26.1"
+    stale = cache_old(api, success_json, "same@example.com", days=10, version="v26.1")
+    assert api.get_person({"email": ["same@example.com"]}) is stale
+    assert api.refresher.flush(timeout=5)
+    assert person.calls == []
+
+
+def test_account_limit_stops_refreshing(success_json):
+    person = RefreshPerson(success_json, status=402)
+    api = make_refresh_api(person)
+    for i in range(2):
+        cache_old(api, success_json, f"p{i}@example.com", days=10)
+        api.get_person({"email": [f"p{i}@example.com"]})
+    assert api.refresher.flush(timeout=5)
+    assert api.refresher.stopped
+    assert api.refresher.stats.failed == 2
+    ## still served from the cache, without queueing more refreshes
+    assert api.get_person({"email": ["p0@example.com"]}).dataset_version == "v25.2"
+    assert api.refresher.stats.dropped == 1
+
+
+def test_refreshes_the_entry_found_by_identity(success_json):
+    person = RefreshPerson(success_json)
+    api = make_refresh_api(person)
+    old = cache_old(api, success_json, "p0@example.com", days=10)
+    assert api.get_person({"pdl_id": "p0@example.com"}) is old
+    assert api.refresher.flush(timeout=5)
+    ## refreshed under its own query, not a second entry for the pdl_id one
+    assert person.emails == [["p0@example.com"]]
+    assert api.existing_queries[query_key(old.query)].dataset_version == "v26.1"
+    assert query_key({"pdl_id": "p0@example.com"}) not in api.existing_queries
@@ -0,0 +1,98 @@
+import threading
+from typing import Any
+
+import pytest
+
+from pdl_api import PDLDeadlineException, Scheduler
+
+from conftest import PAYMENT_REQUIRED, StubPerson, StubResponse, make_api
+
+
+class GatedPerson(StubPerson):
+    """Requests wait for `gate` while it's cleared, and hit the account limit while `limited`"""
+
+    def __init__(self, person_json: dict[str, Any]):
+        super().__init__(person_json)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.limited = False
+
+    def enrichment(self, **params) -> StubResponse:
+        self.gate.wait(5)
+        return super().enrichment(**params)
+
+    def record(self, params: dict[str, Any]) -> dict[str, Any]:
+        return PAYMENT_REQUIRED if self.limited else super().record(params)
+
+
+@pytest.fixture
+def person(success_json):
+    return GatedPerson(success_json)
+
+
+def make_scheduler(person: GatedPerson, **kwargs) -> Scheduler:
+    return Scheduler(make_api(person, thread_safe=True), workers=1, **kwargs)
+
+
+def test_priority_order_and_dedup(person):
+    with make_scheduler(person) as scheduler:
+        person.gate.clear()
+        first = scheduler.submit({"email": ["known0"]})
+        while not scheduler.status().in_flight:
+            threading.Event().wait(0.01)
+        backfill = [scheduler.submit({"email": [f"known{i}"]}) for i in range(1, 4)]
+        urgent = scheduler.submit({"email": ["known9"]}, priority=10)
+        again = scheduler.submit({"email": ["known9"]})
+        assert scheduler.status().queued_by_priority == {10: 2, 0: 3}
+        person.gate.set()
+        assert again.result(5) is urgent.result(5)
+        for fut in [first, *backfill]:
+            assert fut.result(5).status == 200
+        ## the interactive request went right after the one in flight
+        assert person.emails[1] == ["known9"]
+        assert len(person.calls) == 5
+        ## cached now, answered without queueing
+        assert scheduler.submit({"email": ["known9"]}).done()
+
+
+def test_budget_and_reserve(person):
+    with make_scheduler(person, budget=3, reserve=1) as scheduler:
+        futures = [scheduler.submit({"email": [f"known{i}"]}) for i in range(4)]
+        futures[0].result(5)
+        futures[1].result(5)
+        status = scheduler.status()
+        assert (status.spent, status.remaining, status.paused, status.queued) == (2, 1, "budget", 2)
+        ## the reserved credit is only for higher priorities, and a not-found doesn't cost one
+        assert scheduler.submit({"email": ["missing"]}, priority=1).result(5).status == 404
+        assert scheduler.submit({"email": ["known9"]}, priority=1).result(5).status == 200
+        scheduler.resume(credits=3)
+        assert [f.result(5).status for f in futures[2:]] == [200, 200]
+        ## still holding back the reserve
+        assert scheduler.status().remaining == 1
+
+
+def test_pauses_on_account_limit(person):
+    with make_scheduler(person) as scheduler:
+        person.limited = True
+        fut = scheduler.submit({"email": ["known1"]})
+        while scheduler.status().paused is None:
+            threading.Event().wait(0.01)
+        status = scheduler.status()
+        assert (status.paused, status.queued) == ("account_limit", 1)
+        assert not fut.done()
+        person.limited = False
+        scheduler.resume()
+        assert fut.result(5).status == 200
+
+
+def test_deadline(person):
+    with make_scheduler(person) as scheduler:
+        scheduler.pause()
+        late = scheduler.submit({"email": ["known1"]}, deadline=0.05)
+        later = scheduler.submit({"email": ["known1"]}, deadline=60)
+        with pytest.raises(PDLDeadlineException):
+            late.result(5)
+        assert scheduler.status().queued == 1
+        scheduler.resume()
+        assert later.result(5).status == 200
+        assert person.emails == [["known1"]]
@@ -0,0 +1,71 @@
+from typing import Any
+
+import pytest
+
+from pdl_api import APIType, PDLAccountLimitException, PDLPersonAPI, PDLUnknownException
+
+from conftest import NOT_FOUND, StubResponse, make_api
+
+
+class SearchPerson:
+    """Stands in for client.person.search, serving `total` people page by page"""
+
+    def __init__(self, total: int, fail_after: int | None = None, fail_status: int = 402):
+        self.total = total
+        self.fail_after = fail_after
+        self.fail_status = fail_status
+        self.calls: list[dict[str, Any]] = []
+
+    def search(self, **params) -> StubResponse:
+        self.calls.append(params)
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            error = {"status": self.fail_status, "error": {"type": "error", "message": "failed"}}
+            return StubResponse(error, self.fail_status)
+        if self.total == 0:
+            return StubResponse(NOT_FOUND, 404)
+        start = int(params.get("scroll_token") or 0)
+        end = min(self.total, start + params["size"])
+        data = [{"id": str(i), "emails": [{"address": f"{i}@x.com"}]} for i in range(start, end)]
+        token = str(end) if end < self.total else None
+        return StubResponse({"status": 200, "data": data, "scroll_token": token, "total": self.total})
+
+
+def make_search_api(person: SearchPerson) -> PDLPersonAPI:
+    return make_api(person, query_type=APIType.SEARCH)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter_search_pages(prefetch):
+    person = SearchPerson(total=25)
+    api = make_search_api(person)
+    ids = [r.safe_person.id for r in api.iter_search({"sql": "SELECT * FROM person"}, size=10, prefetch=prefetch)]
+    assert ids == [str(i) for i in range(25)]
+    assert [c.get("scroll_token") for c in person.calls] == [None, "10", "20"]
+
+
+def test_iter_search_caches_people():
+    api = make_search_api(SearchPerson(total=5))
+    list(api.iter_search({"sql": "SELECT * FROM person"}, size=10))
+    assert api.find_existing_query({"email": "3@x.com"}).safe_person.id == "3"
+    assert api.find_existing_query({"pdl_id": "4"}).safe_person.id == "4"
+
+
+def test_iter_search_max_results_and_errors():
+    person = SearchPerson(total=100, fail_after=1)
+    api = make_search_api(person)
+    assert len(list(api.iter_search({"sql": "x"}, size=10, max_results=7))) == 7
+    person.calls.clear()
+    with pytest.raises(PDLAccountLimitException):
+        list(api.iter_search({"sql": "x"}, size=10))
+
+
+def test_iter_search_raises_for_failed_pages():
+    person = SearchPerson(total=30, fail_after=1, fail_status=400)
+    api = make_search_api(person)
+    results = []
+    with pytest.raises(PDLUnknownException):
+        for r in api.iter_search({"sql": "x"}, size=10, prefetch=0):
+            results.append(r)
+    assert len(results) == 10
+    ## not_found just means there are no results
+    assert list(make_search_api(SearchPerson(total=0)).iter_search({"sql": "x"})) == []
@@ -0,0 +1,36 @@
+import pytest
+
+from benchmarks.standin import StandInConfig, StandInServer
+from pdl_api import APIType, PDLAccountLimitException, PDLPersonAPI, PDLSettings
+
+
+@pytest.fixture
+def server():
+    server = StandInServer(StandInConfig(latency_ms=0, rate_404=0.5, rate_limit=10_000)).start()
+    yield server
+    server.shutdown()
+
+
+def test_enrich_against_standin(server):
+    api = PDLPersonAPI(settings=PDLSettings(api_key="test", base_path=server.base_path))
+    results = [api.get_person_via_email(f"{i}@x.com") for i in range(10)]
+    assert {r.status for r in results} == {200, 404}
+    for r in results:
+        if r.is_person:
+            assert r.safe_person.get_emails(sort_by_last_seen=False)[0].address.endswith("@x.com")
+    ## the rate limit headers are picked up
+    assert api.rate_limiter.rate == pytest.approx(10_000 / 60)
+    bulk = api.get_people([{"email": f"{i}@x.com"} for i in range(10, 20)])
+    assert len(bulk) == 10
+    assert server.standin.stats.credits == sum(r.is_person for r in results + bulk)
+
+
+def test_search_and_errors_against_standin(server):
+    settings = PDLSettings(api_key="test", base_path=server.base_path, query_type=APIType.SEARCH)
+    api = PDLPersonAPI(settings=settings)
+    assert len(list(api.iter_search({"sql": "SELECT * FROM person"}, size=40, max_results=100))) == 100
+
+    server.standin.config.rate_402 = 1.0
+    api = PDLPersonAPI(settings=PDLSettings(api_key="test", base_path=server.base_path))
+    with pytest.raises(PDLAccountLimitException):
+        api.get_person_via_email("limited@x.com")
@@ -0,0 +1,40 @@
+from pdl_api import PDLSettings, Response, ShardedCache
+from pdl_api.keys import identifier
+
+from conftest import SlowAPI
+
+
+def test_enrich_many_dedups_in_flight():
+    api = SlowAPI(settings=PDLSettings(api_key="test", thread_safe=True))
+    assert isinstance(api.existing_queries, ShardedCache)
+    params = [{"email": f"{i % 5}@x.com"} for i in range(40)]
+    results = list(api.enrich_many(params, max_workers=8))
+    assert len(results) == 40
+    assert api.count == 5
+    for p, r in results:
+        assert r.safe_person.id == p["email"]
+
+
+def test_enrich_many_streams_input():
+    api = SlowAPI(settings=PDLSettings(api_key="test", thread_safe=True))
+    consumed = []
+
+    def gen():
+        for i in range(100):
+            consumed.append(i)
+            yield {"email": f"{i}@x.com"}
+
+    it = api.enrich_many(gen(), max_workers=2)
+    next(it)
+    ## only a small window is read ahead of the results
+    assert len(consumed) <= 5
+    it.close()
+
+
+def test_sharded_cache():
+    cache = ShardedCache(shards=4, max_entries=8)
+    for i in range(20):
+        cache[str(i)] = Response(status=200, person={"id": str(i)})
+    assert len(cache) <= 8
+    assert cache.lookup(identifier("id", "19")) == ["19"]
+    assert cache.stats.evictions == 20 - len(cache)